@@ -0,0 +1,53 @@
+"""
+Microbenchmark of DataModel accessor cost, precomputed lookups vs. deriving the values from the model dict on every call.
+Run from src folder:
+    python -m benchmark.data_model_benchmark
+"""
+import argparse
+import timeit
+from common.model import DataModel
+from common.constants import NODES_LABEL
+
+def synthetic_model(node_count, prop_count):
+    nodes = {}
+    for i in range(node_count):
+        props = {f"prop_{j}": {"name": f"prop_{j}", "type": "string", "required": j % 3 == 0} for j in range(prop_count)}
+        relationships = {f"node_{i - 1}": {"dest_node": f"node_{i - 1}", "type": "many_to_one", "label": "of"}} if i > 0 else {}
+        nodes[f"node_{i}"] = {"name": f"node_{i}", "id_property": "prop_0", "properties": props, "relationships": relationships}
+    return {NODES_LABEL: nodes, "file-nodes": {"file": {"name-field": "file_name"}}}
+
+# accessors deriving values on each call, as before the model was precomputed
+def derived_req_props(model, node):
+    props = model[NODES_LABEL][node].get("properties") if model[NODES_LABEL].get(node) else None
+    return {k: v for (k, v) in props.items() if v.get("required") == True} if props else None
+
+def derived_file_name(model):
+    file_nodes_vals = list(model.get("file-nodes", {}).values())
+    return file_nodes_vals[0]["name-field"] if len(file_nodes_vals) > 0 else None
+
+def derived_node_id(model, node):
+    return model[NODES_LABEL][node].get("id_property", None) if model[NODES_LABEL].get(node) else None
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DataModel accessors')
+    parser.add_argument('-n', '--nodes', type=int, default=50, help='number of nodes in synthetic model')
+    parser.add_argument('-p', '--props', type=int, default=60, help='number of properties per node')
+    parser.add_argument('-r', '--repeat', type=int, default=100000, help='calls per accessor')
+    args = parser.parse_args()
+
+    model_dict = synthetic_model(args.nodes, args.props)
+    model = DataModel(model_dict)
+    node = f"node_{args.nodes // 2}"
+    cases = [
+        ("get_node_req_props", lambda: derived_req_props(model_dict, node), lambda: model.get_node_req_props(node)),
+        ("get_file_name", lambda: derived_file_name(model_dict), lambda: model.get_file_name()),
+        ("get_node_id", lambda: derived_node_id(model_dict, node), lambda: model.get_node_id(node)),
+    ]
+    print(f"{'accessor':<22}{'derived (us)':>14}{'precomputed (us)':>18}")
+    for name, derived, precomputed in cases:
+        derived_time = timeit.timeit(derived, number=args.repeat) / args.repeat * 1e6
+        precomputed_time = timeit.timeit(precomputed, number=args.repeat) / args.repeat * 1e6
+        print(f"{name:<22}{derived_time:>14.3f}{precomputed_time:>18.3f}")
+
+if __name__ == '__main__':
+    main()
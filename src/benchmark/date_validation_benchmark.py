@@ -0,0 +1,57 @@
+"""
+Benchmark of date validation CPU per value, trying every date format vs. DateValidator.
+Run from src folder:
+    python -m benchmark.date_validation_benchmark
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from bento.common.utils import DATE_FORMATS
+from common.date_validator import DateValidator
+
+def synthetic_values(count, distinct):
+    random.seed(0)
+    start = datetime(2000, 1, 1)
+    dates = [start + timedelta(days=random.randrange(10000)) for _ in range(distinct)]
+    # the last format of a property is the most expensive to find by trying every format
+    date_format = DATE_FORMATS[-1]
+    return [random.choice(dates).strftime(date_format) for _ in range(count)]
+
+def validate_all_formats(values):
+    valid = 0
+    for value in values:
+        for date_format in DATE_FORMATS:
+            try:
+                datetime.strptime(value, date_format)
+                valid += 1
+                break
+            except ValueError:
+                continue
+    return valid
+
+def validate_date_validator(values):
+    date_validator = DateValidator()
+    return sum(1 for value in values if date_validator.is_valid("date", value))
+
+def run(values, validate):
+    start = time.process_time()
+    valid = validate(values)
+    return time.process_time() - start, valid
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark date validation')
+    parser.add_argument('-n', '--values', type=int, default=100000, help='number of date values')
+    parser.add_argument('-d', '--distinct', type=int, default=5000, help='number of distinct dates')
+    args = parser.parse_args()
+
+    values = synthetic_values(args.values, args.distinct)
+    all_formats, valid = run(values, validate_all_formats)
+    date_validator, valid_date_validator = run(values, validate_date_validator)
+    assert valid == valid_date_validator
+    print(f"{args.values} values, {args.distinct} distinct, format {DATE_FORMATS[-1]}")
+    print(f"all formats:    {all_formats:.2f}s cpu, {all_formats * 1e6 / args.values:.1f}us/value")
+    print(f"date validator: {date_validator:.2f}s cpu, {date_validator * 1e6 / args.values:.1f}us/value")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark of data model load time, cold start (parse model yaml files) vs. warm start (load compiled model from local store).
+Run from src folder:
+    python -m benchmark.model_load_benchmark -m https://raw.githubusercontent.com/CBIIT/crdc-datahub-models/ -t master -c CDS
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from common.model_store import ModelFactory, ModelCache
+
+def load_time(models_loc, tier, data_common, version, compiled_model_dir):
+    # use a private in-memory cache, so every load goes through the model files or compiled store
+    factory = ModelFactory(models_loc, tier, cache=ModelCache(), compiled_model_dir=compiled_model_dir)
+    start = time.perf_counter()
+    model = factory.get_model_by_data_common_version(data_common, version)
+    elapsed = time.perf_counter() - start
+    if not model:
+        raise Exception(f"Failed to load data model {data_common}/{version}!")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark data model cold start vs. warm start load time')
+    parser.add_argument('-m', '--models-loc', required=True, help='metadata models location')
+    parser.add_argument('-t', '--tier', required=True, help='tier of models')
+    parser.add_argument('-c', '--data-commons', required=True, help='data commons')
+    parser.add_argument('-v', '--version', help='model version, current version if not provided')
+    parser.add_argument('-r', '--runs', type=int, default=3, help='number of runs for each mode')
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="model-cache-")
+    try:
+        no_store = [load_time(args.models_loc, args.tier, args.data_commons, args.version, None) for _ in range(args.runs)]
+        cold = load_time(args.models_loc, args.tier, args.data_commons, args.version, cache_dir)
+        warm = [load_time(args.models_loc, args.tier, args.data_commons, args.version, cache_dir) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    print(f"parse without store (avg of {args.runs}): {sum(no_store) / len(no_store):.3f}s")
+    print(f"cold start (parse and save compiled model): {cold:.3f}s")
+    print(f"warm start (avg of {args.runs}): {sum(warm) / len(warm):.3f}s")
+
+if __name__ == '__main__':
+    main()
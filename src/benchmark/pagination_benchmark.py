@@ -0,0 +1,69 @@
+"""
+Benchmark of dataRecords page latency, skip/limit vs. keyset pagination, as the offset grows.
+Seeds a synthetic submission into a scratch database and drops the database afterwards.
+Run from src folder:
+    python -m benchmark.pagination_benchmark --mongo mongodb://localhost:27017 --db pagination_benchmark
+"""
+import argparse
+import time
+from pymongo import MongoClient
+from common.constants import DATA_COLlECTION, SUBMISSION_ID, NODE_TYPE, NODE_ID, ID, STATUS, STATUS_NEW
+from common.mongo_dao import MongoDao
+
+SUBMISSION = "benchmark-submission"
+NODE_TYPES = ["aliquot", "diagnosis", "file", "participant", "sample", "study"]
+
+def seed(collection, total):
+    collection.create_index([(SUBMISSION_ID, 1), (NODE_TYPE, 1), (NODE_ID, 1), (ID, 1)])
+    batch = []
+    for i in range(total):
+        batch.append({SUBMISSION_ID: SUBMISSION, NODE_TYPE: NODE_TYPES[i % len(NODE_TYPES)], NODE_ID: f"node-{i:09d}", STATUS: STATUS_NEW})
+        if len(batch) == 10000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+
+def skip_page(collection, start, size):
+    return list(collection.find({SUBMISSION_ID: SUBMISSION}).sort({SUBMISSION_ID: 1, NODE_TYPE: 1, NODE_ID: 1}).skip(start).limit(size))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dataRecords pagination')
+    parser.add_argument('--mongo', default='mongodb://localhost:27017', help='mongo connection string')
+    parser.add_argument('--db', default='pagination_benchmark', help='scratch database, dropped after the run')
+    parser.add_argument('-n', '--records', type=int, default=200000, help='number of records')
+    parser.add_argument('-s', '--size', type=int, default=1000, help='page size')
+    parser.add_argument('--every', type=int, default=20, help='report every N pages')
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo)
+    collection = client[args.db][DATA_COLlECTION]
+    try:
+        collection.drop()
+        seed(collection, args.records)
+        dao = MongoDao(args.mongo, args.db)
+
+        print(f"{'page':>6} {'offset':>10} {'skip/limit ms':>14} {'keyset ms':>10}")
+        keyset = dao.iterate_dataRecords_chunks(SUBMISSION, None, args.size)
+        page = 0
+        skip_total = keyset_total = 0
+        while True:
+            start = time.perf_counter()
+            skip_result = skip_page(collection, page * args.size, args.size)
+            skip_time = time.perf_counter() - start
+            start = time.perf_counter()
+            keyset_result = next(keyset, None)
+            keyset_time = time.perf_counter() - start
+            if not skip_result and not keyset_result:
+                break
+            skip_total += skip_time
+            keyset_total += keyset_time
+            if page % args.every == 0:
+                print(f"{page:>6} {page * args.size:>10} {skip_time * 1000:>14.2f} {keyset_time * 1000:>10.2f}")
+            page += 1
+        print(f"total {page} pages: skip/limit {skip_total:.2f}s, keyset {keyset_total:.2f}s")
+    finally:
+        client.drop_database(args.db)
+
+if __name__ == '__main__':
+    main()
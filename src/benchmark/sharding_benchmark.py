@@ -0,0 +1,56 @@
+"""
+Benchmark of record validation throughput sharded across worker processes, as validation-shards does,
+on a synthetic submission with the synthetic model of validation_plan_benchmark, without DB access.
+Scaling is near-linear up to the number of cores, run it on a host with at least as many cores as shards.
+Run from src folder:
+    python -m benchmark.sharding_benchmark -n 1000000 -s 1 2 4
+"""
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from common.model import DataModel
+from benchmark.validation_plan_benchmark import StubDao, synthetic_model, synthetic_records
+from metadata_validator import MetaDataValidator
+
+CHUNK_SIZE = 1000
+
+def validate_shard(start, end, pvs):
+    validator = MetaDataValidator(StubDao(), None, {})
+    validator.model = DataModel(synthetic_model(pvs))
+    records = synthetic_records(end - start, pvs)
+    begin = time.perf_counter()
+    for i in range(0, len(records), CHUNK_SIZE):
+        chunk = records[i:i + CHUNK_SIZE]
+        validator.valid_values = validator.columnar_prefilter.prefilter(chunk)
+        for record in chunk:
+            validator.validate_props(record, "prefix")
+    return time.perf_counter() - begin
+
+def run(total, shards, pvs):
+    bounds = [total * i // shards for i in range(shards + 1)]
+    with ProcessPoolExecutor(max_workers=shards, mp_context=multiprocessing.get_context("spawn")) as executor:
+        # warm up worker processes
+        list(executor.map(validate_shard, [0] * shards, [1] * shards, [pvs] * shards))
+        start = time.perf_counter()
+        busy = list(executor.map(validate_shard, bounds[:-1], bounds[1:], [pvs] * shards))
+        return time.perf_counter() - start, max(busy)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sharded metadata validation')
+    parser.add_argument('-n', '--records', type=int, default=1000000, help='number of records')
+    parser.add_argument('-s', '--shards', type=int, nargs='+', default=[1, 2, 4], help='numbers of shards')
+    parser.add_argument('-p', '--pvs', type=int, default=200, help='number of permissible values')
+    args = parser.parse_args()
+
+    print(f"{args.records} records, {multiprocessing.cpu_count()} cpu(s)")
+    baseline = None
+    for shards in args.shards:
+        wall, slowest = run(args.records, shards, args.pvs)
+        if shards == 1:
+            baseline = wall
+        speedup = f", speedup {baseline / wall:.2f}x" if baseline else ""
+        print(f"{shards} shard(s): {wall:.2f}s wall, slowest shard {slowest:.2f}s, {args.records / wall:,.0f} records/s{speedup}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark of property validation CPU per record, compiled validation plan vs. deriving the checks from
+the property definitions for every value, and the plan with the columnar prefilter of chunks.
+Run from src folder:
+    python -m benchmark.validation_plan_benchmark
+"""
+import argparse
+import random
+import time
+from common.model import DataModel
+from common.constants import NODES_LABEL, NODE_TYPE, PROPERTIES
+from metadata_validator import MetaDataValidator
+
+NODE = "sample"
+
+class StubDao:
+    """
+    no CDE, no synonym, no concept code
+    """
+    def get_cde_permissible_values(self, cde_code, cde_version):
+        return None
+
+    def find_pvs_by_synonym(self, value):
+        return []
+
+def synthetic_model(pv_count):
+    pvs = [f"Value {i}" for i in range(pv_count)]
+    props = {
+        "sample_id": {"type": "string"},
+        "sample_type": {"type": "string", "permissible_values": pvs},
+        "age": {"type": "integer", "minimum": {"value": 0}, "maximum": {"value": 120}},
+        "weight": {"type": "number", "minimum": {"value": 0.0}},
+        "collected": {"type": "date"},
+        "is_tumor": {"type": "boolean"},
+        "sites": {"type": "value-list", "permissible_values": pvs},
+        "code": {"type": "pattern", "pattern": "^[A-Z]{3}-[0-9]{4}$"},
+    }
+    return {NODES_LABEL: {NODE: {"name": NODE, "id_property": "sample_id", "properties": props}}, "list-delimiter": "|"}
+
+def synthetic_records(count, pv_count):
+    random.seed(0)
+    records = []
+    for i in range(count):
+        records.append({NODE_TYPE: NODE, PROPERTIES: {
+            "sample_id": f"sample-{i}",
+            "sample_type": f"value {random.randrange(pv_count)}",
+            "age": str(random.randrange(120)),
+            "weight": str(random.uniform(1, 100)),
+            "collected": "2024-01-02",
+            "is_tumor": random.choice(["yes", "no", "true", "false"]),
+            "sites": "|".join(f"Value {random.randrange(pv_count)}" for _ in range(3)),
+            "code": f"ABC-{i % 10000:04d}",
+        }})
+    return records
+
+def run(validator, records, validate):
+    start = time.process_time()
+    for record in records:
+        validate(validator, record)
+    return time.process_time() - start
+
+def run_prefiltered(validator, records, chunk_size):
+    start = time.process_time()
+    for i in range(0, len(records), chunk_size):
+        chunk = records[i:i + chunk_size]
+        validator.valid_values = validator.columnar_prefilter.prefilter(chunk)
+        for record in chunk:
+            validator.validate_props(record, "prefix")
+    validator.valid_values = {}
+    return time.process_time() - start
+
+def validate_uncompiled(validator, record):
+    props_def = validator.model.get_node_props(record[NODE_TYPE])
+    for k, v in record[PROPERTIES].items():
+        validator.validate_prop_value(k, v, props_def[k], "prefix", record)
+
+def validate_plan(validator, record):
+    validator.validate_props(record, "prefix")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark compiled validation plan')
+    parser.add_argument('-n', '--records', type=int, default=100000, help='number of records')
+    parser.add_argument('-p', '--pvs', type=int, default=200, help='number of permissible values')
+    parser.add_argument('-c', '--chunk', type=int, default=1000, help='records per chunk')
+    args = parser.parse_args()
+
+    validator = MetaDataValidator(StubDao(), None, {})
+    validator.model = DataModel(synthetic_model(args.pvs))
+    records = synthetic_records(args.records, args.pvs)
+    uncompiled = run(validator, [dict(r, props=dict(r[PROPERTIES])) for r in records], validate_uncompiled)
+    plan = run(validator, [dict(r, props=dict(r[PROPERTIES])) for r in records], validate_plan)
+    prefiltered = run_prefiltered(validator, records, args.chunk)
+    print(f"{args.records} records, {len(records[0][PROPERTIES])} properties each")
+    print(f"uncompiled: {uncompiled:.2f}s cpu, {uncompiled * 1e6 / args.records:.1f}us/record")
+    print(f"plan:       {plan:.2f}s cpu, {plan * 1e6 / args.records:.1f}us/record")
+    print(f"columnar:   {prefiltered:.2f}s cpu, {prefiltered * 1e6 / args.records:.1f}us/record")
+
+if __name__ == '__main__':
+    main()
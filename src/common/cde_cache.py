@@ -0,0 +1,124 @@
+import threading
+import time
+from bento.common.utils import get_logger
+from common.constants import CDE_PERMISSIVE_VALUES
+from common.pv_matcher import PermissibleValueMatcher
+
+DEFAULT_CDE_CACHE_TTL = 3600
+DEFAULT_CDE_CACHE_NEGATIVE_TTL = 600
+# CDE found in DB or STS with permissible values
+CDE_FOUND = "found"
+# CDE not found in DB
+CDE_MISSING = "missing"
+# CDE not found in DB nor STS
+CDE_NOT_AVAILABLE = "not available"
+
+class CDEEntry:
+    """
+    Cached CDE permissible values, normalized once when cached.
+    pvs is None if the CDE has no permissible values field, an empty list if the CDE has no permissible values.
+    """
+    __slots__ = ("state", "pvs", "expires_at", "matcher")
+
+    def __init__(self, state, pvs, expires_at):
+        self.state = state
+        self.pvs = pvs
+        self.expires_at = expires_at
+        self.matcher = None
+
+    """
+    get permissible values matcher, built on first use and shared by validations
+    """
+    def get_matcher(self):
+        if self.matcher is None:
+            self.matcher = PermissibleValueMatcher(self.pvs)
+        return self.matcher
+
+class CDECache:
+    """
+    Process-wide, thread-safe cache of CDE permissible values with TTL, keyed by (CDECode, CDEVersion).
+    Negative results are cached with a shorter TTL.
+    The cache is cleared when the CDE collection generation (latest updatedAt) changes, e.g. after pv_puller runs.
+    """
+    def __init__(self, ttl=DEFAULT_CDE_CACHE_TTL, negative_ttl=DEFAULT_CDE_CACHE_NEGATIVE_TTL):
+        self.log = get_logger('CDE Cache')
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.generation = None
+        self.configure(ttl, negative_ttl)
+
+    def configure(self, ttl=DEFAULT_CDE_CACHE_TTL, negative_ttl=DEFAULT_CDE_CACHE_NEGATIVE_TTL):
+        self.ttl = float(ttl) if ttl is not None else DEFAULT_CDE_CACHE_TTL
+        self.negative_ttl = float(negative_ttl) if negative_ttl is not None else DEFAULT_CDE_CACHE_NEGATIVE_TTL
+
+    """
+    get cached entry
+    :return: CDEEntry or None if not cached or expired
+    """
+    def get(self, cde_code, cde_version):
+        key = (cde_code, cde_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry
+
+    """
+    cache CDE record found in DB or STS
+    """
+    def put_cde(self, cde_code, cde_version, cde):
+        pvs = cde.get(CDE_PERMISSIVE_VALUES)
+        if pvs and isinstance(pvs[0], str):
+            pvs = [item.strip() for item in pvs]
+        return self._put(cde_code, cde_version, CDE_FOUND, pvs, self.ttl)
+
+    """
+    cache negative result, CDE_MISSING or CDE_NOT_AVAILABLE
+    """
+    def put_negative(self, cde_code, cde_version, state):
+        return self._put(cde_code, cde_version, state, None, self.negative_ttl)
+
+    def _put(self, cde_code, cde_version, state, pvs, ttl):
+        entry = CDEEntry(state, pvs, time.monotonic() + ttl)
+        if ttl > 0:
+            with self._lock:
+                self._entries[(cde_code, cde_version)] = entry
+        return entry
+
+    """
+    remove cached CDEs
+    :param keys: list of (CDECode, CDEVersion), all CDEs if None
+    """
+    def invalidate(self, keys=None):
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
+
+    """
+    clear the cache if the CDE collection is updated since the last check
+    :param generation: latest updatedAt of the CDE collection
+    """
+    def check_generation(self, generation):
+        with self._lock:
+            if generation is None or generation == self.generation:
+                return
+            if self.generation is not None:
+                self.log.info(f'CDE collection is updated, {len(self._entries)} cached CDE(s) are cleared.')
+            self._entries.clear()
+            self.generation = generation
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+# process-wide CDE cache shared by all validations
+cde_cache = CDECache()
+
+def configure_cde_cache(ttl=DEFAULT_CDE_CACHE_TTL, negative_ttl=DEFAULT_CDE_CACHE_NEGATIVE_TTL):
+    cde_cache.configure(ttl, negative_ttl)
@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+from bento.common.utils import get_logger
+
+DEFAULT_PIPELINE_QUEUE_DEPTH = 2
+# end of chunks
+END = object()
+
+class ChunkPipeline:
+    """
+    Three-stage pipeline of chunks, a fetch thread reads chunks ahead, the caller's thread processes them in order
+    and a writer thread writes the results in order, so database reads and writes overlap with processing.
+    Stages are connected by bounded queues of queue_depth chunks, a stage waits if the next stage falls behind.
+    With queue depth 0, the stages run one after another in the caller's thread.
+    """
+    def __init__(self, queue_depth=DEFAULT_PIPELINE_QUEUE_DEPTH, name="Chunk Pipeline"):
+        self.log = get_logger(name)
+        self.name = name
+        self.queue_depth = max(0, int(queue_depth)) if queue_depth is not None else DEFAULT_PIPELINE_QUEUE_DEPTH
+        # stage -> seconds, fetch/process/write are the time spent in each stage,
+        # fetch_wait/write_wait are the time the caller's thread waited for a chunk or for the writer
+        self.timings = {}
+
+    """
+    run the pipeline
+    :param chunks: iterable of chunks, iterated in the fetch thread
+    :param process: function to process a chunk, returns the batch to write
+    :param write: function to write a batch, returns the result of the batch
+    :return: list of results of the batches in chunk order
+    """
+    def run(self, chunks, process, write):
+        self.timings = {"fetch": 0.0, "process": 0.0, "write": 0.0, "fetch_wait": 0.0, "write_wait": 0.0}
+        if self.queue_depth == 0:
+            return self._run_sequential(chunks, process, write)
+
+        fetch_queue = queue.Queue(maxsize=self.queue_depth)
+        write_queue = queue.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
+        results = []
+        errors = []
+
+        def fetch():
+            try:
+                iterator = iter(chunks)
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    chunk = next(iterator, END)
+                    self.timings["fetch"] += time.perf_counter() - start
+                    if chunk is END:
+                        break
+                    if not put(fetch_queue, chunk, stop):
+                        return
+            except Exception as e:
+                errors.append(e)
+            put(fetch_queue, END, stop)
+
+        def write_batches():
+            while True:
+                batch = write_queue.get()
+                if batch is END:
+                    return
+                if errors:
+                    # drain the queue after a failure
+                    continue
+                start = time.perf_counter()
+                try:
+                    results.append(write(batch))
+                except Exception as e:
+                    errors.append(e)
+                self.timings["write"] += time.perf_counter() - start
+
+        fetcher = threading.Thread(target=fetch, name=f"{self.name} fetcher", daemon=True)
+        writer = threading.Thread(target=write_batches, name=f"{self.name} writer", daemon=True)
+        fetcher.start()
+        writer.start()
+        try:
+            while True:
+                start = time.perf_counter()
+                chunk = fetch_queue.get()
+                self.timings["fetch_wait"] += time.perf_counter() - start
+                if chunk is END or errors:
+                    break
+                start = time.perf_counter()
+                batch = process(chunk)
+                self.timings["process"] += time.perf_counter() - start
+                start = time.perf_counter()
+                write_queue.put(batch)
+                self.timings["write_wait"] += time.perf_counter() - start
+        finally:
+            stop.set()
+            write_queue.put(END)
+            writer.join()
+        if errors:
+            raise errors[0]
+        return results
+
+    def _run_sequential(self, chunks, process, write):
+        results = []
+        iterator = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(iterator, END)
+            self.timings["fetch"] += time.perf_counter() - start
+            if chunk is END:
+                return results
+            start = time.perf_counter()
+            batch = process(chunk)
+            self.timings["process"] += time.perf_counter() - start
+            start = time.perf_counter()
+            results.append(write(batch))
+            self.timings["write"] += time.perf_counter() - start
+
+    """
+    format stage timings for logging
+    """
+    def format_timings(self):
+        return f'fetch {self.timings.get("fetch", 0):.2f}s, process {self.timings.get("process", 0):.2f}s, write {self.timings.get("write", 0):.2f}s, ' \
+               f'waited {self.timings.get("fetch_wait", 0):.2f}s for chunks and {self.timings.get("write_wait", 0):.2f}s for writes'
+
+"""
+put an item to a bounded queue, unless the pipeline is stopped
+:return: True if the item is put
+"""
+def put(bounded_queue, item, stop):
+    while not stop.is_set():
+        try:
+            bounded_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
@@ -0,0 +1,167 @@
+import re
+import numpy as np
+import pandas as pd
+from bento.common.utils import get_logger, DATE_FORMATS
+from common.constants import NODE_TYPE, PROPERTIES, TYPE, MIN, MAX, VALUE_PROP, VALUE_EXCLUSIVE, CDE_TERM
+
+# plain decimal values only, anything else is converted by the per value checks
+INTEGER_PATTERN = re.compile(r"\s*[+-]?[0-9]{1,18}\s*", re.ASCII)
+NUMBER_PATTERN = re.compile(r"\s*[+-]?([0-9]{1,15}\.?[0-9]{0,15}|\.[0-9]{1,15})([eE][+-]?[0-9]{1,3})?\s*", re.ASCII)
+ISO_DATE_PATTERN = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+ISO_DATE_FORMAT = "%Y-%m-%d"
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+# integers of larger magnitude are not exact in float64
+FLOAT64_EXACT_INT = 2**53
+BOOLEAN_VALUES = ["yes", "true", "no", "false"]
+TRUE_VALUES = ["yes", "true"]
+
+class ColumnarPrefilter:
+    """
+    Column-wise prefilter of the property values of a chunk of records.
+    Values of the same node type and property are checked together with pandas/NumPy, and values proven valid
+    are skipped by the per value checks. Values that may fail, and properties with CDE terms, are still checked
+    per value, so errors are reported exactly as before.
+    """
+    def __init__(self, validator):
+        self.log = get_logger('Columnar Prefilter')
+        self.validator = validator
+        self.column_checks = {
+            "string": self.check_string,
+            "integer": self.check_integer,
+            "number": self.check_number,
+            "date": self.check_date,
+            "datetime": self.check_date,
+            "boolean": self.check_boolean
+        }
+
+    """
+    prefilter the property values of a chunk, records are not changed
+    :param data_records: chunk of records
+    :return: dict of id of record -> {property name: (valid value, corrected value)}
+    """
+    def prefilter(self, data_records):
+        valid_values = {}
+        records_by_type = {}
+        for record in data_records:
+            if isinstance(record.get(PROPERTIES), dict):
+                records_by_type.setdefault(record.get(NODE_TYPE), []).append(record)
+        for node_type, records in records_by_type.items():
+            props_def = self.validator.model.get_node_props(node_type)
+            if not props_def:
+                continue
+            for prop_name, prop_def in props_def.items():
+                # permissible values of CDE are retrieved per value
+                if not prop_def or prop_def.get(CDE_TERM):
+                    continue
+                column_check = self.column_checks.get(prop_def.get(TYPE))
+                if not column_check:
+                    continue
+                cells = [(record, record[PROPERTIES][prop_name]) for record in records
+                         if record[PROPERTIES].get(prop_name) is not None]
+                if len(cells) == 0:
+                    continue
+                try:
+                    for record, value, corrected_value in column_check(prop_def, cells):
+                        valid_values.setdefault(id(record), {})[prop_name] = (value, corrected_value)
+                except Exception as e:
+                    # the values are checked per value
+                    self.log.exception(e)
+                    self.log.error(f"Failed to prefilter the values of {node_type}.{prop_name}.")
+        return valid_values
+
+    """
+    string values without surrounding white space, in permissible values of exact case if any
+    """
+    def check_string(self, prop_def, cells):
+        matcher = self.validator.get_model_pv_matcher(prop_def)
+        if matcher and (matcher.exact is None or (matcher.is_string and matcher.folded is None)):
+            return []
+        cells = [cell for cell in cells if isinstance(cell[1], str) and (not matcher or cell[1])]
+        if len(cells) == 0:
+            return []
+        values = pd.Series([value for _, value in cells], dtype=object)
+        valid = (values.str.strip() == values).to_numpy(dtype=bool)
+        if matcher:
+            valid = valid & values.isin(matcher.exact).to_numpy(dtype=bool)
+        return [(record, value, value) for (record, value), ok in zip(cells, valid) if ok]
+
+    """
+    integer values within the boundaries, properties with permissible values are checked per value
+    """
+    def check_integer(self, prop_def, cells):
+        if self.validator.get_model_pv_matcher(prop_def):
+            return []
+        cells = [cell for cell in cells if (isinstance(cell[1], int) and not isinstance(cell[1], bool) and INT64_MIN <= cell[1] <= INT64_MAX)
+                 or (isinstance(cell[1], str) and INTEGER_PATTERN.fullmatch(cell[1]))]
+        return self.check_boundaries(prop_def, cells, np.int64)
+
+    """
+    number values within the boundaries, properties with permissible values are checked per value
+    """
+    def check_number(self, prop_def, cells):
+        if self.validator.get_model_pv_matcher(prop_def):
+            return []
+        cells = [cell for cell in cells if (isinstance(cell[1], (int, float)) and not isinstance(cell[1], bool) and INT64_MIN <= cell[1] <= INT64_MAX)
+                 or (isinstance(cell[1], str) and NUMBER_PATTERN.fullmatch(cell[1]))]
+        return self.check_boundaries(prop_def, cells, np.float64)
+
+    def check_boundaries(self, prop_def, cells, dtype):
+        bounds = get_bounds(prop_def)
+        if bounds is None or len(cells) == 0:
+            return []
+        numbers = np.array([value for _, value in cells], dtype=object).astype(dtype)
+        valid = np.ones(len(cells), dtype=bool)
+        for threshold, exclusive, is_min in bounds:
+            if isinstance(threshold, float) and dtype is np.int64:
+                # integers are compared to a float threshold in float64, larger values are checked per value
+                valid &= (numbers >= -FLOAT64_EXACT_INT) & (numbers <= FLOAT64_EXACT_INT)
+            elif isinstance(threshold, int) and not (INT64_MIN <= threshold <= INT64_MAX if dtype is np.int64 else -FLOAT64_EXACT_INT <= threshold <= FLOAT64_EXACT_INT):
+                # the threshold is not exact in the dtype, the values are checked per value
+                return []
+            if is_min:
+                valid &= (numbers > threshold) if exclusive else (numbers >= threshold)
+            else:
+                valid &= (numbers < threshold) if exclusive else (numbers <= threshold)
+        return [(record, value, value) for (record, value), ok in zip(cells, valid) if ok]
+
+    """
+    date values in ISO format
+    """
+    def check_date(self, prop_def, cells):
+        if ISO_DATE_FORMAT not in DATE_FORMATS:
+            return []
+        cells = [cell for cell in cells if isinstance(cell[1], str) and ISO_DATE_PATTERN.fullmatch(cell[1])]
+        if len(cells) == 0:
+            return []
+        dates = pd.to_datetime(pd.Series([value for _, value in cells], dtype=object), format=ISO_DATE_FORMAT, errors="coerce")
+        valid = dates.notna().to_numpy(dtype=bool)
+        return [(record, value, value) for (record, value), ok in zip(cells, valid) if ok]
+
+    """
+    boolean values, and boolean strings corrected to boolean
+    """
+    def check_boolean(self, prop_def, cells):
+        valid_cells = [(record, value, value) for record, value in cells if isinstance(value, bool)]
+        str_cells = [cell for cell in cells if isinstance(cell[1], str)]
+        if len(str_cells) > 0:
+            lower_values = pd.Series([value for _, value in str_cells], dtype=object).str.lower()
+            valid = lower_values.isin(BOOLEAN_VALUES).to_numpy(dtype=bool)
+            true_values = lower_values.isin(TRUE_VALUES).to_numpy(dtype=bool)
+            valid_cells.extend((record, value, bool(is_true)) for (record, value), ok, is_true in zip(str_cells, valid, true_values) if ok)
+        return valid_cells
+
+"""
+get the boundaries of a numeric property, as check_boundary checks them
+:return: list of (threshold, exclusive, is minimum), None if a boundary can't be checked column-wise
+"""
+def get_bounds(prop_def):
+    bounds = []
+    for key, is_min in [(MIN, True), (MAX, False)]:
+        bound = prop_def.get(key)
+        if bound and bound.get(VALUE_PROP):
+            threshold = bound.get(VALUE_PROP)
+            if isinstance(threshold, bool) or not isinstance(threshold, (int, float)):
+                return None
+            bounds.append((threshold, bound.get(VALUE_EXCLUSIVE), is_min))
+    return bounds
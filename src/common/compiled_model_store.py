@@ -0,0 +1,77 @@
+import os
+import hashlib
+import pickle
+import tempfile
+from bento.common.utils import get_logger
+from common.utils import get_exception_msg
+
+# bump when the parsed model layout changes so stale artifacts are not loaded
+STORE_FORMAT_VERSION = 1
+COMPILED_MODEL_EXT = ".pkl"
+
+class CompiledModelStore:
+    """
+    Local on-disk store of parsed data models, so a new container does not need to re-parse model yaml files.
+    Artifacts are keyed by a content hash of the source model files, so any change in the source files
+    results in a new artifact and stale artifacts are never loaded.
+    """
+    def __init__(self, cache_dir):
+        self.log = get_logger('Compiled Model Store')
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    """
+    compute content hash of model source files
+    :param data_common: data commons name
+    :param version: model version
+    :param delimiter: list delimiter
+    :param file_contents: dict of file url and raw content
+    :return: hex digest
+    """
+    @staticmethod
+    def content_hash(data_common, version, delimiter, file_contents):
+        digest = hashlib.sha256()
+        digest.update(f"{STORE_FORMAT_VERSION}|{data_common}|{version}|{delimiter}".encode("utf-8"))
+        for file_name, content in file_contents.items():
+            digest.update(os.path.basename(file_name).encode("utf-8"))
+            digest.update(hashlib.sha256(content).digest())
+        return digest.hexdigest()
+
+    def _path(self, data_common, version, key):
+        return os.path.join(self.cache_dir, f"{data_common}_{version}_{key}{COMPILED_MODEL_EXT}")
+
+    """
+    load parsed model dict by content hash
+    :return: model dict or None if not found or unreadable
+    """
+    def load(self, data_common, version, key):
+        path = self._path(data_common, version, key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+            return model if isinstance(model, dict) else None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.warning(f"Failed to load compiled model {path}, it will be rebuilt! {get_exception_msg()}")
+            return None
+
+    """
+    save parsed model dict with atomic write, so concurrent readers never see a partial file
+    """
+    def save(self, data_common, version, key, model):
+        path = self._path(data_common, version, key)
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            self.log.exception(e)
+            self.log.warning(f"Failed to save compiled model {path}! {get_exception_msg()}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
@@ -13,6 +13,21 @@ SERVICE_TYPE_PV_PULLER = "pv_puller"
 SERVICE_TYPES = [SERVICE_TYPE_ESSENTIAL, SERVICE_TYPE_FILE, SERVICE_TYPE_METADATA, SERVICE_TYPE_EXPORT, SERVICE_TYPE_PV_PULLER]
 
 MODEL_FILE_DIR = "models-loc"
+MODEL_CACHE_DIR = "model-cache-dir"
+HTTP_CACHE_DIR = "http-cache-dir"
+HTTP_CACHE_MAX_STALENESS = "http-cache-max-staleness"
+HTTP_CACHE_OFFLINE = "http-cache-offline"
+CONSUMER_WORKERS = "consumer-workers"
+CONSUMER_MAX_MESSAGES = "consumer-max-messages"
+QUEUE_BACKEND = "queue-backend"
+QUEUE_BACKEND_LOCAL = "local"
+LOCAL_QUEUE_PATH = "local-queue-path"
+CDE_CACHE_TTL = "cde-cache-ttl"
+CDE_CACHE_NEGATIVE_TTL = "cde-cache-negative-ttl"
+PIPELINE_QUEUE_DEPTH = "pipeline-queue-depth"
+VALIDATION_SHARDS = "validation-shards"
+INCREMENTAL_VALIDATION = "incremental-validation"
+FAN_OUT_SHARD_SIZE = "fan-out-shard-size"
 LOADER_QUEUE = "LOADER_QUEUE"
 FILE_QUEUE = "FILE_QUEUE"
 METADATA_QUEUE = "METADATA_QUEUE"
@@ -116,6 +131,7 @@ MIN = 'minimum'
 MAX = 'maximum'
 VALIDATION_RESULT = "result"
 VALIDATED_AT = "validatedAt"
+VALIDATION_FINGERPRINT = "validationFingerprint"
 FILE_VALIDATION_STATUS = "fileValidationStatus"
 METADATA_VALIDATION_STATUS = "metadataValidationStatus"
 CROSS_SUBMISSION_VALIDATION_STATUS = "crossSubmissionStatus"
@@ -137,6 +153,7 @@ TYPE_FILE_VALIDATE_ALL = "Validate Submission Files"
 TYPE_EXPORT_METADATA = "Export Metadata"
 TYPE_COMPLETE_SUB = "Complete Submission"
 TYPE_CROSS_SUBMISSION = "Validate Cross-submission"
+TYPE_METADATA_VALIDATE_SHARD = "Validate Metadata Shard"
 DATA_COMMONS = "dataCommons"
 RESTORE_DELETED_DATA_FILES = "Restore Deleted Data Files"
 FAILED = "Failed"
@@ -166,6 +183,15 @@ VALIDATION_ENDED= "validationEnded"
 METADATA_ENDED = "metadataEnded"
 FILE_ENDED = "fileEnded"
 METADATA_STATUS = "metadataStatus"
+METADATA_CHECKPOINT = "metadataCheckpoint"
+# completion tracker of metadata validation fanned out into shard messages
+METADATA_SHARDS = "metadataShards"
+SHARD_COUNT = "shards"
+SHARDS_DONE = "done"
+SHARD_INDEX = "shardIndex"
+START_KEY = "startKey"
+END_KEY = "endKey"
+VALIDATION_IDS = "validationIDs"
 FILE_STATUS = "fileStatus"
 FILE_VALIDATION = "fileValidation"
 METADATA_VALIDATION = "metadataValidation"
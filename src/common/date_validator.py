@@ -0,0 +1,101 @@
+import re
+from datetime import datetime
+from bento.common.utils import DATE_FORMATS
+
+DEFAULT_DATE_CACHE_SIZE = 10000
+# loose patterns of strptime directives, a value not matching the pattern of a format can't be parsed with the format
+DIRECTIVE_PATTERNS = {
+    "Y": r"\d{4}",
+    "m": r"\s?\d{1,2}",
+    "d": r"\s?\d{1,2}",
+    "H": r"\s?\d{1,2}",
+    "I": r"\s?\d{1,2}",
+    "M": r"\s?\d{1,2}",
+    "S": r"\s?\d{1,2}",
+    "y": r"\d{2}",
+    "f": r"\d{1,6}",
+    "%": r"%"
+}
+
+class DateValidator:
+    """
+    Validates date/datetime values against the date formats.
+    The format matched last by a property is tried first for the next value of the property,
+    the other formats are tried only if the value matches their pattern, so most values are parsed once.
+    Results of repeated values are cached, up to cache_size values.
+    """
+    def __init__(self, date_formats=DATE_FORMATS, cache_size=DEFAULT_DATE_CACHE_SIZE):
+        self.date_formats = list(date_formats)
+        self.format_patterns = [format_pattern(date_format) for date_format in self.date_formats]
+        self.cache_size = cache_size
+        self.cache = {}
+        # property name -> index of the format matched last
+        self.sticky_formats = {}
+
+    """
+    check if a value can be parsed with any of the date formats
+    :param prop_name: property name, to try the format matched last by the property first
+    :param value: date value
+    :return: True if the value is a valid date
+    """
+    def is_valid(self, prop_name, value):
+        if not isinstance(value, str):
+            # not cached, parsed as is
+            return any(self.parse(index, value) for index in range(len(self.date_formats)))
+        valid = self.cache.get(value)
+        if valid is not None:
+            return valid
+        index = self.find_format(prop_name, value)
+        valid = index is not None
+        if index is not None:
+            self.sticky_formats[prop_name] = index
+        if self.cache_size > 0:
+            if len(self.cache) >= self.cache_size:
+                # evict the oldest value
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[value] = valid
+        return valid
+
+    def find_format(self, prop_name, value):
+        sticky = self.sticky_formats.get(prop_name)
+        if sticky is not None and self.parse(sticky, value):
+            return sticky
+        for index, pattern in enumerate(self.format_patterns):
+            if index == sticky or (pattern is not None and not pattern.fullmatch(value)):
+                continue
+            if self.parse(index, value):
+                return index
+        return None
+
+    def parse(self, index, value):
+        try:
+            datetime.strptime(value, self.date_formats[index])
+            return True
+        except ValueError:
+            return False
+
+"""
+build the pattern of a date format to pre-screen values
+:return: compiled pattern, None if the format has a directive without pattern
+"""
+def format_pattern(date_format):
+    pattern = ""
+    i = 0
+    while i < len(date_format):
+        char = date_format[i]
+        if char == "%":
+            if i + 1 >= len(date_format):
+                return None
+            directive = DIRECTIVE_PATTERNS.get(date_format[i + 1])
+            if directive is None:
+                return None
+            pattern += directive
+            i += 2
+            continue
+        # white space of the format matches any white space, as strptime does
+        if not char.isspace():
+            pattern += re.escape(char)
+        elif not pattern.endswith(r"\s+"):
+            pattern += r"\s+"
+        i += 1
+    return re.compile(pattern, re.IGNORECASE)
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import weakref
+from collections import defaultdict, deque
+from bento.common.utils import get_logger
+from common.constants import ID, NODE_TYPE, NODE_ID, PROPERTIES, PARENTS, STATUS, STATUS_NEW, VALIDATION_FINGERPRINT, \
+    DATA_COMMON_NAME, MODEL_VERSION, STUDY_ID, SUBMISSION_INTENTION
+from common.node_resolver import parent_key, hashable_key
+
+# changed when the validation rules change, so fingerprints of earlier validations don't match
+FINGERPRINT_VERSION = 1
+RECORD_FIELDS = [PROPERTIES, PARENTS, STATUS, VALIDATION_FINGERPRINT]
+# data model -> digest of the model content
+model_digests = weakref.WeakKeyDictionary()
+
+class IncrementalPlanner:
+    """
+    Plan which records of a submission to validate, by comparing the validation fingerprint stored in each record
+    with the fingerprint of its current content.
+    New records, records whose fingerprint changed, duplicate nodes and nodes of one_to_one relationships
+    (their result depends on their siblings) are validated, and so are all descendants of these records
+    in the parent graph of the submission, since their results depend on their ancestors.
+    """
+    def __init__(self, mongo_dao, model, submission_id, environment, duplicate_nodes, chunk_size=1000):
+        self.log = get_logger('Incremental Validation Planner')
+        self.mongo_dao = mongo_dao
+        self.model = model
+        self.submission_id = submission_id
+        self.environment = environment
+        self.duplicate_nodes = duplicate_nodes
+        self.chunk_size = chunk_size
+        # node type -> has one_to_one relationship or not
+        self.one_to_one_types = {}
+        self.skipped_count = 0
+        # _id of the records of the plan, in keyset pagination order
+        self.record_ids = []
+
+    """
+    find records to validate
+    :return: set of _id of records to validate, None to validate all records
+    """
+    def plan(self):
+        self.skipped_count = 0
+        self.record_ids = []
+        records = []
+        keys = set()
+        try:
+            for chunk in self.mongo_dao.iterate_dataRecords_chunks(self.submission_id, None, self.chunk_size, fields=RECORD_FIELDS):
+                for record in chunk:
+                    records.append((record[ID], hashable_key(record.get(NODE_TYPE), record.get(NODE_ID)), [parent_key(parent) for parent in record.get(PARENTS) or []],
+                                    content_digest(record), record.get(VALIDATION_FINGERPRINT),
+                                    record.get(STATUS) == STATUS_NEW or self.has_one_to_one(record.get(NODE_TYPE))))
+                    if records[-1][1] is not None:
+                        keys.add(records[-1][1])
+        except Exception as e:
+            self.log.exception(e)
+            self.log.error(f"{self.submission_id}: Failed to plan incremental validation, all records are validated.")
+            return None
+
+        # parent key -> indexes of child records
+        children = defaultdict(list)
+        dirty = [False] * len(records)
+        queue = deque()
+        for index, (record_id, key, parent_keys, digest, fingerprint, changed) in enumerate(records):
+            try:
+                for parent in parent_keys:
+                    if parent is not None:
+                        children[parent].append(index)
+                duplicate = key is None or key in self.duplicate_nodes
+                if not changed and not duplicate:
+                    present = [parent in keys if parent is not None else None for parent in parent_keys]
+                    changed = fingerprint != record_fingerprint(self.environment, digest, present, duplicate)
+                else:
+                    changed = True
+            except TypeError:
+                # unhashable parent ID value
+                changed = True
+            if changed:
+                dirty[index] = True
+                queue.append(index)
+        # descendants of changed records
+        visited = set()
+        while queue:
+            key = records[queue.popleft()][1]
+            if key is None or key in visited:
+                continue
+            visited.add(key)
+            for index in children.get(key, []):
+                if not dirty[index]:
+                    dirty[index] = True
+                    queue.append(index)
+
+        revalidate_ids = set(record[0] for record, is_dirty in zip(records, dirty) if is_dirty)
+        self.record_ids = [record[0] for record in records]
+        self.skipped_count = len(records) - len(revalidate_ids)
+        self.log.info(f"{self.submission_id}: {len(revalidate_ids)} out of {len(records)} nodes changed or depend on changed nodes.")
+        return revalidate_ids if self.skipped_count > 0 else None
+
+    """
+    split the records to validate into key ranges, by the order of the records of the plan
+    :param revalidate_ids: _id of records to validate
+    :param split_keys: last keys of the key ranges, but the last range
+    :return: list of sets of _id of records to validate per key range, None if a split key is not a record of the plan
+    """
+    def split(self, revalidate_ids, split_keys):
+        split_ids = set(key[2] for key in split_keys)
+        revalidate_ranges = [set()]
+        for record_id in self.record_ids:
+            if record_id in revalidate_ids:
+                revalidate_ranges[-1].add(record_id)
+            if record_id in split_ids:
+                revalidate_ranges.append(set())
+        return revalidate_ranges if len(revalidate_ranges) == len(split_keys) + 1 else None
+
+    def has_one_to_one(self, node_type):
+        one_to_one = self.one_to_one_types.get(node_type)
+        if one_to_one is None:
+            relationships = self.model.get_node_relationships(node_type) or {}
+            one_to_one = any(self.model.get_relationship_type(node_type, parent_type) == "one_to_one" for parent_type in relationships)
+            self.one_to_one_types[node_type] = one_to_one
+        return one_to_one
+
+"""
+digest of everything a validation depends on besides the records, the data model, the submission,
+and generations of the permissible values and the released nodes of the study
+:param generations: generations of the collections, any of them None if not available
+:return: hex digest, None if any generation is not available
+"""
+def validation_environment(model, submission, study_name, program_names, generations):
+    if any(generation is None for generation in generations):
+        return None
+    if isinstance(program_names, (list, set, tuple)):
+        program_names = sorted(program_names, key=str)
+    environment = [FINGERPRINT_VERSION, model_digest(model), submission.get(ID), submission.get(DATA_COMMON_NAME),
+                   submission.get(MODEL_VERSION), submission.get(STUDY_ID), submission.get(SUBMISSION_INTENTION),
+                   study_name, program_names, generations]
+    return hashlib.sha256(json.dumps(environment, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+"""
+digest of the content of a data model, computed once per model
+"""
+def model_digest(model):
+    digest = model_digests.get(model)
+    if digest is None:
+        digest = hashlib.sha256(json.dumps(model.model, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        model_digests[model] = digest
+    return digest
+
+"""
+digest of the properties and parents of a record
+"""
+def content_digest(record):
+    content = [record.get(NODE_TYPE), record.get(NODE_ID), record.get(PROPERTIES), record.get(PARENTS)]
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+"""
+fingerprint of the validation of a record
+:param environment: digest of the validation environment
+:param digest: digest of the content of the record
+:param parents_present: for each parent of the record, if the parent is in the submission, None if the parent has no key
+:param duplicate: if the node appears more than once in the submission
+:return: hex digest
+"""
+def record_fingerprint(environment, digest, parents_present, duplicate):
+    fingerprint = [environment, digest, parents_present, duplicate]
+    return hashlib.sha256(json.dumps(fingerprint).encode("utf-8")).hexdigest()
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from bento.common.utils import get_logger
+
+ETAG = "etag"
+LAST_MODIFIED = "last_modified"
+FETCHED_AT = "fetched_at"
+URL = "url"
+CONTENT_EXT = ".body"
+META_EXT = ".json"
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 60
+
+class HttpCache:
+    """
+    Http client for remote model files with pooled connections and an optional local disk cache.
+    Cached files are revalidated with conditional GET (ETag/Last-Modified) once older than max_staleness seconds.
+    In offline mode, cached files are served without any request.
+    """
+    def __init__(self, cache_dir=None, max_staleness=0, offline=False, timeout=DEFAULT_TIMEOUT):
+        self.log = get_logger('Http Cache')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=DEFAULT_POOL_SIZE, pool_maxsize=DEFAULT_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.configure(cache_dir, max_staleness, offline)
+
+    """
+    set cache settings
+    :param cache_dir: local cache directory, no disk cache if None
+    :param max_staleness: seconds a cached file is served without revalidation
+    :param offline: serve cached files only
+    """
+    def configure(self, cache_dir=None, max_staleness=0, offline=False):
+        self.cache_dir = cache_dir
+        self.max_staleness = float(max_staleness) if max_staleness else 0
+        self.offline = bool(offline)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    """
+    get content of the url
+    :param url: file url
+    :return: bytes
+    """
+    def get(self, url):
+        if not self.cache_dir:
+            if self.offline:
+                raise Exception(f"Can't download {url} in offline mode without cache directory!")
+            return self._request(url).content
+
+        meta, content = self._read(url)
+        if self.offline:
+            if content is None:
+                raise Exception(f"Can't find {url} in cache in offline mode!")
+            return content
+        if content is not None and time.time() - meta.get(FETCHED_AT, 0) < self.max_staleness:
+            return content
+
+        headers = {}
+        if content is not None:
+            if meta.get(ETAG):
+                headers["If-None-Match"] = meta[ETAG]
+            if meta.get(LAST_MODIFIED):
+                headers["If-Modified-Since"] = meta[LAST_MODIFIED]
+        try:
+            r = self._request(url, headers)
+        except Exception as e:
+            if content is None:
+                raise
+            self.log.warning(f"Failed to revalidate {url}, serving cached copy: {e}")
+            return content
+        if r.status_code == 304 and content is not None:
+            meta[FETCHED_AT] = time.time()
+            self._write(url, meta, None)
+            return content
+        if r.status_code != 200:
+            # only complete responses are cached, error bodies and redirects are not served as the file later
+            if content is not None:
+                self.log.warning(f"Failed to revalidate {url}, status {r.status_code}, serving cached copy.")
+                return content
+            return r.content
+        meta = {URL: url, ETAG: r.headers.get("ETag"), LAST_MODIFIED: r.headers.get("Last-Modified"), FETCHED_AT: time.time()}
+        self._write(url, meta, r.content)
+        return r.content
+
+    def _request(self, url, headers=None):
+        r = self.session.get(url, headers=headers, timeout=self.timeout)
+        if r.status_code > 400:
+            raise Exception(f"Can't find model file at {url}, {r.content}!")
+        return r
+
+    def _path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key)
+
+    def _read(self, url):
+        path = self._path(url)
+        try:
+            with open(path + META_EXT) as f:
+                meta = json.load(f)
+            with open(path + CONTENT_EXT, "rb") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return {}, None
+
+    def _write(self, url, meta, content):
+        path = self._path(url)
+        with self.lock:
+            try:
+                if content is not None:
+                    self._atomic_write(path + CONTENT_EXT, content)
+                self._atomic_write(path + META_EXT, json.dumps(meta).encode("utf-8"))
+            except OSError as e:
+                self.log.warning(f"Failed to cache {url}: {e}")
+
+    def _atomic_write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+# process-wide http client, configured by configure_http_cache on service start
+http_cache = HttpCache()
+
+def configure_http_cache(cache_dir=None, max_staleness=0, offline=False):
+    http_cache.configure(cache_dir, max_staleness, offline)
@@ -0,0 +1,137 @@
+import json
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+from bento.common.utils import get_logger
+from common.utils import get_uuid_str
+
+IN_MEMORY = ":memory:"
+DEFAULT_LONG_PULL_TIME = 1
+POLL_INTERVAL = 0.2
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    group_id TEXT,
+    body TEXT NOT NULL,
+    visible_at REAL NOT NULL,
+    receipt_handle TEXT,
+    receive_count INTEGER NOT NULL DEFAULT 0
+)"""
+
+class LocalQueue:
+    """
+    Local stand-in of the sqs Queue for load testing the services without AWS, backed by sqlite in memory or in a file.
+    A file backed queue can be shared with other processes, e.g. the replay tool.
+    It supports visibility timeout, delete, batch receive and fifo message groups:
+    a message is not delivered while another message of the same group is in flight,
+    a batch receive returns messages of the same group in order as sqs does.
+    """
+    def __init__(self, queue_name, path=IN_MEMORY, long_pull_time=DEFAULT_LONG_PULL_TIME):
+        self.log = get_logger('Local Queue')
+        self.queue_name = queue_name
+        self.queue_url = f"local://{path}/{queue_name}"
+        self.long_pull_time = long_pull_time
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        with self.lock:
+            self.conn.execute(CREATE_TABLE)
+        # mimic boto3 resource meta, so messages work with VisibilityManager
+        self.meta = SimpleNamespace(client=self)
+
+    def sendMsgToQueue(self, msg, msg_id):
+        with self.lock:
+            self.conn.execute("INSERT INTO messages (queue, message_id, group_id, body, visible_at) VALUES (?, ?, ?, ?, ?)",
+                              (self.queue_name, get_uuid_str(), msg_id, json.dumps(msg), time.time()))
+
+    def receiveMsgs(self, visibilityTimeOut, max_msgs=1):
+        end = time.time() + self.long_pull_time
+        while True:
+            msgs = self._receive(visibilityTimeOut, max_msgs)
+            if msgs or time.time() >= end:
+                return msgs
+            time.sleep(POLL_INTERVAL)
+
+    def _receive(self, visibility_timeout, max_msgs):
+        now = time.time()
+        msgs = []
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT seq, message_id, group_id, body, visible_at FROM messages WHERE queue = ? ORDER BY seq",
+                    (self.queue_name,)).fetchall()
+                blocked_groups = set()
+                for seq, message_id, group_id, body, visible_at in rows:
+                    if len(msgs) >= max_msgs:
+                        break
+                    if group_id is not None and group_id in blocked_groups:
+                        continue
+                    if visible_at > now:
+                        if group_id is not None:
+                            # later messages of the group wait until this message is deleted or visible again
+                            blocked_groups.add(group_id)
+                        continue
+                    receipt_handle = get_uuid_str()
+                    self.conn.execute("UPDATE messages SET visible_at = ?, receipt_handle = ?, receive_count = receive_count + 1 WHERE seq = ?",
+                                      (now + visibility_timeout, receipt_handle, seq))
+                    msgs.append(LocalMessage(self, message_id, receipt_handle, body))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return msgs
+
+    def getApproximateNumberOfMessages(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM messages WHERE queue = ? AND visible_at <= ?",
+                                     (self.queue_name, time.time())).fetchone()[0]
+
+    def delete_message(self, receipt_handle):
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM messages WHERE receipt_handle = ?", (receipt_handle,))
+            return cursor.rowcount > 0
+
+    def change_visibility(self, receipt_handle, timeout):
+        with self.lock:
+            cursor = self.conn.execute("UPDATE messages SET visible_at = ? WHERE receipt_handle = ?",
+                                       (time.time() + timeout, receipt_handle))
+            return cursor.rowcount > 0
+
+    """
+    same signature as boto3 sqs client change_message_visibility_batch
+    """
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        successful = []
+        failed = []
+        for entry in Entries:
+            if self.change_visibility(entry["ReceiptHandle"], entry["VisibilityTimeout"]):
+                successful.append({"Id": entry["Id"]})
+            else:
+                failed.append({"Id": entry["Id"], "SenderFault": True, "Code": "ReceiptHandleIsInvalid", "Message": "Message is not in flight."})
+        return {"Successful": successful, "Failed": failed}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class LocalMessage:
+    """
+    Message received from LocalQueue, with the attributes and methods of boto3 sqs Message used by the services.
+    """
+    def __init__(self, queue, message_id, receipt_handle, body):
+        self.queue = queue
+        self.message_id = message_id
+        self.receipt_handle = receipt_handle
+        self.body = body
+        self.queue_url = queue.queue_url
+        self.meta = queue.meta
+
+    def delete(self):
+        if not self.queue.delete_message(self.receipt_handle):
+            self.queue.log.warning(f'Message {self.message_id} is not in flight, it may have been received again.')
+
+    def change_visibility(self, VisibilityTimeout):
+        self.queue.change_visibility(self.receipt_handle, VisibilityTimeout)
@@ -0,0 +1,112 @@
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from bento.common.utils import get_logger
+from common.constants import SUBMISSION_ID, CONSUMER_WORKERS, CONSUMER_MAX_MESSAGES
+from common.utils import get_exception_msg
+
+SQS_MAX_MESSAGES = 10
+
+class MessageDispatcher:
+    """
+    Dispatch queue messages to a bounded pool of worker threads.
+    Messages with the same key (submission ID) are processed one at a time in arrival order,
+    so two jobs never mutate the same submission concurrently.
+    With a single worker, messages are processed inline in the caller's thread.
+    """
+    def __init__(self, workers=1, name="Message Dispatcher"):
+        self.log = get_logger(name)
+        self.workers = max(1, int(workers)) if workers else 1
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name) if self.workers > 1 else None
+        self.condition = threading.Condition()
+        # messages dispatched but not finished, including messages waiting for a running job of the same key
+        self.in_flight = 0
+        self.processed = 0
+        # key -> messages waiting for the running job of the same key
+        self.pending = {}
+
+    """
+    wait until a worker is available
+    :param max_msgs: max number of messages to receive
+    :return: number of messages can be received without waiting
+    """
+    def wait_for_capacity(self, max_msgs=1):
+        with self.condition:
+            while self.in_flight >= self.workers:
+                self.condition.wait()
+            return max(1, min(max_msgs, self.workers - self.in_flight))
+
+    """
+    dispatch a message handler
+    :param key: serialization key, None if the message can run concurrently with any other message
+    :param handler: function to process the message
+    :param args: arguments of the handler
+    """
+    def submit(self, key, handler, *args):
+        with self.condition:
+            self.in_flight += 1
+            if key is not None:
+                if key in self.pending:
+                    self.pending[key].append((handler, args))
+                    self.log.info(f'Job for {key} is waiting for the running job of the same submission, {self.in_flight} job(s) in flight.')
+                    return
+                self.pending[key] = deque()
+        if self.executor:
+            self.executor.submit(self._run, key, handler, args)
+        else:
+            self._run(key, handler, args)
+
+    def _run(self, key, handler, args):
+        while handler:
+            try:
+                handler(*args)
+            except Exception as e:
+                self.log.exception(e)
+                self.log.critical(f'Failed to process the message! {get_exception_msg()}')
+            with self.condition:
+                self.in_flight -= 1
+                self.processed += 1
+                handler = None
+                if key is not None:
+                    waiting = self.pending.get(key)
+                    if waiting:
+                        handler, args = waiting.popleft()
+                    else:
+                        self.pending.pop(key, None)
+                self.condition.notify_all()
+
+    """
+    get serialization key of a message
+    :param msg: queue message
+    :param resolver: optional function to resolve submission ID of message data without submission ID
+    :return: submission ID or None
+    """
+    def get_message_key(self, msg, resolver=None):
+        # messages processed inline are already serialized
+        if not self.executor:
+            return None
+        try:
+            data = json.loads(msg.body)
+            key = data.get(SUBMISSION_ID)
+            if not key and resolver:
+                key = resolver(data)
+            return key
+        except Exception as e:
+            self.log.exception(e)
+            return None
+
+    def shutdown(self, wait=True):
+        if self.executor:
+            self.executor.shutdown(wait=wait)
+
+"""
+create message dispatcher from configurations
+:param configs: service configurations
+:param name: dispatcher name
+:return: dispatcher, max number of messages per receive
+"""
+def create_dispatcher(configs, name):
+    workers = int(configs.get(CONSUMER_WORKERS) or 1)
+    max_msgs = int(configs.get(CONSUMER_MAX_MESSAGES) or 1)
+    return MessageDispatcher(workers, name), max(1, min(max_msgs, SQS_MAX_MESSAGES))
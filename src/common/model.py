@@ -1,8 +1,47 @@
-from common.constants import NODES_LABEL, RELATIONSHIPS, LIST_DELIMITER_PROP, DEF_MAIN_NODES, PROPERTY_NAMES, OMIT_DCF_PREFIX, COMPOSITION_KEY
+from common.constants import NODES_LABEL, RELATIONSHIPS, TYPE, LIST_DELIMITER_PROP, DEF_MAIN_NODES, PROPERTY_NAMES, OMIT_DCF_PREFIX, COMPOSITION_KEY
 
 class DataModel:
+    """
+    Read-only data model, derived lookups are computed once when the model is built,
+    so accessors called per record are single dict lookups.
+    The model dict is shared by all jobs via the model cache and must not be mutated.
+    """
     def __init__(self, model):
-        self.model = model
+        object.__setattr__(self, "model", model)
+        nodes = model.get(NODES_LABEL, {}) if model else {}
+        node_ids = {}
+        node_props = {}
+        node_req_props = {}
+        node_relationships = {}
+        relationship_types = {}
+        composition_keys = {}
+        for name, node in nodes.items():
+            if not node:
+                continue
+            node_ids[name] = node.get("id_property", None)
+            props = node.get("properties", None)
+            node_props[name] = props
+            node_req_props[name] = {k: v for (k, v) in props.items() if v.get("required") == True} if props else None
+            relationships = node.get(RELATIONSHIPS, None)
+            node_relationships[name] = relationships
+            relationship_types[name] = {parent_type: rel.get(TYPE) for parent_type, rel in relationships.items()} if relationships else {}
+            composition_keys[name] = node.get(COMPOSITION_KEY, None)
+        file_nodes = model.get("file-nodes", {}) if model else {}
+        file_nodes_vals = list(file_nodes.values()) if file_nodes else []
+        object.__setattr__(self, "_nodes", nodes)
+        object.__setattr__(self, "_node_ids", node_ids)
+        object.__setattr__(self, "_node_props", node_props)
+        object.__setattr__(self, "_node_req_props", node_req_props)
+        object.__setattr__(self, "_node_relationships", node_relationships)
+        object.__setattr__(self, "_relationship_types", relationship_types)
+        object.__setattr__(self, "_composition_keys", composition_keys)
+        object.__setattr__(self, "_file_nodes", file_nodes)
+        object.__setattr__(self, "_file_name", file_nodes_vals[0]["name-field"] if len(file_nodes_vals) > 0 else None)
+        object.__setattr__(self, "_main_nodes", model.get(DEF_MAIN_NODES, {}) if model else {})
+        object.__setattr__(self, "_prop_names", model.get(PROPERTY_NAMES, {}) if model else {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"DataModel is read-only, can't set attribute {name}!")
 
     # model connivent functions
     # """
@@ -14,78 +53,72 @@ class DataModel:
     get nodes value
     """   
     def get_nodes(self): 
-        return self.model.get(NODES_LABEL, {})
+        return self._nodes
     """
     get id field of a given node in the model
     """   
     def get_node_id(self, node): 
-        if self.model[NODES_LABEL].get(node):
-            return self.model[NODES_LABEL][node].get("id_property", None)
-        return None
+        return self._node_ids.get(node, None)
 
     """
     get all node keys in the model
     """
     def get_node_keys(self):
-        return self.model[NODES_LABEL].keys()
+        return self._nodes.keys()
 
     """
     get properties of a node in the model
     """
     def get_node_props(self, node):
-        if self.model[NODES_LABEL].get(node):
-            return self.model[NODES_LABEL][node].get("properties", None)
+        return self._node_props.get(node, None)
 
     """
     get relationships of a node in the model
     """
     def get_node_relationships(self, node):
-        if self.model[NODES_LABEL].get(node):
-            return self.model[NODES_LABEL][node].get(RELATIONSHIPS, None)
-        
+        return self._node_relationships.get(node, None)
+
+    """
+    get relationship type between a node and its parent node type in the model
+    """
+    def get_relationship_type(self, node, parent_type):
+        return self._relationship_types.get(node, {}).get(parent_type, None)
+
     """
     get required properties of a node in the model
     """
     def get_node_req_props(self, node):
-        props = self.get_node_props(node)
-        if not props:
-            return None
-        return {k: v for (k, v) in props.items() if v.get("required") == True}
+        return self._node_req_props.get(node, None)
     
     """
     get file nodes in the model
     """
     def get_file_nodes(self):
-        return self.model.get("file-nodes", {})
+        return self._file_nodes
     
     """
     get main nodes in the model
     """
     def get_main_nodes(self):
-        return self.model.get(DEF_MAIN_NODES, {})
-    
-    def get_entity_type(self, node_type):
-        return self.model.get(DEF_MAIN_NODES, {}).get(node_type, None)
+        return self._main_nodes
     
     """
     get entity type of a given node in the model
     """
     def get_entity_type(self, node_type):
-        return self.model.get(DEF_MAIN_NODES, {}).get(node_type, None)
+        return self._main_nodes.get(node_type, None)
     
     """
     get configured property names of a given node's property name in the model
     """
     def get_configured_prop_name(self, prop_name):
-        return self.model.get(PROPERTY_NAMES, {}).get(prop_name, None)
+        return self._prop_names.get(prop_name, None)
     
     """
     get file name property
     """
     def get_file_name(self):
-        file_nodes_dict =  self.model.get("file-nodes", {})
-        file_nodes_vals = list(file_nodes_dict.values())
-        return file_nodes_vals[0]["name-field"] if len(file_nodes_vals) > 0 else None
+        return self._file_name
     
     """
     get list delimiter
@@ -103,7 +136,7 @@ class DataModel:
     get composition key
     """
     def get_composition_key(self, node):
-        return self.model[NODES_LABEL][node].get(COMPOSITION_KEY, None)
+        return self._composition_keys.get(node, None)
 
 
     
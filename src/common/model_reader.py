@@ -4,7 +4,7 @@ from bento.common.utils import get_logger, MULTIPLIER, DEFAULT_MULTIPLIER
 from common.constants import DATA_COMMON, VERSION, MODEL_SOURCE, NAME_PROP, DESC_PROP, ID_PROPERTY, VALUE_PROP, \
     VALUE_EXCLUSIVE, ALLOWED_VALUES, RELATION_LABEL, TYPE, NODE_LABEL, NODE_PROPERTIES, PROP_REQUIRED, MD5, \
     FILE_SIZE, LIST_DELIMITER_PROP, CDE_TERM, PROPERTY_PATTERN, COMPOSITION_KEY
-from common.utils import download_file_to_dict, case_insensitive_get
+from common.utils import download_file_to_dict, parse_file_content, case_insensitive_get
 
 NODES = 'Nodes'
 RELATIONSHIPS = 'Relationships'
@@ -59,7 +59,7 @@ def is_parent_pointer(field_name):
     return re.fullmatch(r'\w+\.\w+', field_name) is not None
 
 class YamlModelParser:
-    def __init__(self, yaml_files, data_common, delimiter, version=DEFAULT_VERSION):
+    def __init__(self, yaml_files, data_common, delimiter, version=DEFAULT_VERSION, file_contents=None):
         self.log = get_logger('Model Reader')
         # initialize the data model
         self.model = {DATA_COMMON: data_common, VERSION: version}
@@ -71,7 +71,9 @@ class YamlModelParser:
                 self.log.info('Reading model file: {} ...'.format(aFile))
                 if aFile and '.' in aFile and aFile.split('.')[-1].lower() in ["yml", "yaml"]:
                     model_file_src.append(os.path.basename(aFile))
-                    schema = download_file_to_dict(aFile)
+                    # use pre-downloaded file content if provided by caller
+                    schema = parse_file_content(aFile, file_contents[aFile]) if file_contents and aFile in file_contents \
+                        else download_file_to_dict(aFile)
                     if schema:
                         self.schema.update(schema)
             except Exception as e:
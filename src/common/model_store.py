@@ -1,9 +1,13 @@
 import os
+import threading
+import time
+from collections import OrderedDict
 from bento.common.utils import get_logger
 from common.model_reader import YamlModelParser
 from common.model import DataModel
 from common.constants import MODELS_DEFINITION_FILE, LIST_DELIMITER_PROP, DEF_MAIN_NODES, PROPERTY_NAMES, OMIT_DCF_PREFIX
-from common.utils import download_file_to_dict, get_exception_msg
+from common.compiled_model_store import CompiledModelStore
+from common.utils import download_file_to_dict, download_file_content, get_exception_msg
 
 YML_FILE_EXT = ".yml"
 DEF_MODEL_FILES = "model-files"
@@ -11,11 +15,67 @@ DEF_VERSION = "current-version"
 MODE_ID_FIELDS = "id_fields"
 DEF_SEMANTICS = "semantics"
 DEF_FILE_NODES = "file-nodes"
+DEFAULT_MODEL_CACHE_SIZE = 8
+
+class ModelCache:
+    """
+    Bounded, thread-safe LRU cache of built DataModel objects, shared by every service in the process.
+    Keyed by (model location, data commons, version).
+    """
+    def __init__(self, max_size=DEFAULT_MODEL_CACHE_SIZE):
+        self.max_size = max_size
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    def get(self, key):
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                self.misses += 1
+                return None
+            self._models.move_to_end(key)
+            self.hits += 1
+            return model
+
+    def put(self, key, model, load_time=0.0):
+        with self._lock:
+            self.load_time += load_time
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, max_size):
+        with self._lock:
+            self.max_size = max_size
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._models), "max_size": self.max_size, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "load_time": round(self.load_time, 3)}
+
+# process-wide model cache shared by all ModelFactory instances
+model_cache = ModelCache()
+
 class ModelFactory:
     
-    def __init__(self, model_def_loc, tier):
+    def __init__(self, model_def_loc, tier, cache=None, compiled_model_dir=None):
         self.log = get_logger('Models')
         self.models = None
+        self.cache = cache if cache is not None else model_cache
+        self.compiled_store = CompiledModelStore(compiled_model_dir) if compiled_model_dir else None
         msg = None
         # get models definition file, content.json in models dir
         self.model_def_dir = os.path.join(model_def_loc, tier + "/cache")
@@ -39,16 +99,31 @@ class ModelFactory:
         delimiter = v.get(LIST_DELIMITER_PROP)
         #process model files for the data common
         try:
-            model_reader = YamlModelParser(file_names, dc, delimiter, version)
-            model_reader.model.update({DEF_FILE_NODES: v[DEF_SEMANTICS][DEF_FILE_NODES], DEF_MAIN_NODES: v[DEF_SEMANTICS][DEF_MAIN_NODES], 
-                                       PROPERTY_NAMES: v[DEF_SEMANTICS][PROPERTY_NAMES], OMIT_DCF_PREFIX: v.get(OMIT_DCF_PREFIX, False)})
-            return model_reader.model
+            model = self.parse_model_files(file_names, dc, delimiter, version)
+            model.update({DEF_FILE_NODES: v[DEF_SEMANTICS][DEF_FILE_NODES], DEF_MAIN_NODES: v[DEF_SEMANTICS][DEF_MAIN_NODES], 
+                          PROPERTY_NAMES: v[DEF_SEMANTICS][PROPERTY_NAMES], OMIT_DCF_PREFIX: v.get(OMIT_DCF_PREFIX, False)})
+            return model
         except Exception as e:
             self.log.exception(e)
             msg = f"Failed to create data model: {data_common}/{version}!"
             self.log.exception(f"{msg} {get_exception_msg()}")
             return None
     """
+    parse model files, use compiled model in local store if the content of model files is not changed
+    """
+    def parse_model_files(self, file_names, data_common, delimiter, version):
+        if not self.compiled_store:
+            return YamlModelParser(file_names, data_common, delimiter, version).model
+        file_contents = {file_name: download_file_content(file_name) for file_name in file_names}
+        key = self.compiled_store.content_hash(data_common, version, delimiter, file_contents)
+        model = self.compiled_store.load(data_common, version, key)
+        if model:
+            self.log.info(f"Loaded compiled data model {data_common}/{version} from local store.")
+            return model
+        model = YamlModelParser(file_names, data_common, delimiter, version, file_contents).model
+        self.compiled_store.save(data_common, version, key, model)
+        return model
+    """
     get current version by data common
     """
     def get_current_version_by_datacommon(self, data_common):
@@ -63,13 +138,24 @@ class ModelFactory:
         model = None
         if not version:
             version = self.get_current_version_by_datacommon(data_common)
+        key = (self.model_def_dir, model_key(data_common, version))
+        data_model = self.cache.get(key)
+        if data_model:
+            return data_model
+        start = time.perf_counter()
         try:
             model = self.create_model(data_common, version)
         except Exception as e:
             self.log.exception(e)
             msg = f"Failed to create data model: {data_common}/{version}!"
             self.log.exception(f"{msg} {get_exception_msg()}")
-        return DataModel(model) if model else None  
+        if not model:
+            return None
+        data_model = DataModel(model)
+        # only successfully built models are cached, failures are retried on the next request
+        self.cache.put(key, data_model, time.perf_counter() - start)
+        self.log.info(f"Data model {data_common}/{version} loaded, model cache: {self.cache.stats()}")
+        return data_model
 
 def model_key(data_common, version):
     return f"{data_common}_{version}"
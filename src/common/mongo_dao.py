@@ -1,4 +1,4 @@
-from pymongo import MongoClient, errors, ReplaceOne, UpdateOne, DeleteOne, DESCENDING, InsertOne
+from pymongo import MongoClient, errors, ReplaceOne, UpdateOne, DeleteOne, DESCENDING, InsertOne, ReturnDocument
 import re
 from bento.common.utils import get_logger
 from common.constants import BATCH_COLLECTION, SUBMISSION_COLLECTION, DATA_COLlECTION, ID, UPDATED_AT, \
@@ -12,9 +12,10 @@ from common.constants import BATCH_COLLECTION, SUBMISSION_COLLECTION, DATA_COLlE
     SYNONYM_COLLECTION, PV_TERM, SYNONYM_TERM, CDE_FULL_NAME, CDE_PERMISSIVE_VALUES, CREATED_AT, PROPERTIES,\
     STUDY_COLLECTION, ORGANIZATION_COLLECTION, USER_COLLECTION, PV_CONCEPT_CODE_COLLECTION, CONCEPT_CODE, PERMISSIBLE_VALUE,\
     GENERATED_PROPS, FILE_ENDED, METADATA_ENDED, METADATA_STATUS, FILE_STATUS, FILE_VALIDATION, METADATA_VALIDATION,\
-    CONSENT_CODE, RELEASE
+    CONSENT_CODE, RELEASE, ORIN_FILE_NAME, VALIDATION_FINGERPRINT, METADATA_CHECKPOINT, METADATA_SHARDS, SHARDS_DONE
 from common.utils import get_exception_msg, current_datetime, get_uuid_str
 from common.s3_utils import S3Service
+from common.validation_checkpoint import TOTAL, VALIDATED, IS_ERROR, IS_WARNING
 
 MAX_SIZE = 10000
 
@@ -147,6 +148,62 @@ class MongoDao:
             self.log.exception(f"{submission_id}: Failed to search nodes: {get_exception_msg()}")
             return None
         
+    """
+    search nodes of a submission by nodeType and nodeIDs in one query
+    :param node_ids_by_type: dict of nodeType and list of nodeIDs
+    :param submission_id: submission ID
+    :param fields: fields returned besides nodeType and nodeID, props if None
+    :return: list of nodes with nodeType, nodeID and the fields, None if failed
+    """
+    def search_nodes_by_type_and_ids(self, node_ids_by_type, submission_id, fields=None):
+        if fields is None:
+            fields = [PROPERTIES]
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        query = [{SUBMISSION_ID: submission_id, NODE_TYPE: node_type, NODE_ID: {"$in": list(node_ids)}}
+                 for node_type, node_ids in node_ids_by_type.items() if node_ids]
+        projection = {NODE_TYPE: 1, NODE_ID: 1, **{field: 1 for field in fields}}
+        try:
+            return list(data_collection.find({"$or": query}, projection)) if len(query) > 0 else []
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to search nodes: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to search nodes: {get_exception_msg()}")
+            return None
+
+    """
+    find duplicate nodes in a submission with one aggregation
+    :param submission_id: submission ID
+    :return: dict of (nodeType, nodeID) and list of duplicate records with _id, file name and line number, 
+    only keys appear more than once, None if failed
+    """
+    def get_duplicate_nodes(self, submission_id):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        pipeline = [
+            {"$match": {SUBMISSION_ID: submission_id}},
+            {"$group": {ID: {NODE_TYPE: f"${NODE_TYPE}", NODE_ID: f"${NODE_ID}"}, "count": {"$sum": 1},
+                        "records": {"$push": {ID: f"${ID}", ORIN_FILE_NAME: f"${ORIN_FILE_NAME}", "lineNumber": "$lineNumber"}}}},
+            {"$match": {"count": {"$gt": 1}}}
+        ]
+        try:
+            duplicates = {}
+            for group in data_collection.aggregate(pipeline, allowDiskUse=True):
+                key = (group[ID].get(NODE_TYPE), group[ID].get(NODE_ID))
+                duplicates[key] = group["records"]
+            return duplicates
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to find duplicate nodes: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to find duplicate nodes: {get_exception_msg()}")
+            return None
+
     """
     check node exists by dataCommons, nodeType and nodeID
     """
@@ -375,7 +432,8 @@ class MongoDao:
         try:
             result = file_collection.bulk_write([
                 UpdateOne( {ID: m[ID]}, 
-                    {"$set": {STATUS: m[STATUS], UPDATED_AT: m[UPDATED_AT], VALIDATED_AT: m[UPDATED_AT], QC_RESULT_ID: m.get(QC_RESULT_ID), PROPERTIES: m.get(PROPERTIES), GENERATED_PROPS: m.get(GENERATED_PROPS), CONSENT_CODE: m.get(CONSENT_CODE)}})
+                    {"$set": {STATUS: m[STATUS], UPDATED_AT: m[UPDATED_AT], VALIDATED_AT: m[UPDATED_AT], QC_RESULT_ID: m.get(QC_RESULT_ID), PROPERTIES: m.get(PROPERTIES), GENERATED_PROPS: m.get(GENERATED_PROPS), CONSENT_CODE: m.get(CONSENT_CODE),
+                              VALIDATION_FINGERPRINT: m.get(VALIDATION_FINGERPRINT)}})
                     for m in list(data_records)
                 ])
             self.log.info(f'Total {result.modified_count} dataRecords are updated!')
@@ -487,46 +545,88 @@ class MongoDao:
             return None 
 
     """
-    retrieve dataRecord by submissionID and scope either New dataRecords or All in batch
-    """
-    def get_dataRecords_chunk(self, submission_id, scope, start, size):
+    iterate dataRecords of a submission chunk by chunk, ordered by (nodeType, nodeID, _id).
+    Keyset pagination, each chunk is queried from the last key of the previous chunk, so the cost per chunk
+    does not grow with the offset as skip/limit does.
+    :param submission_id: submission ID
+    :param scope: STATUS_NEW for new records only, otherwise all records
+    :param size: chunk size
+    :param node_type: optional node type
+    :param start_key: optional exclusive start key (nodeType, nodeID, _id)
+    :param end_key: optional inclusive end key (nodeType, nodeID, _id)
+    :param fields: optional fields of records to retrieve, in addition to the keys, all fields if None
+    :return: generator of record lists, raise exception if failed to query
+    """
+    def iterate_dataRecords_chunks(self, submission_id, scope=None, size=1000, node_type=None, start_key=None, end_key=None, fields=None):
         db = self.client[self.db_name]
-        file_collection = db[DATA_COLlECTION]
-        try:
-            query = {SUBMISSION_ID: {'$eq': submission_id}} 
-            if scope == STATUS_NEW:
-                query[STATUS] = STATUS_NEW
-                result = list(file_collection.find(query).sort({SUBMISSION_ID: 1, "nodeType": 1, "nodeID": 1}).limit(size))
-            else:
-                result = list(file_collection.find(query).sort({SUBMISSION_ID: 1, "nodeType": 1, "nodeID": 1}).skip(start).limit(size))
-            return result
-        except errors.PyMongoError as pe:
-            self.log.exception(pe)
-            self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
-            return None
-        except Exception as e:
-            self.log.exception(e)
-            self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
-            return None 
-        
+        data_collection = db[DATA_COLlECTION]
+        projection = {field: 1 for field in [NODE_TYPE, NODE_ID] + list(fields)} if fields is not None else None
+        base_query = {SUBMISSION_ID: submission_id}
+        if scope == STATUS_NEW:
+            base_query[STATUS] = STATUS_NEW
+        if node_type:
+            base_query[NODE_TYPE] = node_type
+        last_key = start_key
+        while True:
+            conditions = [base_query]
+            if last_key:
+                conditions.append(keyset_after(last_key))
+            if end_key:
+                conditions.append(keyset_not_after(end_key))
+            query = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+            try:
+                cursor = data_collection.find(query, projection) if projection else data_collection.find(query)
+                result = list(cursor.sort([(SUBMISSION_ID, 1), (NODE_TYPE, 1), (NODE_ID, 1), (ID, 1)]).limit(size))
+            except errors.PyMongoError as pe:
+                self.log.exception(pe)
+                self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
+                raise
+            except Exception as e:
+                self.log.exception(e)
+                self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
+                raise
+            if not result:
+                return
+            yield result
+            if len(result) < size:
+                return
+            last_key = record_key(result[-1])
+
     """
-    retrieve dataRecord by submissionID and nodeType
+    get keys splitting dataRecords of a submission into ranges of about the same size, in keyset pagination order
+    :param submission_id: submission ID
+    :param scope: validation scope
+    :param shards: number of ranges
+    :return: list of up to shards - 1 keys, each key is the last key of a range, None if failed
     """
-    def get_dataRecords_chunk_by_nodeType(self, submission_id, node_type, start, size):
+    def get_dataRecords_split_keys(self, submission_id, scope, shards):
         db = self.client[self.db_name]
-        file_collection = db[DATA_COLlECTION]
+        data_collection = db[DATA_COLlECTION]
+        query = {SUBMISSION_ID: submission_id}
+        if scope == STATUS_NEW:
+            query[STATUS] = STATUS_NEW
         try:
-            query = {SUBMISSION_ID: {'$eq': submission_id}, NODE_TYPE: {'$eq': node_type}} 
-            result = list(file_collection.find(query).sort({SUBMISSION_ID: 1, "nodeType": 1, "nodeID": 1}).skip(start).limit(size))
-            return result
+            total = data_collection.count_documents(query)
+            positions = sorted(set(total * i // shards - 1 for i in range(1, shards) if total * i // shards > 0))
+            split_keys = []
+            if not positions:
+                return split_keys
+            # one pass over the keys in keyset order, instead of a skip query per split
+            cursor = data_collection.find(query, {NODE_TYPE: 1, NODE_ID: 1}).sort([(SUBMISSION_ID, 1), (NODE_TYPE, 1), (NODE_ID, 1), (ID, 1)]).limit(positions[-1] + 1)
+            for position, record in enumerate(cursor):
+                if position == positions[len(split_keys)]:
+                    split_keys.append(record_key(record))
+                    if len(split_keys) == len(positions):
+                        break
+            return split_keys
         except errors.PyMongoError as pe:
             self.log.exception(pe)
-            self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
+            self.log.exception(f"{submission_id}: Failed to split data records, {get_exception_msg()}")
             return None
         except Exception as e:
             self.log.exception(e)
-            self.log.exception(f"{submission_id}: Failed to retrieve data records, {get_exception_msg()}")
-            return None 
+            self.log.exception(f"{submission_id}: Failed to split data records, {get_exception_msg()}")
+            return None
 
     """
     retrieve dataRecord by nodeID
@@ -621,6 +721,52 @@ class MongoDao:
             self.log.exception(f"{submission_id}: Failed to retrieve child nodes: {get_exception_msg()}")
             return False, None
     """
+    find submissions of a study in status, other than the submission
+    :return: list of submissions, None if failed
+    """
+    def find_other_submissions_in_status(self, submission_id, studyID, data_common, status_list):
+        db = self.client[self.db_name]
+        data_collection = db[SUBMISSION_COLLECTION]
+        query = {STUDY_ID: studyID, SUBMISSION_STATUS: {"$in": status_list}, ID: {"$ne": submission_id}}
+        if data_common:
+            query[DATA_COMMON_NAME] = data_common
+        try:
+            return list(data_collection.find(query))
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to retrieve other submissions of the study: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to retrieve other submissions of the study: {get_exception_msg()}")
+            return None
+
+    """
+    find nodes in submissions, one query per node type
+    :param data_common: data commons
+    :param submission_ids: IDs of submissions
+    :param node_ids_by_type: dict of nodeType -> node IDs
+    :return: list of nodes with nodeType, nodeID and submissionID, None if failed
+    """
+    def find_nodes_in_submissions(self, data_common, submission_ids, node_ids_by_type):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        try:
+            nodes = []
+            for node_type, node_ids in node_ids_by_type.items():
+                nodes.extend(data_collection.find({DATA_COMMON_NAME: data_common, SUBMISSION_ID: {"$in": list(submission_ids)},
+                                                   NODE_TYPE: node_type, NODE_ID: {"$in": list(node_ids)}},
+                                                  {NODE_TYPE: 1, NODE_ID: 1, SUBMISSION_ID: 1}))
+            return nodes
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to find nodes in submissions {submission_ids}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to find nodes in submissions {submission_ids}: {get_exception_msg()}")
+            return None
+    """
     find submission by query
     """
     def find_submissions(self, query):
@@ -639,7 +785,7 @@ class MongoDao:
     """
     set dataRecords search index, 'submissionID_nodeType_nodeID'
     """
-    def set_search_index_dataRecords(self, submission_index, crdc_index, study_entity_type_index):
+    def set_search_index_dataRecords(self, submission_index, crdc_index, study_entity_type_index, keyset_index=None):
         db = self.client[self.db_name]
         data_collection = db[DATA_COLlECTION]
         try:
@@ -647,6 +793,10 @@ class MongoDao:
             if not index_dict.get(submission_index):
                 result = data_collection.create_index([(SUBMISSION_ID), (NODE_TYPE),(NODE_ID)], \
                             name=submission_index)
+            if keyset_index and not index_dict.get(keyset_index):
+                # index for keyset pagination of dataRecords in a submission
+                result = data_collection.create_index([(SUBMISSION_ID), (NODE_TYPE), (NODE_ID), (ID)], \
+                            name=keyset_index)
             if not index_dict.get(crdc_index):
                 result = data_collection.create_index([(DATA_COMMON_NAME), (NODE_TYPE),(NODE_ID)], \
                             name=crdc_index)
@@ -888,6 +1038,55 @@ class MongoDao:
             self.log.exception(f"Failed to find release record for {data_commons}/{node_type}/{node_id}: {get_exception_msg()}")
             return False
    
+    def search_released_nodes_by_ids(self, data_commons, node_ids_by_type, fields=None):
+        """
+        Search release collection for nodes of given types and IDs in one query
+        :param data_commons:
+        :param node_ids_by_type: dict of nodeType and list of nodeIDs
+        :param fields: fields returned besides nodeType and nodeID, none if None
+        :return: list of released nodes with nodeType, nodeID and the fields, None if failed
+        """
+        db = self.client[self.db_name]
+        data_collection = db[RELEASE_COLLECTION]
+        query = [{DATA_COMMON_NAME: data_commons, NODE_TYPE: node_type, NODE_ID: {"$in": list(node_ids)}}
+                 for node_type, node_ids in node_ids_by_type.items() if node_ids]
+        projection = {NODE_TYPE: 1, NODE_ID: 1, **{field: 1 for field in fields or []}}
+        try:
+            return list(data_collection.find({"$or": query}, projection)) if len(query) > 0 else []
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to find release records for {data_commons}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to find release records for {data_commons}: {get_exception_msg()}")
+            return None
+
+    def search_released_nodes_with_status(self, data_commons, node_ids_by_type, status):
+        """
+        Search release collection for nodes of given types and IDs with status, one query per node type
+        :param data_commons:
+        :param node_ids_by_type: dict of nodeType and list of nodeIDs
+        :param status: list of release status
+        :return: list of released nodes, None if failed
+        """
+        db = self.client[self.db_name]
+        data_collection = db[RELEASE_COLLECTION]
+        try:
+            released_nodes = []
+            for node_type, node_ids in node_ids_by_type.items():
+                if node_ids:
+                    released_nodes.extend(data_collection.find({DATA_COMMON_NAME: data_commons, NODE_TYPE: node_type, NODE_ID: {"$in": list(node_ids)}, SUBMISSION_REL_STATUS: {"$in": status}}))
+            return released_nodes
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to find release records for {data_commons}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to find release records for {data_commons}: {get_exception_msg()}")
+            return None
+
     def search_released_node_with_status(self, data_commons, node_type, node_id, status):
         """
         Search release collection for given node with status
@@ -1026,6 +1225,152 @@ class MongoDao:
             self.log.exception(f"Failed to update validation status for {validation_id}: {get_exception_msg()}")
             return False
     """
+    get checkpoint of the metadata validation
+    :param validation_id: validation ID
+    :return: checkpoint, empty dict if the validation has no checkpoint, None if failed
+    """
+    def get_validation_checkpoint(self, validation_id):
+        db = self.client[self.db_name]
+        data_collection = db[VALIDATION_COLLECTION]
+        try:
+            validation_document = data_collection.find_one({ID: validation_id}, {METADATA_CHECKPOINT: 1})
+            return (validation_document.get(METADATA_CHECKPOINT) or {}) if validation_document else {}
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to get validation checkpoint for {validation_id}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to get validation checkpoint for {validation_id}: {get_exception_msg()}")
+            return None
+
+    """
+    set fields of the checkpoint of the metadata validation
+    :param validation_id: validation ID
+    :param fields: dict of checkpoint fields, nested fields in dot notation
+    :return: True if updated
+    """
+    def set_validation_checkpoint(self, validation_id, fields):
+        db = self.client[self.db_name]
+        data_collection = db[VALIDATION_COLLECTION]
+        try:
+            data_collection.update_one({ID: validation_id}, {"$set": {f"{METADATA_CHECKPOINT}.{key}": value for key, value in fields.items()}})
+            return True
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to set validation checkpoint for {validation_id}: {get_exception_msg()}")
+            return False
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to set validation checkpoint for {validation_id}: {get_exception_msg()}")
+            return False
+
+    """
+    remove the checkpoint of the metadata validation
+    :param validation_id: validation ID
+    :return: True if removed
+    """
+    def clear_validation_checkpoint(self, validation_id):
+        db = self.client[self.db_name]
+        data_collection = db[VALIDATION_COLLECTION]
+        try:
+            data_collection.update_one({ID: validation_id}, {"$unset": {METADATA_CHECKPOINT: ""}})
+            return True
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to clear validation checkpoint for {validation_id}: {get_exception_msg()}")
+            return False
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to clear validation checkpoint for {validation_id}: {get_exception_msg()}")
+            return False
+
+    """
+    get completion tracker of the shards of the metadata validation
+    :param validation_id: validation ID
+    :return: tracker, empty dict if the validation is not fanned out, None if failed
+    """
+    def get_validation_shards(self, validation_id):
+        db = self.client[self.db_name]
+        data_collection = db[VALIDATION_COLLECTION]
+        try:
+            validation_document = data_collection.find_one({ID: validation_id}, {METADATA_SHARDS: 1})
+            return (validation_document.get(METADATA_SHARDS) or {}) if validation_document else {}
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to get validation shards for {validation_id}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to get validation shards for {validation_id}: {get_exception_msg()}")
+            return None
+
+    """
+    start completion tracker of the shards of the metadata validation, unless it is started already
+    :param validation_id: validation ID
+    :param tracker: tracker of the shards
+    :return: True if started, False if started already or failed
+    """
+    def start_validation_shards(self, validation_id, tracker):
+        db = self.client[self.db_name]
+        data_collection = db[VALIDATION_COLLECTION]
+        try:
+            result = data_collection.update_one({ID: validation_id, METADATA_SHARDS: {"$exists": False}}, {"$set": {METADATA_SHARDS: tracker}})
+            return result.modified_count > 0
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to start validation shards for {validation_id}: {get_exception_msg()}")
+            return False
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to start validation shards for {validation_id}: {get_exception_msg()}")
+            return False
+
+    """
+    add the results of a shard to the completion tracker of the metadata validation, once per shard
+    :param validation_id: validation ID
+    :param shard_index: index of the shard
+    :return: tracker after the shard is added, empty dict if the shard is added already, None if failed
+    """
+    def complete_validation_shard(self, validation_id, shard_index, total, validated, is_error, is_warning):
+        db = self.client[self.db_name]
+        data_collection = db[VALIDATION_COLLECTION]
+        try:
+            validation_document = data_collection.find_one_and_update(
+                {ID: validation_id, f"{METADATA_SHARDS}.{SHARDS_DONE}": {"$ne": shard_index}},
+                {"$addToSet": {f"{METADATA_SHARDS}.{SHARDS_DONE}": shard_index},
+                 "$inc": {f"{METADATA_SHARDS}.{TOTAL}": total, f"{METADATA_SHARDS}.{VALIDATED}": validated},
+                 "$max": {f"{METADATA_SHARDS}.{IS_ERROR}": bool(is_error), f"{METADATA_SHARDS}.{IS_WARNING}": bool(is_warning)}},
+                projection={METADATA_SHARDS: 1}, return_document=ReturnDocument.AFTER)
+            return validation_document.get(METADATA_SHARDS) if validation_document else {}
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to complete validation shard {shard_index} of {validation_id}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to complete validation shard {shard_index} of {validation_id}: {get_exception_msg()}")
+            return None
+
+    """
+    count new dataRecords of a submission up to a key in keyset pagination order
+    :return: number of records, None if failed
+    """
+    def count_new_dataRecords_not_after(self, submission_id, key):
+        db = self.client[self.db_name]
+        data_collection = db[DATA_COLlECTION]
+        try:
+            return data_collection.count_documents({"$and": [{SUBMISSION_ID: submission_id, STATUS: STATUS_NEW}, keyset_not_after(key)]})
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"{submission_id}: Failed to count new data records, {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"{submission_id}: Failed to count new data records, {get_exception_msg()}")
+            return None
+
+    """
     get bucket name based on dataCommons and type
     """   
     def get_bucket_name(self, type, dataCommon):
@@ -1137,6 +1482,70 @@ class MongoDao:
             self.log.exception(f"Failed to get permissible values for {cde_code}/{cde_version}: {get_exception_msg()}")
             return None
     """
+    get generation of CDE collection, the latest updatedAt
+    """
+    def get_cde_generation(self):
+        db = self.client[self.db_name]
+        data_collection = db[CDE_COLLECTION]
+        try:
+            cde = data_collection.find_one({}, {UPDATED_AT: 1}, sort=[(UPDATED_AT, DESCENDING)])
+            return cde.get(UPDATED_AT) if cde else None
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to get generation of CDE collection: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to get generation of CDE collection: {get_exception_msg()}")
+            return None
+    """
+    get generation of the release collection for a study, to tell if released nodes of the study changed
+    :param data_commons: data commons
+    :param study_id: study ID
+    :return: [number of released nodes, latest updatedAt, latest createdAt], None if failed
+    """
+    def get_release_generation(self, data_commons, study_id):
+        db = self.client[self.db_name]
+        data_collection = db[RELEASE_COLLECTION]
+        pipeline = [
+            {"$match": {DATA_COMMON_NAME: data_commons, STUDY_ID: study_id}},
+            {"$group": {ID: None, "count": {"$sum": 1}, UPDATED_AT: {"$max": f"${UPDATED_AT}"}, CREATED_AT: {"$max": f"${CREATED_AT}"}}}
+        ]
+        try:
+            result = list(data_collection.aggregate(pipeline, allowDiskUse=True))
+            return [result[0]["count"], result[0].get(UPDATED_AT), result[0].get(CREATED_AT)] if result else [0, None, None]
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to get generation of release collection for {data_commons}/{study_id}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to get generation of release collection for {data_commons}/{study_id}: {get_exception_msg()}")
+            return None
+
+    """
+    get generation of collections of permissible values, synonyms and concept codes, the number of documents and latest updatedAt
+    :param collection_names: names of collections
+    :return: list of [number of documents, latest updatedAt] of the collections, None if failed
+    """
+    def get_collections_generation(self, collection_names):
+        db = self.client[self.db_name]
+        try:
+            generation = []
+            for collection_name in collection_names:
+                data_collection = db[collection_name]
+                latest = data_collection.find_one({}, {UPDATED_AT: 1}, sort=[(UPDATED_AT, DESCENDING)])
+                generation.append([data_collection.estimated_document_count(), latest.get(UPDATED_AT) if latest else None])
+            return generation
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to get generation of collections {collection_names}: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to get generation of collections {collection_names}: {get_exception_msg()}")
+            return None
+    """
     get qc record by qc_id
     :param qc_id:
     """
@@ -1154,6 +1563,25 @@ class MongoDao:
             self.log.exception(f"Failed to get qc record for {qc_id}: {get_exception_msg()}")
             return None
 
+    """
+    get qc records by qc_id list in one query
+    :param qc_ids: list of qc_id
+    :return: dict of qc_id and qc record, None if failed
+    """
+    def get_qcRecords(self, qc_ids):
+        db = self.client[self.db_name]
+        data_collection = db[QC_COLLECTION]
+        try:
+            return {qc_record[ID]: qc_record for qc_record in data_collection.find({ID: {"$in": list(qc_ids)}})}
+        except errors.PyMongoError as pe:
+            self.log.exception(pe)
+            self.log.exception(f"Failed to get qc records: {get_exception_msg()}")
+            return None
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f"Failed to get qc records: {get_exception_msg()}")
+            return None
+
     """
     delete qc record by qc_id
     :param qc_id:
@@ -1184,11 +1612,11 @@ class MongoDao:
             return True if result.deleted_count > 0 else False
         except errors.PyMongoError as pe:
             self.log.exception(pe)
-            self.log.exception(f"Failed to delete qc record for {qc_id}: {get_exception_msg()}")
+            self.log.exception(f"Failed to delete qc record for {qc_ids}: {get_exception_msg()}")
             return False
         except Exception as e:
             self.log.exception(e)
-            self.log.exception(f"Failed to delete qc record for {qc_id}: {get_exception_msg()}")
+            self.log.exception(f"Failed to delete qc record for {qc_ids}: {get_exception_msg()}")
             return False
 
     """
@@ -1437,4 +1865,28 @@ def remove_id (data_record):
         if k == ID:
             continue
         data[k] = data_record[k]
-    return data
\ No newline at end of file
+    return data
+
+"""
+get keyset pagination key of a dataRecord
+"""
+def record_key(record):
+    return (record.get(NODE_TYPE), record.get(NODE_ID), record.get(ID))
+
+"""
+query of records after the key in (nodeType, nodeID, _id) order
+"""
+def keyset_after(key):
+    node_type, node_id, _id = key
+    return {"$or": [{NODE_TYPE: {"$gt": node_type}},
+                    {NODE_TYPE: node_type, NODE_ID: {"$gt": node_id}},
+                    {NODE_TYPE: node_type, NODE_ID: node_id, ID: {"$gt": _id}}]}
+
+"""
+query of records not after the key in (nodeType, nodeID, _id) order
+"""
+def keyset_not_after(key):
+    node_type, node_id, _id = key
+    return {"$or": [{NODE_TYPE: {"$lt": node_type}},
+                    {NODE_TYPE: node_type, NODE_ID: {"$lt": node_id}},
+                    {NODE_TYPE: node_type, NODE_ID: node_id, ID: {"$lte": _id}}]}
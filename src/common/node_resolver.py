@@ -0,0 +1,365 @@
+from collections import defaultdict
+from bento.common.utils import get_logger
+from common.constants import NODE_TYPE, NODE_ID, PROPERTIES, PARENTS, PARENT_TYPE, PARENT_ID_NAME, PARENT_ID_VAL, \
+    DATA_COMMON_NAME, CONSENT_CODE_NODE_TYPE
+
+class ParentNodeResolver:
+    """
+    Resolve parent nodes referenced by a chunk of dataRecords with a few bulk queries,
+    instead of querying dataRecords and the release collection for every record.
+    Parents not covered by the prefetch (or if a bulk query failed) are left to the caller to query one by one.
+    """
+    def __init__(self, mongo_dao, submission_id):
+        self.log = get_logger('Parent Node Resolver')
+        self.mongo_dao = mongo_dao
+        self.submission_id = submission_id
+        self._reset()
+
+    def _reset(self):
+        # (nodeType, nodeID) of parents searched in the submission -> found nodes
+        self.nodes = {}
+        # (dataCommons, nodeType, nodeID) of parents searched in the release collection -> released or not
+        self.released = {}
+
+    """
+    prefetch parents of all records in the chunk, replacing parents of the previous chunk
+    :param data_records: chunk of dataRecords
+    """
+    def prefetch(self, data_records):
+        self._reset()
+        requested = defaultdict(set)
+        data_commons = {}
+        for record in data_records:
+            for parent in record.get(PARENTS) or []:
+                key = parent_key(parent)
+                if key:
+                    try:
+                        data_commons.setdefault(key, set()).add(record.get(DATA_COMMON_NAME))
+                    except TypeError:
+                        # unhashable ID value, left to the caller
+                        continue
+                    requested[key[0]].add(key[1])
+        if not requested:
+            return
+
+        found_nodes = self.mongo_dao.search_nodes_by_type_and_ids(requested, self.submission_id)
+        if found_nodes is None:
+            return
+        nodes = {(node_type, node_id): [] for node_type, node_ids in requested.items() for node_id in node_ids}
+        for node in found_nodes:
+            key = (node.get(NODE_TYPE), node.get(NODE_ID))
+            if key in nodes:
+                nodes[key].append(node)
+        self.nodes = nodes
+
+        # parents not in the submission are searched in the release collection by data commons
+        released_requested = defaultdict(lambda: defaultdict(set))
+        for key, node_list in nodes.items():
+            if not node_list:
+                for data_common in data_commons[key]:
+                    released_requested[data_common][key[0]].add(key[1])
+        for data_common, node_ids_by_type in released_requested.items():
+            released_nodes = self.mongo_dao.search_released_nodes_by_ids(data_common, node_ids_by_type)
+            if released_nodes is None:
+                continue
+            for node_type, node_ids in node_ids_by_type.items():
+                for node_id in node_ids:
+                    self.released[(data_common, node_type, node_id)] = False
+            for node in released_nodes:
+                key = (data_common, node.get(NODE_TYPE), node.get(NODE_ID))
+                if key in self.released:
+                    self.released[key] = True
+
+    """
+    get (nodeType, property name, property value) of the existing parent nodes of a record
+    :param data_record_parent_nodes: parents of the record
+    :return: list of tuples, None if any parent is not prefetched
+    """
+    def get_parent_nodes(self, data_record_parent_nodes):
+        keys = []
+        for parent in data_record_parent_nodes:
+            key = parent_key(parent)
+            if key:
+                try:
+                    if key not in self.nodes:
+                        return None
+                except TypeError:
+                    return None
+                if key not in keys:
+                    keys.append(key)
+        parent_node_cache = []
+        for key in keys:
+            for node in self.nodes[key]:
+                if node.get(PROPERTIES):
+                    for prop, value in node[PROPERTIES].items():
+                        parent_node_cache.append(tuple([node.get(NODE_TYPE), prop, value]))
+        return parent_node_cache
+
+    """
+    check if a parent node is released
+    :return: True or False, None if the parent is not prefetched
+    """
+    def is_released(self, data_common, node_type, node_id):
+        try:
+            return self.released.get((data_common, node_type, node_id))
+        except TypeError:
+            return None
+
+class ConsentGroupResolver:
+    """
+    Resolve consent groups of the ancestors of file nodes, memoized for the whole validation,
+    since files share the same few samples and participants.
+    Ancestors are searched level by level, the nodes of a level with one query per collection,
+    and a node is never searched twice, so cycles in the ancestry end.
+    Ancestors with unhashable ID values are left to the caller to search one by one.
+    """
+    def __init__(self, mongo_dao, submission_id, data_commons):
+        self.log = get_logger('Consent Group Resolver')
+        self.mongo_dao = mongo_dao
+        self.submission_id = submission_id
+        self.data_commons = data_commons
+        # (nodeType, nodeID) -> list of (parentType, parentIDPropName, parentIDValue), None if no parents
+        self.parents = {}
+        # (nodeType, nodeID) -> set of consent groups (parentType, parentIDPropName, parentIDValue) of the ancestors
+        self.consent_groups = {}
+        # (nodeType, nodeID) of consent groups -> consent group node, False if not found
+        self.consent_group_nodes = {}
+
+    """
+    prefetch ancestors and consent groups of all file records in the chunk
+    :param data_records: chunk of dataRecords
+    :param file_nodes: file node types of the model
+    """
+    def prefetch(self, data_records, file_nodes):
+        keys = set()
+        for record in data_records:
+            if record.get(NODE_TYPE) not in file_nodes:
+                continue
+            for parent in record.get(PARENTS) or []:
+                key = hashable_key(parent.get(PARENT_TYPE), parent.get(PARENT_ID_VAL))
+                if key:
+                    keys.add(key)
+        if not keys:
+            return
+        self.prefetch_ancestors(keys)
+        groups = set()
+        for key in keys:
+            consent_groups = self.get_consent_groups(*key)
+            if consent_groups:
+                groups.update(consent_groups)
+        self.prefetch_consent_group_nodes(groups)
+
+    """
+    search parents of the nodes, then parents of their parents, level by level
+    """
+    def prefetch_ancestors(self, keys):
+        level = set(key for key in keys if key not in self.parents)
+        while level:
+            parents = self.search_parents(level)
+            if parents is None:
+                return
+            self.parents.update(parents)
+            next_level = set()
+            for key in level:
+                node_parents = self.parents[key]
+                # ancestors of consent groups are not needed
+                if not node_parents or any(parent[0] == CONSENT_CODE_NODE_TYPE for parent in node_parents):
+                    continue
+                for parent in node_parents:
+                    parent_key = hashable_key(parent[0], parent[2])
+                    if parent_key and parent_key not in self.parents:
+                        next_level.add(parent_key)
+            level = next_level
+
+    """
+    search parents of nodes in the submission, or in the release collection if not found or without parents
+    :return: dict of (nodeType, nodeID) and list of parents or None, None if failed
+    """
+    def search_parents(self, keys):
+        results = {key: None for key in keys}
+        nodes = self.mongo_dao.search_nodes_by_type_and_ids(ids_by_type(keys), self.submission_id, [PARENTS])
+        if nodes is None:
+            return None
+        for key, node in first_nodes(nodes, keys).items():
+            if node.get(PARENTS):
+                results[key] = parent_tuples(node)
+        missing = [key for key, parents in results.items() if parents is None]
+        if missing:
+            released_nodes = self.mongo_dao.search_released_nodes_by_ids(self.data_commons, ids_by_type(missing), [PARENTS])
+            if released_nodes is None:
+                return None
+            for key, node in first_nodes(released_nodes, missing).items():
+                if node.get(PARENTS):
+                    results[key] = parent_tuples(node)
+        return results
+
+    """
+    get consent groups of the ancestors of a parent of a file node,
+    consent groups of the nearest ancestor level having consent groups, for every path
+    :return: set of (parentType, parentIDPropName, parentIDValue), None if the parent can't be resolved
+    """
+    def get_consent_groups(self, parent_type, parent_id_value, visiting=None):
+        key = hashable_key(parent_type, parent_id_value)
+        if key is None:
+            return None
+        if key in self.consent_groups:
+            return self.consent_groups[key]
+        visiting = visiting if visiting is not None else set()
+        if key in visiting:
+            # cycle in the ancestry
+            return set()
+        visiting.add(key)
+        if key not in self.parents:
+            self.prefetch_ancestors([key])
+        node_parents = self.parents.get(key)
+        groups = set()
+        if node_parents:
+            consent_groups = [parent for parent in node_parents if parent[0] == CONSENT_CODE_NODE_TYPE]
+            if consent_groups:
+                groups.update(consent_groups)
+            else:
+                for parent in node_parents:
+                    parent_groups = self.get_consent_groups(parent[0], parent[2], visiting)
+                    if parent_groups is None:
+                        return None
+                    groups.update(parent_groups)
+        visiting.discard(key)
+        if key in self.parents:
+            self.consent_groups[key] = groups
+        return groups
+
+    """
+    search consent group nodes in the submission, or in the release collection if not found
+    """
+    def prefetch_consent_group_nodes(self, consent_groups):
+        keys = set()
+        for group in consent_groups:
+            key = hashable_key(group[0], group[2])
+            if key and key not in self.consent_group_nodes:
+                keys.add(key)
+        if not keys:
+            return
+        nodes = self.mongo_dao.search_nodes_by_type_and_ids(ids_by_type(keys), self.submission_id)
+        if nodes is None:
+            return
+        found = first_nodes(nodes, keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            released_nodes = self.mongo_dao.search_released_nodes_by_ids(self.data_commons, ids_by_type(missing), [PROPERTIES])
+            if released_nodes is None:
+                return
+            found.update(first_nodes(released_nodes, missing))
+        for key in keys:
+            self.consent_group_nodes[key] = found.get(key, False)
+
+    """
+    get consent group node
+    :param consent_group: (parentType, parentIDPropName, parentIDValue)
+    :return: consent group node, False if not found, None if the consent group can't be resolved
+    """
+    def get_consent_group_node(self, consent_group):
+        key = hashable_key(consent_group[0], consent_group[2])
+        if key is None:
+            return None
+        if key not in self.consent_group_nodes:
+            self.prefetch_consent_group_nodes([consent_group])
+        return self.consent_group_nodes.get(key)
+
+"""
+get (nodeType, nodeID) if hashable, None otherwise
+"""
+def hashable_key(node_type, node_id):
+    key = (node_type, node_id)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+"""
+group (nodeType, nodeID) by nodeType
+"""
+def ids_by_type(keys):
+    node_ids_by_type = defaultdict(set)
+    for node_type, node_id in keys:
+        node_ids_by_type[node_type].add(node_id)
+    return node_ids_by_type
+
+"""
+get the first node found of each (nodeType, nodeID), as find_one returns
+"""
+def first_nodes(nodes, keys):
+    keys = set(keys)
+    found = {}
+    for node in nodes:
+        key = (node.get(NODE_TYPE), node.get(NODE_ID))
+        if key in keys and key not in found:
+            found[key] = node
+    return found
+
+"""
+convert parents of a node to tuples (parentType, parentIDPropName, parentIDValue)
+"""
+def parent_tuples(node):
+    return [(parent.get(PARENT_TYPE), parent.get(PARENT_ID_NAME), parent.get(PARENT_ID_VAL)) for parent in node[PARENTS]]
+
+"""
+get (nodeType, nodeID) of a parent reference, None if the parent can't be searched
+"""
+def parent_key(parent):
+    parent_type = parent.get(PARENT_TYPE)
+    parent_id_value = parent.get(PARENT_ID_VAL)
+    if not parent_type or not parent.get(PARENT_ID_NAME) or not parent_id_value:
+        return None
+    return (parent_type, parent_id_value)
+
+class ReleasedNodeResolver:
+    """
+    Resolve released nodes of a chunk of dataRecords with one query per node type,
+    instead of querying the release collection for every record.
+    Nodes not covered by the prefetch (or if the bulk query failed) are left to the caller to query one by one.
+    """
+    def __init__(self, mongo_dao, data_commons, status):
+        self.log = get_logger('Released Node Resolver')
+        self.mongo_dao = mongo_dao
+        self.data_commons = data_commons
+        self.status = status
+        # (nodeType, nodeID) of records -> released node, False if not released
+        self.released = {}
+
+    """
+    prefetch released nodes of all records in the chunk, replacing released nodes of the previous chunk
+    :param data_records: chunk of dataRecords
+    """
+    def prefetch(self, data_records):
+        self.released = {}
+        requested = defaultdict(set)
+        for record in data_records:
+            node_type, node_id = record.get(NODE_TYPE), record.get(NODE_ID)
+            try:
+                requested[node_type].add(node_id)
+            except TypeError:
+                # unhashable ID value, left to the caller
+                continue
+        if not requested:
+            return
+        released_nodes = self.mongo_dao.search_released_nodes_with_status(self.data_commons, requested, self.status)
+        if released_nodes is None:
+            return
+        released = {(node_type, node_id): False for node_type, node_ids in requested.items() for node_id in node_ids}
+        for node in released_nodes:
+            key = (node.get(NODE_TYPE), node.get(NODE_ID))
+            # the first node found, as find_one returns
+            if released.get(key) is False:
+                released[key] = node
+        self.released = released
+
+    """
+    get released node of a record
+    :return: released node, False if not released, None if the record is not prefetched
+    """
+    def get_released_node(self, node_type, node_id):
+        try:
+            return self.released.get((node_type, node_id))
+        except TypeError:
+            return None
@@ -0,0 +1,75 @@
+from common.constants import DELETE_COMMAND
+
+class PermissibleValueMatcher:
+    """
+    Permissible values of a property compiled once for O(1) lookup.
+    String values are matched case-insensitively and corrected to the permissible value of the right case,
+    other values are matched exactly. The delete command is always permitted.
+    The matcher never changes after it is built, so it can be shared by validations.
+    """
+    def __init__(self, permissible_values):
+        self.permissible_values = permissible_values if permissible_values else []
+        # the delete command is matched last, as if appended to the permissible values
+        self.values = list(self.permissible_values) + [DELETE_COMMAND] if self.permissible_values else []
+        self.is_string = len(self.values) > 0 and isinstance(self.values[0], str)
+        try:
+            self.exact = set(self.values)
+        except TypeError:
+            self.exact = None
+        # lower case value -> first permissible value in list order
+        self.folded = None
+        if self.is_string and all(isinstance(item, str) for item in self.values):
+            self.folded = {}
+            for item in self.values:
+                self.folded.setdefault(item.lower(), item)
+
+    def __len__(self):
+        return len(self.permissible_values)
+
+    def contains(self, value):
+        if self.exact is not None:
+            try:
+                return value in self.exact
+            except TypeError:
+                pass
+        return value in self.values
+
+    """
+    match a value
+    :param value: stripped value
+    :return: matched or not, corrected value
+    """
+    def match(self, value):
+        if not self.is_string:
+            return self.contains(value), value
+        key = str(value).lower()
+        if self.folded is not None:
+            matched_val = self.folded.get(key)
+        else:
+            matched_val = next((item for item in self.values if item.lower() == key), None)
+        if not matched_val:
+            return False, value
+        # if found, check if value in pv list in case-sensitive, otherwise return the value with correct case
+        return True, value if self.contains(value) else matched_val
+
+    """
+    match each item of a list value
+    :param value: property value
+    :param list_delimiter: list delimiter of the model
+    :return: list of (stripped item, matched or not, corrected item)
+    """
+    def match_items(self, value, list_delimiter):
+        val = str(value)
+        arr = val.split(list_delimiter) if list_delimiter in val else [value]
+        results = []
+        for item in arr:
+            item = item.strip() if item and isinstance(item, str) else item
+            matched, corrected_value = self.match(item)
+            results.append((item, matched, corrected_value))
+        return results
+
+    """
+    get the first permissible value in the suggested values
+    """
+    def first_of(self, suggested_values):
+        return next((item for item in self.values if item in suggested_values), None)
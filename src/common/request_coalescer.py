@@ -0,0 +1,96 @@
+import json
+import threading
+from bento.common.utils import get_logger
+from common.constants import SQS_TYPE, SUBMISSION_ID, SCOPE, VALIDATION_ID
+
+class RequestGroup:
+    """
+    Queued requests of the same submission, scope and validation type, processed by a single run.
+    The latest request is the primary one, earlier requests are superseded by it.
+    """
+    def __init__(self, coalescer, key, msg, extender, data):
+        self.coalescer = coalescer
+        self.key = key
+        self.msg = msg
+        self.extender = extender
+        self.data = data
+        self.superseded = []
+
+    def add(self, msg, extender, data):
+        self.superseded.append((self.msg, self.extender, self.data))
+        self.msg, self.extender, self.data = msg, extender, data
+
+    """
+    validation IDs of all requests in the group, in arrival order
+    """
+    @property
+    def validation_ids(self):
+        ids = [data.get(VALIDATION_ID) for _, _, data in self.superseded if data] + [self.data.get(VALIDATION_ID) if self.data else None]
+        return [validation_id for validation_id in ids if validation_id]
+
+    """
+    mark the group as started, requests received from now on will be processed by a new run
+    """
+    def start(self):
+        self.coalescer.remove(self)
+        if self.superseded:
+            self.coalescer.log.info(f'{len(self.superseded)} request(s) of {self.key} are superseded by the latest request.')
+        return self
+
+    """
+    delete all messages of the group from the queue
+    """
+    def delete(self):
+        for msg, _, _ in self.superseded:
+            msg.delete()
+        self.msg.delete()
+
+    """
+    stop visibility extension of all messages in the group
+    """
+    def stop(self):
+        for _, extender, _ in self.superseded + [(self.msg, self.extender, self.data)]:
+            if extender:
+                extender.stop()
+
+class RequestCoalescer:
+    """
+    Collapse queued requests of the same submission, scope and validation type.
+    If a request is waiting to be processed, a newer request of the same kind joins it instead of triggering another run.
+    A request that arrives while a run is in progress starts a new group, since data may have changed after the run started.
+    """
+    def __init__(self, types):
+        self.log = get_logger('Request Coalescer')
+        self.types = types
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    """
+    add a received message
+    :param msg: queue message
+    :param extender: visibility extension handle of the message
+    :return: new request group to be dispatched, or None if the message joined a pending group
+    """
+    def add(self, msg, extender):
+        data = None
+        key = None
+        try:
+            data = json.loads(msg.body)
+            if data.get(SQS_TYPE) in self.types and data.get(SUBMISSION_ID):
+                key = (data[SQS_TYPE], data[SUBMISSION_ID], data.get(SCOPE))
+        except Exception as e:
+            # invalid messages are handled by the message handler
+            self.log.debug(f"Message not coalesced: {e}")
+        with self.lock:
+            if key and key in self.pending:
+                self.pending[key].add(msg, extender, data)
+                return None
+            group = RequestGroup(self, key, msg, extender, data)
+            if key:
+                self.pending[key] = group
+            return group
+
+    def remove(self, group):
+        with self.lock:
+            if group.key and self.pending.get(group.key) is group:
+                del self.pending[group.key]
@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 import boto3
 import json
-from threading import Timer
+import time
+from threading import Thread, Condition
 
 from bento.common.utils import get_logger
 
@@ -19,47 +20,139 @@ class Queue:
                                            MessageDeduplicationId=msg_id)
         self.log.debug(response.get('MessageId'))
 
-    def receiveMsgs(self, visibilityTimeOut):
+    def receiveMsgs(self, visibilityTimeOut, max_msgs=1):
         return self.queue.receive_messages(VisibilityTimeout = visibilityTimeOut,
                                            WaitTimeSeconds = self.long_pull_time,
-                                           MaxNumberOfMessages = 1)
+                                           MaxNumberOfMessages = max_msgs)
 
     def getApproximateNumberOfMessages(self):
         return self.queue.attributes.get('ApproximateNumberOfMessages', -1)
 
-# Automatically extend visibility timeout every timeOutValue // 2 seconds
-class VisibilityExtender:
-    def __init__(self, msg, timeOutValue):
-        self._timeOutValue = timeOutValue if timeOutValue > 2 else 2
-        self._currentTimeOut = self._timeOutValue
-        self._interval = int(timeOutValue // 2) if timeOutValue > 2 else 1
-        self._msg = msg
-        self._timer = None
-        self.is_running = False
-        self.log = get_logger('Visibility Extender')
-        self.start()
+# SQS limits visibility of a message to 12 hours from when it is received
+MAX_VISIBILITY_TIMEOUT = 43200
+MAX_BATCH_ENTRIES = 10
+VISIBILITY_GROWTH = 2
+# seconds to wait before retrying failed extensions
+RETRY_INTERVAL = 1
+# the message was deleted, or its visibility timeout already expired
+RECEIPT_HANDLE_IS_INVALID = "ReceiptHandleIsInvalid"
+
+class VisibilityManager:
+    """
+    Extend visibility timeout of all in-flight messages from one background thread.
+    A message is extended once half of its current timeout has passed, the new timeout grows by VISIBILITY_GROWTH
+    up to max_timeout, so long running jobs need fewer calls. Extensions are sent with change_message_visibility_batch.
+    Messages register with register(msg), which returns a handle to stop the extension, also usable as a context manager.
+    Messages failed to extend keep their timeout and are retried after RETRY_INTERVAL, unless their receipt handle is invalid.
+    """
+    def __init__(self, timeout, max_timeout=MAX_VISIBILITY_TIMEOUT, clock=time.monotonic):
+        self.log = get_logger('Visibility Manager')
+        self.clock = clock
+        self.timeout = max(timeout, 2)
+        self.max_timeout = min(max_timeout, MAX_VISIBILITY_TIMEOUT)
+        self.condition = Condition()
+        self.messages = {}
+        self.thread = None
+
+    """
+    register a message for visibility extension
+    :param msg: sqs message
+    :return: handle of the registered message
+    """
+    def register(self, msg):
+        handle = VisibilityHandle(self, msg)
+        now = self.clock()
+        with self.condition:
+            self.messages[id(handle)] = {"key": id(handle), "msg": msg, "timeout": self.timeout, "received_at": now, "extended_at": now}
+            if not self.thread or not self.thread.is_alive():
+                self.thread = Thread(target=self._run, name='Visibility Manager', daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+        return handle
+
+    def deregister(self, handle):
+        with self.condition:
+            self.messages.pop(id(handle), None)
 
     def _run(self):
-        try:
-            if self._msg:
-                self.is_running = False
-                self.start()
-                self._currentTimeOut += self._interval
-                self.log.info('Processing job ..., visibility timeout = {}s'.format(self._currentTimeOut))
-                self._msg.change_visibility(VisibilityTimeout = self._currentTimeOut)
-        except Exception as e:
-            self.log.exception(e)
-
-
-    def start(self):
-        if not self.is_running:
-            self._timer = Timer(self._interval, self._run)
-            self._timer.start()
-            self.is_running = True
+        while True:
+            with self.condition:
+                now = self.clock()
+                due, next_due = self._get_due(now)
+                if not due:
+                    self.condition.wait(next_due - now if next_due is not None else None)
+                    continue
+            try:
+                failed = self._extend(due, now)
+            except Exception as e:
+                self.log.exception(e)
+                failed = len(due)
+            if failed > 0:
+                # retry shortly, before the current visibility timeout expires
+                time.sleep(RETRY_INTERVAL)
+
+    """
+    get messages to extend, caller holds the condition
+    :return: list of messages due, messages due shortly are extended in the same batch, and the time the next message is due
+    """
+    def _get_due(self, now):
+        due_times = {key: entry["extended_at"] + entry["timeout"] / 2 for key, entry in self.messages.items()}
+        next_due = min(due_times.values()) if due_times else None
+        if next_due is None or next_due > now:
+            return [], next_due
+        return [self.messages[key] for key, due_at in due_times.items() if due_at <= now + self.timeout / 4], next_due
+
+    """
+    extend visibility timeout of the messages
+    :return: number of messages failed to extend
+    """
+    def _extend(self, entries, now):
+        # group messages by queue, one batch request for up to MAX_BATCH_ENTRIES messages
+        queues = {}
+        failed_count = 0
+        for entry in entries:
+            queues.setdefault(entry["msg"].queue_url, []).append(entry)
+        for queue_url, queue_entries in queues.items():
+            for i in range(0, len(queue_entries), MAX_BATCH_ENTRIES):
+                chunk = queue_entries[i:i + MAX_BATCH_ENTRIES]
+                request = []
+                for index, entry in enumerate(chunk):
+                    remaining = MAX_VISIBILITY_TIMEOUT - int(now - entry["received_at"])
+                    entry["new_timeout"] = max(min(int(entry["timeout"] * VISIBILITY_GROWTH), self.max_timeout, remaining), 0)
+                    request.append({"Id": str(index), "ReceiptHandle": entry["msg"].receipt_handle, "VisibilityTimeout": entry["new_timeout"]})
+                response = chunk[0]["msg"].meta.client.change_message_visibility_batch(QueueUrl=queue_url, Entries=request)
+                failed = {item["Id"]: item for item in response.get("Failed", [])}
+                with self.condition:
+                    for index, entry in enumerate(chunk):
+                        if str(index) in failed:
+                            error = failed[str(index)]
+                            self.log.warning(f'Failed to extend visibility timeout of message {entry["msg"].message_id}: {error.get("Code")}, {error.get("Message")}')
+                            if error.get("Code") == RECEIPT_HANDLE_IS_INVALID:
+                                self.messages.pop(entry["key"], None)
+                            else:
+                                # the current timeout is kept, so the message is retried
+                                failed_count += 1
+                            continue
+                        # the timeout is restarted from now with the new value
+                        entry["timeout"] = entry["new_timeout"]
+                        entry["extended_at"] = now
+                        if entry["timeout"] < self.timeout:
+                            # reached the 12 hours limit of sqs, can't be extended anymore
+                            self.log.warning(f'Visibility timeout of message {entry["msg"].message_id} reached the limit.')
+                            self.messages.pop(entry["key"], None)
+                self.log.debug(f'Extended visibility timeout of {len(chunk) - len(failed)} message(s).')
+        return failed_count
+
+class VisibilityHandle:
+    def __init__(self, manager, msg):
+        self.manager = manager
+        self.msg = msg
 
     def stop(self):
-        self._timer.cancel()
-        self.is_running = False
+        self.manager.deregister(self)
+
+    def __enter__(self):
+        return self
 
-    def __del__(self):
+    def __exit__(self, exc_type, exc_value, traceback):
         self.stop()
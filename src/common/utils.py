@@ -5,7 +5,6 @@ import os
 import re
 import shutil
 import json
-import requests
 import yaml
 import boto3 
 import numpy as np
@@ -13,6 +12,7 @@ from bento.common.utils import get_stream_md5
 from datetime import datetime
 import uuid
 from common.constants import QC_SEVERITY, LAST_MODIFIED
+from common.http_cache import http_cache
 
 VALIDATION_MESSAGE_CONFIG_FILE = "configs/messages_configuration.yml"
 VALIDATION_MESSAGES = "Messages"
@@ -113,17 +113,30 @@ download file from url and load into dict
 :return: value dict
 """
 def download_file_to_dict(url):
-    # NOTE the stream=True parameter below
+    return parse_file_content(url, download_file_content(url))
+
+"""
+download raw content of a file from url
+:param: url string
+:return: bytes
+"""
+def download_file_content(url):
+    return http_cache.get(url)
+
+"""
+load raw json or yaml file content into dict based on the file extension of the url
+:param: url string
+:param: content bytes
+:return: value dict
+"""
+def parse_file_content(url, content):
     file_ext = url.split('.')[-1] if url and '.' in url else None
-    with requests.get(url) as r:
-        if r.status_code > 400: 
-            raise Exception(f"Can't find model file at {url}, {r.content}!")
-        if file_ext == "json":
-            return r.json()
-        elif file_ext in ["yml", "yaml"]: 
-            return yaml.safe_load(r.content)
-        else:
-            raise Exception(f'File type is not supported: {file_ext}!')
+    if file_ext == "json":
+        return json.loads(content)
+    elif file_ext in ["yml", "yaml"]: 
+        return yaml.safe_load(content)
+    else:
+        raise Exception(f'File type is not supported: {file_ext}!')
 """
 get current datetime string in iso format
 """
@@ -0,0 +1,89 @@
+from bento.common.utils import get_logger
+from common.constants import SUBMISSION_ID, SCOPE
+
+SPLIT_KEYS = "splitKeys"
+RANGES = "ranges"
+LAST_KEY = "lastKey"
+TOTAL = "total"
+VALIDATED = "validated"
+IS_ERROR = "isError"
+IS_WARNING = "isWarning"
+
+class ValidationCheckpoint:
+    """
+    Progress of a metadata validation, saved in its validation document after every chunk is saved,
+    so a redelivered message of the validation resumes after the last saved chunk instead of starting over.
+    The records are validated in key ranges, the whole submission or the shards of it, and each range saves
+    the key of its last saved chunk, its counts and if errors or warnings were found.
+    """
+    def __init__(self, mongo_dao, validation_id):
+        self.log = get_logger('Validation Checkpoint')
+        self.mongo_dao = mongo_dao
+        self.validation_id = validation_id
+        # last keys of the key ranges, None if not started
+        self.split_keys = None
+        # index of key range -> progress of the range
+        self.ranges = {}
+
+    """
+    load the checkpoint of the validation
+    :param submission_id: submission ID
+    :param scope: validation scope
+    :return: True if the validation is resumed from the checkpoint
+    """
+    def load(self, submission_id, scope):
+        checkpoint = self.mongo_dao.get_validation_checkpoint(self.validation_id)
+        if not checkpoint or checkpoint.get(SUBMISSION_ID) != submission_id or checkpoint.get(SCOPE) != scope:
+            return False
+        split_keys = checkpoint.get(SPLIT_KEYS)
+        self.split_keys = [tuple(key) for key in split_keys] if split_keys is not None else None
+        self.ranges = {}
+        for index, progress in (checkpoint.get(RANGES) or {}).items():
+            if progress and progress.get(LAST_KEY):
+                self.ranges[int(index)] = dict(progress, **{LAST_KEY: tuple(progress[LAST_KEY])})
+        return self.split_keys is not None
+
+    """
+    check if records validated before the checkpoint changed since, then the validation starts over
+    """
+    def is_stale(self, submission_id):
+        for progress in self.ranges.values():
+            count = self.mongo_dao.count_new_dataRecords_not_after(submission_id, progress[LAST_KEY])
+            if count is None or count > 0:
+                return True
+        return False
+
+    """
+    start the validation over, with the key ranges
+    :param split_keys: last keys of the key ranges but the last one, empty list if the records are validated in one range
+    """
+    def start(self, submission_id, scope, split_keys):
+        self.split_keys = list(split_keys)
+        self.ranges = {}
+        self.mongo_dao.clear_validation_checkpoint(self.validation_id)
+        self.mongo_dao.set_validation_checkpoint(self.validation_id, {SUBMISSION_ID: submission_id, SCOPE: scope,
+                                                                      SPLIT_KEYS: [list(key) for key in self.split_keys]})
+
+    """
+    get progress of a key range
+    :return: dict of the last key, counts and flags of the range, None if the range is not started
+    """
+    def get_range(self, index):
+        return self.ranges.get(index)
+
+    """
+    save progress of a key range after a chunk is saved
+    """
+    def save_range(self, index, last_key, total, validated, is_error, is_warning):
+        progress = {LAST_KEY: list(last_key), TOTAL: total, VALIDATED: validated, IS_ERROR: bool(is_error), IS_WARNING: bool(is_warning)}
+        self.ranges[index] = dict(progress, **{LAST_KEY: tuple(last_key)})
+        if not self.mongo_dao.set_validation_checkpoint(self.validation_id, {f"{RANGES}.{index}": progress}):
+            self.log.warning(f"{self.validation_id}: failed to save checkpoint of key range {index}.")
+
+    """
+    remove the checkpoint when the validation is done
+    """
+    def clear(self):
+        self.split_keys = None
+        self.ranges = {}
+        self.mongo_dao.clear_validation_checkpoint(self.validation_id)
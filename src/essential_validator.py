@@ -4,19 +4,21 @@ import numpy as np
 import re
 import json
 import os
+import shutil
 from botocore.exceptions import ClientError
-from bento.common.sqs import VisibilityExtender
 from bento.common.utils import get_logger
 from bento.common.s3 import S3Bucket
 from common.constants import STATUS, BATCH_TYPE_METADATA, DATA_COMMON_NAME, ROOT_PATH, NODE_ID, \
     ERRORS, S3_DOWNLOAD_DIR, SQS_NAME, BATCH_ID, BATCH_STATUS_UPLOADED, SQS_TYPE, TYPE_LOAD, STATUS_PASSED,\
-    BATCH_STATUS_FAILED, ID, FILE_NAME, TYPE, FILE_PREFIX, MODEL_VERSION, MODEL_FILE_DIR, \
+    BATCH_STATUS_FAILED, ID, FILE_NAME, TYPE, FILE_PREFIX, MODEL_VERSION, MODEL_FILE_DIR, MODEL_CACHE_DIR, \
     TIER_CONFIG, STATUS_ERROR, STATUS_NEW, SERVICE_TYPE_ESSENTIAL, SUBMISSION_ID, SUBMISSION_INTENTION_DELETE, NODE_TYPE, \
     SUBMISSION_INTENTION, TYPE_DELETE, BATCH_BUCKET, METADATA_VALIDATION_STATUS, STATUS_WARNING, DCF_PREFIX, NODE_IDS, DELETE_ALL, EXCLUSIVE_IDS
-from common.utils import cleanup_s3_download_dir, get_exception_msg, dump_dict_to_json, removeTailingEmptyColumnsAndRows, validate_uuid_by_rex, get_date_time
+from common.utils import cleanup_s3_download_dir, get_exception_msg, dump_dict_to_json, removeTailingEmptyColumnsAndRows, validate_uuid_by_rex, get_date_time, get_uuid_str
 from common.model_store import ModelFactory
 from metadata_remover import MetadataRemover
 from data_loader import DataLoader
+from common.message_dispatcher import create_dispatcher
+from common.sqs_queue import VisibilityManager
 from service.ecs_agent import set_scale_in_protection
 
 VISIBILITY_TIMEOUT = 20
@@ -30,10 +32,9 @@ Interface for essential validation of metadata via SQS
 """
 
 def essentialValidate(configs, job_queue, mongo_dao):
-    batches_processed = 0
     log = get_logger('Essential Validation Service')
     try:
-        model_store = ModelFactory(configs[MODEL_FILE_DIR], configs[TIER_CONFIG]) 
+        model_store = ModelFactory(configs[MODEL_FILE_DIR], configs[TIER_CONFIG], compiled_model_dir=configs.get(MODEL_CACHE_DIR))
         # dump models to json files
         # dump_dict_to_json([model[MODEL] for model in model_store.models], f"tmp/data_models_dump.json")
         # dump_dict_to_json(model_store.models, f"models/data_model.json")
@@ -42,128 +43,139 @@ def essentialValidate(configs, job_queue, mongo_dao):
         log.exception(f'Error occurred when initialize essential validation service: {get_exception_msg()}')
         return 1
     #step 3: run validator as a service
+    dispatcher, max_msgs = create_dispatcher(configs, 'Essential Validation Dispatcher')
+    visibility_manager = VisibilityManager(VISIBILITY_TIMEOUT)
     scale_in_protection_flag = False
     #cleanup contents in the s3 download dir
     cleanup_s3_download_dir(S3_DOWNLOAD_DIR)
-    log.info(f'{SERVICE_TYPE_ESSENTIAL} service started')
+    log.info(f'{SERVICE_TYPE_ESSENTIAL} service started with {dispatcher.workers} worker(s)')
+    # load messages only have batch id, find submission of the batch to serialize jobs of a submission
+    resolver = lambda data: (mongo_dao.get_batch(data[BATCH_ID]) or {}).get(SUBMISSION_ID) if data.get(BATCH_ID) else None
     while True:
         try:
-            msgs = job_queue.receiveMsgs(VISIBILITY_TIMEOUT)
+            msgs = job_queue.receiveMsgs(VISIBILITY_TIMEOUT, dispatcher.wait_for_capacity(max_msgs))
             if len(msgs) > 0:
                 log.info(f'New message is coming: {configs[SQS_NAME]}, '
-                         f'{batches_processed} batches have been processed so far')
+                         f'{dispatcher.processed} batches have been processed so far, {dispatcher.in_flight} in progress')
                 scale_in_protection_flag = True
                 set_scale_in_protection(True)
             else:
-                if scale_in_protection_flag is True:
+                if scale_in_protection_flag is True and dispatcher.in_flight == 0:
                     scale_in_protection_flag = False
                     set_scale_in_protection(False)
 
             for msg in msgs:
                 log.info(f'Received a job!')
-                extender = None
-                data = None
-                validator = None
-                data_loader = None
-                try:
-                    data = json.loads(msg.body)
-                    log.debug(data)
-                    # Make sure job is in correct format
-                    if data.get(SQS_TYPE) == TYPE_LOAD and data.get(BATCH_ID):
-                        extender = VisibilityExtender(msg, VISIBILITY_TIMEOUT)
-                        #1 call mongo_dao to get batch by batch_id
-                        batch = mongo_dao.get_batch(data[BATCH_ID])
-                        if not batch:
-                            log.error(f"No batch find for {data[BATCH_ID]}")
-                            batches_processed +=1
-                            msg.delete()
-                            continue
-                        #2. validate batch and files.
-                        validator = EssentialValidator(mongo_dao, model_store)
-                        try:
-                            result = validator.validate(batch)
-                            if result and validator.download_file_list and len(validator.download_file_list) > 0:
-                                #3. call mongo_dao to load data
-                                data_loader = DataLoader(validator.model, batch, mongo_dao, validator.bucket, validator.root_path, validator.datacommon, validator.submission)
-                                result, errors = data_loader.load_data(validator.download_file_list)
-                                if result:
-                                    batch[STATUS] = BATCH_STATUS_UPLOADED
-                                    submission_meta_status = STATUS_NEW
-                                else:
-                                    batch[STATUS] = BATCH_STATUS_FAILED
-                                    submission_meta_status = BATCH_STATUS_FAILED
-                            else:
-                                batch[STATUS] = BATCH_STATUS_FAILED
-                                submission_meta_status = BATCH_STATUS_FAILED
-
-                        except Exception as e:  # catch any unhandled errors
-                            error = f'{batch[SUBMISSION_ID]}: Failed to upload metadata for the batch, {batch[ID]}, {get_exception_msg()}!'
-                            log.error(error)
-                            batch[ERRORS] =  ['Batch loading failed - internal error.  Please try again and contact the helpdesk if this error persists.']
-                            batch[STATUS] = BATCH_STATUS_FAILED
-                            submission_meta_status = STATUS_ERROR
-                        finally:
-                            #5. update submission's metadataValidationStatus
-                            if batch[ERRORS] and len(batch[ERRORS]) > BATCH_ERROR_LIMIT:
-                                batch[ERRORS] = batch[ERRORS][:BATCH_ERROR_LIMIT]
-                            mongo_dao.update_batch(batch)
-                            if validator.submission and submission_meta_status == STATUS_NEW:
-                                mongo_dao.set_submission_validation_status(validator.submission, None, submission_meta_status, None, None)
-                    
-                    elif data.get(SQS_TYPE) == TYPE_DELETE and data.get(SUBMISSION_ID) and data.get(NODE_TYPE):
-                        # if both nodeIDs and deleteAll are not provided, raise error
-                        if not (data.get(NODE_IDS) or data.get(DELETE_ALL)):
-                            raise ValueError(f'Invalid message: {data}!')
-                        extender = VisibilityExtender(msg, VISIBILITY_TIMEOUT)
-                        submission_id = data.get(SUBMISSION_ID)
-                        node_type = data.get(NODE_TYPE)
-                        node_ids = data.get(NODE_IDS)
-                        delete_all = data.get(DELETE_ALL)
-                        exclusive_ids = data.get(EXCLUSIVE_IDS)
-                        validator = MetadataRemover(mongo_dao, model_store)
-                        try:
-                            if delete_all:
-                                # get all node ids for the node type in the submission
-                                node_type_ids = mongo_dao.search_nodes_by_type_and_submission(node_type, submission_id, exclusive_ids)
-                                node_ids = node_type_ids
-                            result = validator.remove_metadata(submission_id, node_type, node_ids)
-                        except Exception as e:  # catch any unhandled errors
-                            error = f'{submission_id}: Failed to delete metadata, {get_exception_msg()}!'
-                            log.error(error)
-                        finally:
-                            #5. update submission's metadataValidationStatus
-                            if validator.submission:
-                                status = validator.submission.get(METADATA_VALIDATION_STATUS)
-                                # only need update the status if error or warning. In the dao function will check the count of error or warning to get real time status.
-                                status = STATUS_PASSED if status in [STATUS_ERROR, STATUS_WARNING] else status 
-                                mongo_dao.set_submission_validation_status(validator.submission, None, status, None, None, True)
-                    else:
-                        log.error(f'Invalid message: {data}!')
-
-                    log.info(f'Processed {SERVICE_TYPE_ESSENTIAL} validation for the batch, {data.get(BATCH_ID)}!')
-                    batches_processed += 1
-                    msg.delete()
-                except Exception as e:
-                    log.exception(e)
-                    log.critical(
-                        f'Something wrong happened while processing file! Check debug log for details.')
-                finally:
-                    # msg.delete()
-                    if data_loader:
-                        del data_loader
-                    if validator:
-                        validator.close()
-                        del validator
-                    if extender:
-                        extender.stop()
-                        extender = None
-                    #cleanup contents in the s3 download dir
-                    cleanup_s3_download_dir(S3_DOWNLOAD_DIR)
+                extender = visibility_manager.register(msg)
+                dispatcher.submit(dispatcher.get_message_key(msg, resolver), process_essential_message, msg, extender, mongo_dao, model_store)
 
         except KeyboardInterrupt:
             log.info('Good bye!')
+            dispatcher.shutdown()
             return
 
+"""
+process an essential validation message
+"""
+def process_essential_message(msg, extender, mongo_dao, model_store):
+    log = get_logger('Essential Validation Service')
+    data = None
+    validator = None
+    data_loader = None
+    # each job downloads files into its own folder, so concurrent jobs never clean up files of other jobs
+    download_dir = os.path.join(S3_DOWNLOAD_DIR, msg.message_id if getattr(msg, "message_id", None) else get_uuid_str())
+    try:
+        data = json.loads(msg.body)
+        log.debug(data)
+        # Make sure job is in correct format
+        if data.get(SQS_TYPE) == TYPE_LOAD and data.get(BATCH_ID):
+            #1 call mongo_dao to get batch by batch_id
+            batch = mongo_dao.get_batch(data[BATCH_ID])
+            if not batch:
+                log.error(f"No batch find for {data[BATCH_ID]}")
+                msg.delete()
+                return
+            #2. validate batch and files.
+            cleanup_s3_download_dir(download_dir)
+            validator = EssentialValidator(mongo_dao, model_store, download_dir)
+            try:
+                result = validator.validate(batch)
+                if result and validator.download_file_list and len(validator.download_file_list) > 0:
+                    #3. call mongo_dao to load data
+                    data_loader = DataLoader(validator.model, batch, mongo_dao, validator.bucket, validator.root_path, validator.datacommon, validator.submission)
+                    result, errors = data_loader.load_data(validator.download_file_list)
+                    if result:
+                        batch[STATUS] = BATCH_STATUS_UPLOADED
+                        submission_meta_status = STATUS_NEW
+                    else:
+                        batch[STATUS] = BATCH_STATUS_FAILED
+                        submission_meta_status = BATCH_STATUS_FAILED
+                else:
+                    batch[STATUS] = BATCH_STATUS_FAILED
+                    submission_meta_status = BATCH_STATUS_FAILED
+
+            except Exception as e:  # catch any unhandled errors
+                error = f'{batch[SUBMISSION_ID]}: Failed to upload metadata for the batch, {batch[ID]}, {get_exception_msg()}!'
+                log.error(error)
+                batch[ERRORS] =  ['Batch loading failed - internal error.  Please try again and contact the helpdesk if this error persists.']
+                batch[STATUS] = BATCH_STATUS_FAILED
+                submission_meta_status = STATUS_ERROR
+            finally:
+                #5. update submission's metadataValidationStatus
+                if batch[ERRORS] and len(batch[ERRORS]) > BATCH_ERROR_LIMIT:
+                    batch[ERRORS] = batch[ERRORS][:BATCH_ERROR_LIMIT]
+                mongo_dao.update_batch(batch)
+                if validator.submission and submission_meta_status == STATUS_NEW:
+                    mongo_dao.set_submission_validation_status(validator.submission, None, submission_meta_status, None, None)
+        
+        elif data.get(SQS_TYPE) == TYPE_DELETE and data.get(SUBMISSION_ID) and data.get(NODE_TYPE):
+            # if both nodeIDs and deleteAll are not provided, raise error
+            if not (data.get(NODE_IDS) or data.get(DELETE_ALL)):
+                raise ValueError(f'Invalid message: {data}!')
+            submission_id = data.get(SUBMISSION_ID)
+            node_type = data.get(NODE_TYPE)
+            node_ids = data.get(NODE_IDS)
+            delete_all = data.get(DELETE_ALL)
+            exclusive_ids = data.get(EXCLUSIVE_IDS)
+            validator = MetadataRemover(mongo_dao, model_store)
+            try:
+                if delete_all:
+                    # get all node ids for the node type in the submission
+                    node_type_ids = mongo_dao.search_nodes_by_type_and_submission(node_type, submission_id, exclusive_ids)
+                    node_ids = node_type_ids
+                result = validator.remove_metadata(submission_id, node_type, node_ids)
+            except Exception as e:  # catch any unhandled errors
+                error = f'{submission_id}: Failed to delete metadata, {get_exception_msg()}!'
+                log.error(error)
+            finally:
+                #5. update submission's metadataValidationStatus
+                if validator.submission:
+                    status = validator.submission.get(METADATA_VALIDATION_STATUS)
+                    # only need update the status if error or warning. In the dao function will check the count of error or warning to get real time status.
+                    status = STATUS_PASSED if status in [STATUS_ERROR, STATUS_WARNING] else status 
+                    mongo_dao.set_submission_validation_status(validator.submission, None, status, None, None, True)
+        else:
+            log.error(f'Invalid message: {data}!')
+
+        log.info(f'Processed {SERVICE_TYPE_ESSENTIAL} validation for the batch, {data.get(BATCH_ID)}!')
+        msg.delete()
+    except Exception as e:
+        log.exception(e)
+        log.critical(
+            f'Something wrong happened while processing file! Check debug log for details.')
+    finally:
+        # msg.delete()
+        if data_loader:
+            del data_loader
+        if validator:
+            validator.close()
+            del validator
+        if extender:
+            extender.stop()
+            extender = None
+        #cleanup the s3 download dir of the job
+        shutil.rmtree(download_dir, ignore_errors=True)
+
 
 """ Requirement for the ticket crdcdh-496
 Non-conformed metadata file Format, only TSV (.tsv or .txt) files are allowed
@@ -174,9 +186,10 @@ When metadata intention is "New", all IDs must not exist in the database or curr
 """
 class EssentialValidator:
     
-    def __init__(self, mongo_dao, model_store):
+    def __init__(self, mongo_dao, model_store, download_dir=S3_DOWNLOAD_DIR):
         self.fileList = [] #list of files object {file_name, file_path, file_size, invalid_reason}
         self.log = get_logger('Essential Validator')
+        self.download_dir = download_dir
         self.mongo_dao = mongo_dao
         self.model_store = model_store
         self.datacommon = None
@@ -268,7 +281,7 @@ class EssentialValidator:
     def download_file(self, file_info):
         key = os.path.join(self.batch[FILE_PREFIX], file_info[FILE_NAME])
         # todo set download file 
-        download_file = os.path.join(S3_DOWNLOAD_DIR, file_info[FILE_NAME])
+        download_file = os.path.join(self.download_dir, file_info[FILE_NAME])
         msg = None
         try:
             if not self.bucket.file_exists_on_s3(key):
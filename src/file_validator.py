@@ -2,14 +2,17 @@
 
 import json
 import os
-from bento.common.sqs import VisibilityExtender
 from bento.common.utils import get_logger
 from bento.common.s3 import S3Bucket
 from common.constants import ERRORS, WARNINGS, STATUS, S3_FILE_INFO, ID, SIZE, MD5, UPDATED_AT, \
     FILE_NAME, SQS_TYPE, SQS_NAME, FILE_ID, STATUS_ERROR, STATUS_WARNING, STATUS_PASSED, SUBMISSION_ID, \
     BATCH_BUCKET, SERVICE_TYPE_FILE, LAST_MODIFIED, CREATED_AT, TYPE, SUBMISSION_INTENTION, SUBMISSION_INTENTION_DELETE,\
-    VALIDATION_ID, VALIDATION_ENDED, QC_RESULT_ID, VALIDATION_TYPE_FILE, QC_SEVERITY, QC_VALIDATE_DATE, FILE_VALIDATION
+    VALIDATION_ID, VALIDATION_ENDED, QC_RESULT_ID, VALIDATION_TYPE_FILE, QC_SEVERITY, QC_VALIDATE_DATE, FILE_VALIDATION, \
+    TYPE_FILE_VALIDATE_ALL
 from common.utils import get_exception_msg, current_datetime, get_s3_file_info, get_s3_file_md5, create_error, get_uuid_str
+from common.message_dispatcher import create_dispatcher
+from common.sqs_queue import VisibilityManager
+from common.request_coalescer import RequestCoalescer
 from service.ecs_agent import set_scale_in_protection
 from metadata_validator import get_qc_result
 
@@ -18,95 +21,108 @@ VISIBILITY_TIMEOUT = 20
 Interface for validate files via SQS
 """
 def fileValidate(configs, job_queue, mongo_dao):
-    file_processed = 0
     log = get_logger('Data file Validation Service')
     #run file validator as a service
+    dispatcher, max_msgs = create_dispatcher(configs, 'Data file Validation Dispatcher')
+    visibility_manager = VisibilityManager(VISIBILITY_TIMEOUT)
+    coalescer = RequestCoalescer([TYPE_FILE_VALIDATE_ALL])
     scale_in_protection_flag = False
-    log.info(f'{SERVICE_TYPE_FILE} service started')
+    log.info(f'{SERVICE_TYPE_FILE} service started with {dispatcher.workers} worker(s)')
+    # data file messages only have file id, find submission of the file to serialize jobs of a submission
+    resolver = lambda data: (mongo_dao.get_file(data[FILE_ID]) or {}).get(SUBMISSION_ID) if data.get(FILE_ID) else None
     while True:
         try:
-            msgs = job_queue.receiveMsgs(VISIBILITY_TIMEOUT)
+            msgs = job_queue.receiveMsgs(VISIBILITY_TIMEOUT, dispatcher.wait_for_capacity(max_msgs))
             if len(msgs) > 0:
                 log.info(f'New message is coming: {configs[SQS_NAME]}, '
-                         f'{file_processed} data file(s) have been processed so far')
+                         f'{dispatcher.processed} data file(s) have been processed so far, {dispatcher.in_flight} in progress')
                 scale_in_protection_flag = True
                 set_scale_in_protection(True)
             else:
-                if scale_in_protection_flag is True:
+                if scale_in_protection_flag is True and dispatcher.in_flight == 0:
                     scale_in_protection_flag = False
                     set_scale_in_protection(False)
 
+            groups = []
             for msg in msgs:
                 log.info(f'Received a job!')
-                extender = None
-                data = None
-                validator = None
-                try:
-                    data = json.loads(msg.body)
-                    log.debug(data)
-                    # Make sure job is in correct format
-                    if data.get(SQS_TYPE) == "Validate File" and data.get(FILE_ID):
-                        extender = VisibilityExtender(msg, VISIBILITY_TIMEOUT)
-                        #1 call mongo_dao to get batch by batch_id
-                        fileRecord = mongo_dao.get_file(data[FILE_ID])
-                        if fileRecord is None: 
-                            msg.delete()
-                            continue
-                        #2. validate file.
-                        validator = FileValidator(mongo_dao)
-                        status = validator.validate(fileRecord)
-                        if status == STATUS_ERROR:
-                            log.error(f'The data file record is invalid, {data[FILE_ID]}!')
-                        elif status == STATUS_WARNING:
-                            log.error(f'The data file record is valid but with warning, {data[FILE_ID]}!')
-                        else:
-                            log.info(f'The data file record passed validation, {data[FILE_ID]}.')
-                        #4. update dataRecords
-                        if not mongo_dao.update_file_info(fileRecord):
-                            log.error(f'Failed to update data file record, {data[FILE_ID]}!')
-                        else:
-                            log.info(f'The data file record is updated,{data[FILE_ID]}.')
-
-                    elif data.get(SQS_TYPE) == "Validate Submission Files" and data.get(SUBMISSION_ID) and data.get(VALIDATION_ID):
-                        extender = VisibilityExtender(msg, VISIBILITY_TIMEOUT)
-                        submission_id = data[SUBMISSION_ID]
-                        validator = FileValidator(mongo_dao)
-                        status = None
-                        msgs = []
-                        if not validator.get_root_path(submission_id):
-                            log.error(f'Invalid submission, {submission_id}!')
-                            status = STATUS_ERROR
-                        else:
-                            status, msgs = validator.validate_all_files(data[SUBMISSION_ID])
-
-                        # update validation records
-                        validation_id = data[VALIDATION_ID]
-                        validation_end_at = current_datetime()
-                        update_status = mongo_dao.update_validation_status(validation_id, status, validation_end_at, FILE_VALIDATION)
-                        if update_status:
-                            validator.submission[VALIDATION_ENDED] = validation_end_at
-                        #update submission
-                        mongo_dao.set_submission_validation_status(validator.submission, status if status else "None", None, None, msgs)
-                    else:
-                        log.error(f'Invalid message: {data}!')
-                    
-                    log.info(f'Processed {SERVICE_TYPE_FILE} validation for the {"data file, "+ data.get(FILE_ID) if data.get(FILE_ID) else "submission, " + data.get(SUBMISSION_ID)}!')
-                    file_processed += 1
-                    msg.delete()
-                except Exception as e:
-                    log.exception(e)
-                    log.critical(
-                        f'Something wrong happened while processing data file! Check debug log for details.')
-                finally:
-                    if validator:
-                        del validator
-                    if extender:
-                        extender.stop()
-                        extender = None
+                group = coalescer.add(msg, visibility_manager.register(msg))
+                if group:
+                    groups.append(group)
+            for group in groups:
+                dispatcher.submit(dispatcher.get_message_key(group.msg, resolver), process_file_message, group, mongo_dao)
         except KeyboardInterrupt:
             log.info('Good bye!')
+            dispatcher.shutdown()
             return
 
+"""
+process a data file validation message, with all earlier requests it supersedes
+"""
+def process_file_message(group, mongo_dao):
+    log = get_logger('Data file Validation Service')
+    group.start()
+    msg = group.msg
+    data = None
+    validator = None
+    try:
+        data = json.loads(msg.body)
+        log.debug(data)
+        # Make sure job is in correct format
+        if data.get(SQS_TYPE) == "Validate File" and data.get(FILE_ID):
+            #1 call mongo_dao to get batch by batch_id
+            fileRecord = mongo_dao.get_file(data[FILE_ID])
+            if fileRecord is None: 
+                group.delete()
+                return
+            #2. validate file.
+            validator = FileValidator(mongo_dao)
+            status = validator.validate(fileRecord)
+            if status == STATUS_ERROR:
+                log.error(f'The data file record is invalid, {data[FILE_ID]}!')
+            elif status == STATUS_WARNING:
+                log.error(f'The data file record is valid but with warning, {data[FILE_ID]}!')
+            else:
+                log.info(f'The data file record passed validation, {data[FILE_ID]}.')
+            #4. update dataRecords
+            if not mongo_dao.update_file_info(fileRecord):
+                log.error(f'Failed to update data file record, {data[FILE_ID]}!')
+            else:
+                log.info(f'The data file record is updated,{data[FILE_ID]}.')
+
+        elif data.get(SQS_TYPE) == TYPE_FILE_VALIDATE_ALL and data.get(SUBMISSION_ID) and data.get(VALIDATION_ID):
+            submission_id = data[SUBMISSION_ID]
+            validator = FileValidator(mongo_dao)
+            status = None
+            msgs = []
+            if not validator.get_root_path(submission_id):
+                log.error(f'Invalid submission, {submission_id}!')
+                status = STATUS_ERROR
+            else:
+                status, msgs = validator.validate_all_files(data[SUBMISSION_ID])
+
+            # update validation records, including records of superseded requests
+            validation_end_at = current_datetime()
+            for validation_id in group.validation_ids:
+                update_status = mongo_dao.update_validation_status(validation_id, status, validation_end_at, FILE_VALIDATION)
+                if update_status:
+                    validator.submission[VALIDATION_ENDED] = validation_end_at
+            #update submission
+            mongo_dao.set_submission_validation_status(validator.submission, status if status else "None", None, None, msgs)
+        else:
+            log.error(f'Invalid message: {data}!')
+        
+        log.info(f'Processed {SERVICE_TYPE_FILE} validation for the {"data file, "+ data.get(FILE_ID) if data.get(FILE_ID) else "submission, " + data.get(SUBMISSION_ID)}!')
+        group.delete()
+    except Exception as e:
+        log.exception(e)
+        log.critical(
+            f'Something wrong happened while processing data file! Check debug log for details.')
+    finally:
+        if validator:
+            del validator
+        group.stop()
+
 """
  Requirement for the ticket crdcdh-539
 1. Missing File, validate if a file specified in a manifest exist in files folder of the submission (error)
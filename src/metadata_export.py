@@ -7,11 +7,10 @@ import time
 import threading
 import io
 from botocore.exceptions import ClientError
-from bento.common.sqs import VisibilityExtender
 from bento.common.utils import get_logger
 from common.constants import SQS_TYPE, SUBMISSION_ID, BATCH_BUCKET, TYPE_EXPORT_METADATA, ID, NODE_TYPE, \
     RELEASE, ARCHIVE_RELEASE, EXPORT_METADATA, EXPORT_ROOT_PATH, SERVICE_TYPE_EXPORT, CRDC_ID, NODE_ID,\
-    DATA_COMMON_NAME, CREATED_AT, MODEL_VERSION, MODEL_FILE_DIR, TIER_CONFIG, SQS_NAME, TYPE, UPDATED_AT, \
+    DATA_COMMON_NAME, CREATED_AT, MODEL_VERSION, MODEL_FILE_DIR, MODEL_CACHE_DIR, TIER_CONFIG, SQS_NAME, TYPE, UPDATED_AT, \
     PARENTS, PROPERTIES, SUBMISSION_REL_STATUS, SUBMISSION_REL_STATUS_RELEASED, SUBMISSION_INTENTION, \
     SUBMISSION_INTENTION_DELETE, SUBMISSION_REL_STATUS_DELETED, TYPE_COMPLETE_SUB, ORIN_FILE_NAME,\
     STUDY_ID, DM_BUCKET_CONFIG_NAME, DATASYNC_ROLE_ARN_CONFIG, ENTITY_TYPE, SUBMISSION_HISTORY, RELEASE_AT, \
@@ -22,6 +21,8 @@ from common.utils import current_datetime, get_uuid_str, dump_dict_to_json, get_
 from common.model_store import ModelFactory
 from common.s3_utils import S3Service
 from dcf_manifest_generator import GenerateDCF
+from common.message_dispatcher import create_dispatcher
+from common.sqs_queue import VisibilityManager
 from service.ecs_agent import set_scale_in_protection
 
 
@@ -32,81 +33,89 @@ BATCH_SIZE = 1000
 Interface for validate files via SQS
 """
 def metadata_export(configs, job_queue, mongo_dao):
-    export_processed = 0
-    export_validator = None
     log = get_logger(TYPE_EXPORT_METADATA)
     try:
-        model_store = ModelFactory(configs[MODEL_FILE_DIR], configs[TIER_CONFIG]) 
+        model_store = ModelFactory(configs[MODEL_FILE_DIR], configs[TIER_CONFIG], compiled_model_dir=configs.get(MODEL_CACHE_DIR))
         # dump models to json files
         # dump_dict_to_json(model_store.models, f"models/data_model.json")
     except Exception as e:
         log.exception(e)
         log.exception(f'Error occurred when initialize metadata validation service: {get_exception_msg()}')
         return 1
+    dispatcher, max_msgs = create_dispatcher(configs, 'Export Dispatcher')
+    visibility_manager = VisibilityManager(VISIBILITY_TIMEOUT)
     scale_in_protection_flag = False
-    log.info(f'{SERVICE_TYPE_EXPORT} service started')
+    log.info(f'{SERVICE_TYPE_EXPORT} service started with {dispatcher.workers} worker(s)')
     while True:
         try:
-            msgs = job_queue.receiveMsgs(VISIBILITY_TIMEOUT)
+            msgs = job_queue.receiveMsgs(VISIBILITY_TIMEOUT, dispatcher.wait_for_capacity(max_msgs))
             if len(msgs) > 0:
                 log.info(f'New message is coming: {configs[SQS_NAME]}, '
-                         f'{export_processed} {SERVICE_TYPE_EXPORT} validation(s) have been processed so far')
+                         f'{dispatcher.processed} {SERVICE_TYPE_EXPORT} validation(s) have been processed so far, '
+                         f'{dispatcher.in_flight} in progress')
                 scale_in_protection_flag = True
                 set_scale_in_protection(True)
             else:
-                if scale_in_protection_flag is True:
+                if scale_in_protection_flag is True and dispatcher.in_flight == 0:
                     scale_in_protection_flag = False
                     set_scale_in_protection(False)
 
             for msg in msgs:
                 log.info(f'Received a job!')
-                extender = None
-                try:
-                    data = json.loads(msg.body)
-                    log.debug(data)
-                    if not data.get(SQS_TYPE) in [TYPE_EXPORT_METADATA, TYPE_COMPLETE_SUB] or not data.get(SUBMISSION_ID):
-                        pass
-                    
-                    extender = VisibilityExtender(msg, VISIBILITY_TIMEOUT)
-                    submission_id = data[SUBMISSION_ID]
-                    submission = mongo_dao.get_submission(submission_id)
-                    if not submission:
-                        log.error(f'Submission {submission_id} does not exist!')
-                        continue
-                    if data.get(SQS_TYPE) == TYPE_EXPORT_METADATA: 
-                        export_validator = ExportMetadata(mongo_dao, submission, model_store, configs)
-                        export_validator.export_data_to_file()
-                        # transfer metadata to destination s3 bucket if error occurred.
-                        export_validator.transfer_release_metadata()
-                    elif data.get(SQS_TYPE) == RESTORE_DELETED_DATA_FILES:
-                        export_validator = ExportMetadata(mongo_dao, submission, model_store, configs)
-                        export_validator.restore_deleted_file()
-                    elif data.get(SQS_TYPE) == TYPE_COMPLETE_SUB:
-                        export_validator = ExportMetadata(mongo_dao, submission, model_store, configs)
-                        if export_validator.release_data():
-                            if submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE and (not submission.get(SUBMISSION_DATA_TYPE) 
-                                or (submission[SUBMISSION_DATA_TYPE] != SUBMISSION_DATA_TYPE_METADATA_ONLY)): 
-                                export_validator.transfer_released_files()
-                    else:
-                        pass
-                    export_processed += 1
-                    msg.delete()
-                except Exception as e:
-                    log.critical(e)
-                    log.critical(
-                        f'Something wrong happened while exporting data! Check debug log for details.')
-                finally:
-                    # De-allocation memory
-                    if export_validator:
-                        export_validator.close()
-                        export_validator = None
-
-                    if extender:
-                        extender.stop()
+                extender = visibility_manager.register(msg)
+                dispatcher.submit(dispatcher.get_message_key(msg), process_export_message, msg, extender, mongo_dao, model_store, configs)
         except KeyboardInterrupt:
             log.info('Good bye!')
+            dispatcher.shutdown()
             return
 
+"""
+process an export message
+"""
+def process_export_message(msg, extender, mongo_dao, model_store, configs):
+    log = get_logger(TYPE_EXPORT_METADATA)
+    export_validator = None
+    try:
+        data = json.loads(msg.body)
+        log.debug(data)
+        if not data.get(SQS_TYPE) in [TYPE_EXPORT_METADATA, TYPE_COMPLETE_SUB] or not data.get(SUBMISSION_ID):
+            pass
+        
+        submission_id = data[SUBMISSION_ID]
+        submission = mongo_dao.get_submission(submission_id)
+        if not submission:
+            log.error(f'Submission {submission_id} does not exist!')
+            return
+        if data.get(SQS_TYPE) == TYPE_EXPORT_METADATA: 
+            export_validator = ExportMetadata(mongo_dao, submission, model_store, configs)
+            export_validator.export_data_to_file()
+            # transfer metadata to destination s3 bucket if error occurred.
+            export_validator.transfer_release_metadata()
+        elif data.get(SQS_TYPE) == RESTORE_DELETED_DATA_FILES:
+            export_validator = ExportMetadata(mongo_dao, submission, model_store, configs)
+            export_validator.restore_deleted_file()
+        elif data.get(SQS_TYPE) == TYPE_COMPLETE_SUB:
+            export_validator = ExportMetadata(mongo_dao, submission, model_store, configs)
+            if export_validator.release_data():
+                if submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE and (not submission.get(SUBMISSION_DATA_TYPE) 
+                    or (submission[SUBMISSION_DATA_TYPE] != SUBMISSION_DATA_TYPE_METADATA_ONLY)): 
+                    export_validator.transfer_released_files()
+        else:
+            pass
+        msg.delete()
+    except Exception as e:
+        log.critical(e)
+        log.critical(
+            f'Something wrong happened while exporting data! Check debug log for details.')
+    finally:
+        # De-allocation memory
+        if export_validator:
+            export_validator.close()
+            export_validator = None
+
+        if extender:
+            extender.stop()
+
 # Private class
 class ExportMetadata:
     def __init__(self, mongo_dao, submission,  model_store, configs):
@@ -188,17 +197,13 @@ class ExportMetadata:
 
         
     def export(self, submission_id, node_type):
-        start_index = 0
+        exported_count = 0
         rows = []
         columns = set()
         file_name = ""
         main_nodes = self.model.get_main_nodes()
-        while True:
-            # get nodes by submissionID and nodeType
-            data_records = self.mongo_dao.get_dataRecords_chunk_by_nodeType(submission_id, node_type, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
-                return
-            
+        # get nodes by submissionID and nodeType
+        for data_records in self.mongo_dao.iterate_dataRecords_chunks(submission_id, None, BATCH_SIZE, node_type):
             if not self.release_manifest_data["metadata record counts"].get(node_type):
                 self.release_manifest_data["metadata record counts"][node_type] = {"total": 0, "new": 0, "update": 0, "delete": 0}
 
@@ -231,34 +236,33 @@ class ExportMetadata:
                     self.release_manifest_data["data files"]["count"] += 1
                     self.release_manifest_data["data files"]["total size"] += int(r.get(S3_FILE_INFO).get("size"))
 
-            count = len(data_records) 
-            if count < BATCH_SIZE: 
-                df = None
-                buf = None
-                try:
-                    df = pd.DataFrame(rows, columns = self.sort_columns(columns, node_type))
-                    # convert python boolean to "true"/"false" in tsv
-                    df = df.apply(lambda col: col.map(lambda x: "true" if (x is True or x == "True") else "false" if x is False or x == "False" else x))
-                    buf = io.BytesIO()
-                    df.to_csv(buf, sep ='\t', index=False)
-                    buf.seek(0)
-                    self.upload_file(buf, node_type)
-                    # populate release manifest data
-                    self.release_manifest_data["metadata files"]["metadata files"].append(f"{submission_id}-{node_type}.tsv")
-                    self.release_manifest_data["metadata files"]["number of metadata files"] += 1
-                    self.log.info(f"{submission_id}: {count + start_index} {node_type} nodes are exported.")
-                    return
-                except Exception as e:
-                    self.log.exception(e)
-                    self.log.exception(f'{submission_id}: Failed to export {node_type} data: {get_exception_msg()}.')
-                finally:
-                    if buf:
-                        del buf
-                        del df
-                        del rows
-                        del columns
-
-            start_index += count 
+            exported_count += len(data_records)
+        if exported_count == 0:
+            return
+
+        df = None
+        buf = None
+        try:
+            df = pd.DataFrame(rows, columns = self.sort_columns(columns, node_type))
+            # convert python boolean to "true"/"false" in tsv
+            df = df.apply(lambda col: col.map(lambda x: "true" if (x is True or x == "True") else "false" if x is False or x == "False" else x))
+            buf = io.BytesIO()
+            df.to_csv(buf, sep ='\t', index=False)
+            buf.seek(0)
+            self.upload_file(buf, node_type)
+            # populate release manifest data
+            self.release_manifest_data["metadata files"]["metadata files"].append(f"{submission_id}-{node_type}.tsv")
+            self.release_manifest_data["metadata files"]["number of metadata files"] += 1
+            self.log.info(f"{submission_id}: {exported_count} {node_type} nodes are exported.")
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f'{submission_id}: Failed to export {node_type} data: {get_exception_msg()}.')
+        finally:
+            if buf:
+                del buf
+                del df
+                del rows
+                del columns
 
     def convert_2_row(self, data_record, node_type, crdc_id):
         rows = []
@@ -302,31 +306,25 @@ class ExportMetadata:
 
 
     def delete_data_file(self, submission_id, node_type):
-        start_index = 0
+        record_count = 0
         file_list = []
-        while True:
-            # get nodes by submissionID and nodeType
-            data_records = self.mongo_dao.get_dataRecords_chunk_by_nodeType(submission_id, node_type, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
-                return
-            
+        # get nodes by submissionID and nodeType
+        for data_records in self.mongo_dao.iterate_dataRecords_chunks(submission_id, None, BATCH_SIZE, node_type):
             for r in data_records:
                 s3FileInfo = r.get(S3_FILE_INFO)
                 if s3FileInfo:
                     s3_file_name = s3FileInfo.get(FILE_NAME)
                     if s3_file_name:
                         file_list.append(s3_file_name)
+            record_count += len(data_records)
+        if record_count == 0:
+            return
 
-            count = len(data_records) 
-            if count < BATCH_SIZE: 
-                try:
-                    self.move_s3_objects(file_list)
-                except Exception as e:
-                    self.log.exception(e)
-                    self.log.exception(f'{submission_id}: Failed to delete {node_type} file: {get_exception_msg()}.')
-                return
-
-            start_index += count 
+        try:
+            self.move_s3_objects(file_list)
+        except Exception as e:
+            self.log.exception(e)
+            self.log.exception(f'{submission_id}: Failed to delete {node_type} file: {get_exception_msg()}.')
 
     def release_data(self):
         submission_id = self.submission[ID]
@@ -351,24 +349,18 @@ class ExportMetadata:
             return False
 
     def save_releases(self, submission_id, node_type):
-        start_index = 0
-        while True:
-            # get nodes by submissionID and nodeType
-            data_records = self.mongo_dao.get_dataRecords_chunk_by_nodeType(submission_id, node_type, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
-                return
+        released_count = 0
+        # get nodes by submissionID and nodeType
+        for data_records in self.mongo_dao.iterate_dataRecords_chunks(submission_id, None, BATCH_SIZE, node_type):
             for r in data_records:
                 node_id = r.get(NODE_ID)
                 crdc_id = r.get(CRDC_ID)
                 self.save_release(r, node_type, node_id, crdc_id)
                 if self.submission[SUBMISSION_INTENTION] == SUBMISSION_INTENTION_DELETE and node_type in self.model.get_file_nodes():
                     self.add_tag_on_deleted_file(r.get(S3_FILE_INFO))
-            count = len(data_records) 
-            if count < BATCH_SIZE: 
-                self.log.info(f"{submission_id}: {count + start_index} {node_type} nodes are {'released' if self.intention != SUBMISSION_INTENTION_DELETE else 'deleted'}.")
-                return
-
-            start_index += count 
+            released_count += len(data_records)
+        if released_count > 0:
+            self.log.info(f"{submission_id}: {released_count} {node_type} nodes are {'released' if self.intention != SUBMISSION_INTENTION_DELETE else 'deleted'}.")
 
     def get_properties(self, data_record, existed_crdc_record = None):
         update_props = {}
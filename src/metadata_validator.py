@@ -1,21 +1,42 @@
 #!/usr/bin/env python3
 import json
-from datetime import datetime
+import math
 import re
-from bento.common.sqs import VisibilityExtender
-from bento.common.utils import get_logger, DATE_FORMATS
+import threading
+import weakref
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from bento.common.utils import get_logger
 from common.constants import SQS_NAME, SQS_TYPE, SCOPE, SUBMISSION_ID, ERRORS, WARNINGS, STATUS_ERROR, ID, FAILED, \
-    STATUS_WARNING, STATUS_PASSED, STATUS, UPDATED_AT, MODEL_FILE_DIR, TIER_CONFIG, DATA_COMMON_NAME, MODEL_VERSION, \
+    STATUS_WARNING, STATUS_PASSED, STATUS, UPDATED_AT, MODEL_FILE_DIR, MODEL_CACHE_DIR, CDE_CACHE_TTL, CDE_CACHE_NEGATIVE_TTL, PIPELINE_QUEUE_DEPTH, VALIDATION_SHARDS, MONGO_DB, DB, \
+    INCREMENTAL_VALIDATION, VALIDATION_FINGERPRINT, CDE_COLLECTION, SYNONYM_COLLECTION, PV_CONCEPT_CODE_COLLECTION, \
+    FAN_OUT_SHARD_SIZE, TYPE_METADATA_VALIDATE_SHARD, SHARD_COUNT, SHARDS_DONE, SHARD_INDEX, START_KEY, END_KEY, VALIDATION_IDS, \
+    DATA_COLlECTION, STATUS_NEW, \
+    HTTP_CACHE_DIR, HTTP_CACHE_MAX_STALENESS, HTTP_CACHE_OFFLINE, TIER_CONFIG, DATA_COMMON_NAME, MODEL_VERSION, \
     NODE_TYPE, PROPERTIES, TYPE, MIN, MAX, VALUE_EXCLUSIVE, VALUE_PROP, VALIDATION_RESULT, ORIN_FILE_NAME, \
     VALIDATED_AT, SERVICE_TYPE_METADATA, NODE_ID, PROPERTIES, PARENTS, KEY, NODE_ID, PARENT_TYPE, PARENT_ID_NAME, PARENT_ID_VAL, \
     SUBMISSION_INTENTION, SUBMISSION_INTENTION_NEW_UPDATE, SUBMISSION_INTENTION_DELETE, TYPE_METADATA_VALIDATE, TYPE_CROSS_SUBMISSION, \
-    SUBMISSION_REL_STATUS_RELEASED, VALIDATION_ID, VALIDATION_ENDED, CDE_TERM, TERM_CODE, TERM_VERSION, CDE_PERMISSIVE_VALUES, \
+    SUBMISSION_REL_STATUS_RELEASED, VALIDATION_ID, VALIDATION_ENDED, CDE_TERM, TERM_CODE, TERM_VERSION, \
     QC_RESULT_ID, BATCH_IDS, VALIDATION_TYPE_METADATA, S3_FILE_INFO, VALIDATION_TYPE_FILE, QC_SEVERITY, QC_VALIDATE_DATE, QC_ORIGIN, \
     QC_ORIGIN_METADATA_VALIDATE_SERVICE, QC_ORIGIN_FILE_VALIDATE_SERVICE, DISPLAY_ID, UPLOADED_DATE, LATEST_BATCH_ID, SUBMITTED_ID, \
     LATEST_BATCH_DISPLAY_ID, QC_VALIDATION_TYPE, DATA_RECORD_ID, PV_TERM, STUDY_ID, PROPERTY_PATTERN, DELETE_COMMAND, CONCEPT_CODE, \
     GENERATED_PROPS, DELETE_COMMAND, METADATA_VALIDATION, CONSENT_CODE_NODE_TYPE, CONSENT_CODE, CONSENT_GROUP_NUMBER, DATA_COMMONS, STUDY_ID
 from common.utils import current_datetime, get_exception_msg, dump_dict_to_json, create_error, get_uuid_str
 from common.model_store import ModelFactory
+from common.message_dispatcher import create_dispatcher, SQS_MAX_MESSAGES
+from common.sqs_queue import VisibilityManager
+from common.request_coalescer import RequestCoalescer
+from common.node_resolver import ParentNodeResolver, ReleasedNodeResolver, ConsentGroupResolver, parent_key, hashable_key
+from common.pv_matcher import PermissibleValueMatcher
+from common.columnar_validator import ColumnarPrefilter
+from common.date_validator import DateValidator
+from common.chunk_pipeline import ChunkPipeline, DEFAULT_PIPELINE_QUEUE_DEPTH
+from common.fingerprint import IncrementalPlanner, validation_environment, content_digest, record_fingerprint
+from common.mongo_dao import MongoDao, record_key
+from common.validation_checkpoint import ValidationCheckpoint, LAST_KEY, TOTAL, VALIDATED, IS_ERROR, IS_WARNING, SPLIT_KEYS
+from common.http_cache import configure_http_cache
+from common.cde_cache import cde_cache, configure_cde_cache, CDE_FOUND, CDE_MISSING, CDE_NOT_AVAILABLE, \
+    DEFAULT_CDE_CACHE_TTL, DEFAULT_CDE_CACHE_NEGATIVE_TTL
 from common.model_reader import valid_prop_types
 from service.ecs_agent import set_scale_in_protection
 from x_submission_validator import CrossSubmissionValidator
@@ -24,11 +45,17 @@ from pv_puller import get_pv_by_code_version
 VISIBILITY_TIMEOUT = 20
 BATCH_SIZE = 1000
 CDE_NOT_FOUND = "CDE not available"
+DEFAULT_VALIDATION_SHARDS = 1
+# messages received per request, so queued requests of a submission are coalesced
+COALESCE_BATCH_SIZE = SQS_MAX_MESSAGES
 
 def metadataValidate(configs, job_queue, mongo_dao):
     log = get_logger('Metadata Validation Service')
     try:
-        model_store = ModelFactory(configs[MODEL_FILE_DIR], configs[TIER_CONFIG]) 
+        model_store = ModelFactory(configs[MODEL_FILE_DIR], configs[TIER_CONFIG], compiled_model_dir=configs.get(MODEL_CACHE_DIR))
+        configure_cde_cache(configs.get(CDE_CACHE_TTL, DEFAULT_CDE_CACHE_TTL), configs.get(CDE_CACHE_NEGATIVE_TTL, DEFAULT_CDE_CACHE_NEGATIVE_TTL))
+        # shard workers are shared by all validations of the service
+        get_shard_executor(configs)
         # dump models to json files
         # dump_dict_to_json(model_store.models, f"models/data_model.json")
     except Exception as e:
@@ -37,65 +64,253 @@ def metadataValidate(configs, job_queue, mongo_dao):
         return 1
 
     #step 3: run validator as a service
-    log.info(f'{SERVICE_TYPE_METADATA} service started')
-    batches_processed = 0
+    dispatcher, _ = create_dispatcher(configs, 'Metadata Validation Dispatcher')
+    visibility_manager = VisibilityManager(VISIBILITY_TIMEOUT)
+    coalescer = RequestCoalescer([TYPE_METADATA_VALIDATE, TYPE_CROSS_SUBMISSION])
+    log.info(f'{SERVICE_TYPE_METADATA} service started with {dispatcher.workers} worker(s)')
     scale_in_protection_flag = False
     while True:
         try:
-            msgs = job_queue.receiveMsgs(VISIBILITY_TIMEOUT)
+            dispatcher.wait_for_capacity()
+            # a whole batch is received regardless of free workers and coalesced before dispatching,
+            # so requests of a submission queued behind each other are validated by one run
+            msgs = job_queue.receiveMsgs(VISIBILITY_TIMEOUT, COALESCE_BATCH_SIZE)
             if len(msgs) > 0:
                 log.info(f'New message is coming: {configs[SQS_NAME]}, '
-                         f'{batches_processed} {SERVICE_TYPE_METADATA} validation(s) have been processed so far')
+                         f'{dispatcher.processed} {SERVICE_TYPE_METADATA} validation(s) have been processed so far, '
+                         f'{dispatcher.in_flight} in progress')
                 scale_in_protection_flag = True
                 set_scale_in_protection(True)
             else:
-                if scale_in_protection_flag is True:
+                if scale_in_protection_flag is True and dispatcher.in_flight == 0:
                     scale_in_protection_flag = False
                     set_scale_in_protection(False)
 
+            groups = []
             for msg in msgs:
                 log.info(f'Received a job!')
-                extender = None
-                data = None
-                validator = None
-                try:
-                    data = json.loads(msg.body)
-                    log.debug(data)
-                    extender = VisibilityExtender(msg, VISIBILITY_TIMEOUT)
-                    submission_id = data.get(SUBMISSION_ID)
-                    if data.get(SQS_TYPE) == TYPE_METADATA_VALIDATE and submission_id and data.get(SCOPE) and data.get(VALIDATION_ID):
-                        scope = data[SCOPE]
-                        validator = MetaDataValidator(mongo_dao, model_store, configs)
-                        status = validator.validate(submission_id, scope)
-                        validation_id = data[VALIDATION_ID]
-                        validation_end_at = current_datetime()
-                        update_status =mongo_dao.update_validation_status(validation_id, status, validation_end_at, METADATA_VALIDATION)
-                        if update_status:
-                            validator.submission[VALIDATION_ENDED] = validation_end_at
-                        mongo_dao.set_submission_validation_status(validator.submission, None, status, None, None)
-                    elif data.get(SQS_TYPE) == TYPE_CROSS_SUBMISSION and submission_id:
-                        validator = CrossSubmissionValidator(mongo_dao)
-                        status = validator.validate(submission_id)
-                        if validator.submission:
-                            mongo_dao.set_submission_validation_status(validator.submission, None, None, status, None)
-                    else:
-                        log.error(f'Invalid message: {data}!')
-                    log.info(f'Processed {SERVICE_TYPE_METADATA} validation for the submission: {data[SUBMISSION_ID]}!')
-                    batches_processed += 1
-                    msg.delete()
-                except Exception as e:
-                    log.exception(e)
-                    log.critical(
-                        f'Something wrong happened while processing metadata! Check debug log for details.')
-                finally:
-                    if validator:
-                        del validator
-                    if extender:
-                        extender.stop()
-                        extender = None
+                group = coalescer.add(msg, visibility_manager.register(msg))
+                if group:
+                    groups.append(group)
+            for group in groups:
+                dispatcher.submit(get_metadata_message_key(dispatcher, group), process_metadata_message, group, mongo_dao, model_store, configs, job_queue)
         except KeyboardInterrupt:
             log.info('Good bye!')
+            dispatcher.shutdown()
             return
+
+"""
+get the key of a request group, requests of the same key are processed one at a time,
+shards of a fanned out validation are processed in parallel
+"""
+def get_metadata_message_key(dispatcher, group):
+    key = dispatcher.get_message_key(group.msg)
+    if key and group.data and group.data.get(SQS_TYPE) == TYPE_METADATA_VALIDATE_SHARD:
+        return f'{key}/{group.data.get(SHARD_INDEX)}'
+    return key
+
+"""
+process a metadata validation message, with all earlier requests it supersedes
+"""
+def process_metadata_message(group, mongo_dao, model_store, configs, job_queue=None):
+    log = get_logger('Metadata Validation Service')
+    group.start()
+    msg = group.msg
+    data = None
+    validator = None
+    try:
+        data = json.loads(msg.body)
+        log.debug(data)
+        submission_id = data.get(SUBMISSION_ID)
+        if data.get(SQS_TYPE) == TYPE_METADATA_VALIDATE and submission_id and data.get(SCOPE) and data.get(VALIDATION_ID):
+            scope = data[SCOPE]
+            validator = MetaDataValidator(mongo_dao, model_store, configs)
+            if job_queue and fan_out_validation(validator, job_queue, data, group.validation_ids):
+                log.info(f'{submission_id}: metadata validation is fanned out into shard messages.')
+            else:
+                status = validator.validate(submission_id, scope, data[VALIDATION_ID])
+                validation_end_at = current_datetime()
+                # validation records of superseded requests are updated with the result of the latest request
+                for validation_id in group.validation_ids:
+                    update_status =mongo_dao.update_validation_status(validation_id, status, validation_end_at, METADATA_VALIDATION)
+                    if update_status:
+                        validator.submission[VALIDATION_ENDED] = validation_end_at
+                mongo_dao.set_submission_validation_status(validator.submission, None, status, None, None)
+        elif data.get(SQS_TYPE) == TYPE_METADATA_VALIDATE_SHARD and submission_id and data.get(SCOPE) and data.get(VALIDATION_ID) \
+                and data.get(SHARD_INDEX) is not None:
+            validator = MetaDataValidator(mongo_dao, model_store, configs)
+            validate_fan_out_shard(validator, data)
+        elif data.get(SQS_TYPE) == TYPE_CROSS_SUBMISSION and submission_id:
+            validator = CrossSubmissionValidator(mongo_dao)
+            status = validator.validate(submission_id)
+            if validator.submission:
+                mongo_dao.set_submission_validation_status(validator.submission, None, None, status, None)
+        else:
+            log.error(f'Invalid message: {data}!')
+        log.info(f'Processed {SERVICE_TYPE_METADATA} validation for the submission: {data[SUBMISSION_ID]}!')
+        group.delete()
+    except Exception as e:
+        log.exception(e)
+        log.critical(
+            f'Something wrong happened while processing metadata! Check debug log for details.')
+    finally:
+        if validator:
+            del validator
+        group.stop()
+
+"""
+fan out a metadata validation of a large submission into shard messages of key ranges, validated by any service instance
+the message of the validation is deleted once the shard messages are sent, the last shard validated
+sets the status of the validation and the submission
+:param validation_ids: IDs of the validation and of the requests it supersedes
+:return: True if fanned out, False if the submission is validated in this process
+"""
+def fan_out_validation(validator, job_queue, data, validation_ids):
+    shard_size = int(validator.config.get(FAN_OUT_SHARD_SIZE) or 0)
+    if shard_size <= 0:
+        return False
+    mongo_dao = validator.mongo_dao
+    submission_id, scope, validation_id = data[SUBMISSION_ID], data[SCOPE], data[VALIDATION_ID]
+    tracker = mongo_dao.get_validation_shards(validation_id)
+    if tracker is None:
+        return False
+    if not tracker:
+        if validator.load_submission(submission_id, scope):
+            # invalid submission, reported by the validation in this process
+            return False
+        query = {SUBMISSION_ID: submission_id}
+        if scope == STATUS_NEW:
+            query[STATUS] = STATUS_NEW
+        count = mongo_dao.count_docs(DATA_COLlECTION, query)
+        if not count or count <= shard_size:
+            return False
+        split_keys = mongo_dao.get_dataRecords_split_keys(submission_id, scope, math.ceil(count / shard_size))
+        if not split_keys:
+            return False
+        # the checkpoint is started before the tracker, shards are sent only after both
+        ValidationCheckpoint(mongo_dao, validation_id).start(submission_id, scope, split_keys)
+        tracker = {SUBMISSION_ID: submission_id, SCOPE: scope, SPLIT_KEYS: [list(key) for key in split_keys], SHARD_COUNT: len(split_keys) + 1,
+                   SHARDS_DONE: [], TOTAL: 0, VALIDATED: 0, IS_ERROR: False, IS_WARNING: False, VALIDATION_IDS: validation_ids}
+        if not mongo_dao.start_validation_shards(validation_id, tracker):
+            tracker = mongo_dao.get_validation_shards(validation_id)
+            if not tracker:
+                return False
+    if tracker.get(SUBMISSION_ID) != submission_id or tracker.get(SCOPE) != scope:
+        return False
+    # sent again if the message of the validation is redelivered, shards done are not validated again
+    split_keys = [tuple(key) for key in tracker[SPLIT_KEYS]]
+    start_keys = [None] + split_keys
+    end_keys = split_keys + [None]
+    for shard_index, (start_key, end_key) in enumerate(zip(start_keys, end_keys)):
+        if shard_index in tracker.get(SHARDS_DONE, []):
+            continue
+        msg = {SQS_TYPE: TYPE_METADATA_VALIDATE_SHARD, SUBMISSION_ID: submission_id, SCOPE: scope, VALIDATION_ID: validation_id,
+               SHARD_INDEX: shard_index, START_KEY: list(start_key) if start_key else None, END_KEY: list(end_key) if end_key else None}
+        job_queue.sendMsgToQueue(msg, f'{validation_id}-{shard_index}')
+    validator.log.info(f'{submission_id}: {len(start_keys)} shard message(s) of validation {validation_id} are sent.')
+    return True
+
+"""
+validate a shard of a fanned out metadata validation
+the last shard completed sets the status of the validation and the submission
+"""
+def validate_fan_out_shard(validator, data):
+    mongo_dao = validator.mongo_dao
+    submission_id, scope, validation_id, shard_index = data[SUBMISSION_ID], data[SCOPE], data[VALIDATION_ID], data[SHARD_INDEX]
+    tracker = mongo_dao.get_validation_shards(validation_id)
+    if tracker and shard_index in tracker.get(SHARDS_DONE, []):
+        validator.log.info(f'{submission_id}: shard {shard_index} of validation {validation_id} is validated already.')
+        return
+    start_key = tuple(data[START_KEY]) if data.get(START_KEY) else None
+    end_key = tuple(data[END_KEY]) if data.get(END_KEY) else None
+    total_count, validated_count = validator.validate_range(submission_id, scope, validation_id, shard_index, start_key, end_key)
+    validator.log.info(f"{submission_id}: {validated_count} out of {total_count} nodes of shard {shard_index} are validated.")
+    tracker = mongo_dao.complete_validation_shard(validation_id, shard_index, total_count, validated_count, validator.isError, validator.isWarning)
+    if tracker is None:
+        raise Exception(f'{submission_id}: failed to complete shard {shard_index} of validation {validation_id}!')
+    if tracker and len(tracker.get(SHARDS_DONE, [])) == tracker.get(SHARD_COUNT):
+        finish_fan_out_validation(validator, validation_id, tracker)
+
+"""
+set the status of a fanned out metadata validation and its submission, when all shards are completed
+"""
+def finish_fan_out_validation(validator, validation_id, tracker):
+    mongo_dao = validator.mongo_dao
+    if not tracker.get(TOTAL):
+        status = FAILED
+    else:
+        status = STATUS_ERROR if tracker.get(IS_ERROR) else STATUS_WARNING if tracker.get(IS_WARNING) else STATUS_PASSED
+    submission = validator.submission or mongo_dao.get_submission(tracker.get(SUBMISSION_ID))
+    validation_end_at = current_datetime()
+    for request_validation_id in tracker.get(VALIDATION_IDS) or [validation_id]:
+        if mongo_dao.update_validation_status(request_validation_id, status, validation_end_at, METADATA_VALIDATION) and submission:
+            submission[VALIDATION_ENDED] = validation_end_at
+    if submission:
+        mongo_dao.set_submission_validation_status(submission, None, status, None, None)
+    ValidationCheckpoint(mongo_dao, validation_id).clear()
+    validator.log.info(f"{tracker.get(SUBMISSION_ID)}: {tracker.get(VALIDATED)} out of {tracker.get(TOTAL)} nodes of {tracker.get(SHARD_COUNT)} shards are validated, {status}.")
+
+# process pool of shard workers, shared by validations of the service
+shard_executor = None
+shard_executor_lock = threading.Lock()
+# DB access object and model store of a shard worker process
+shard_worker = {}
+
+"""
+get number of shard worker processes of the service
+"""
+def get_validation_shards(configs):
+    return max(int(configs.get(VALIDATION_SHARDS, DEFAULT_VALIDATION_SHARDS) or DEFAULT_VALIDATION_SHARDS), 1)
+
+"""
+get the process pool of shard workers, created once with validation-shards workers
+:return: the process pool, None if validations are not sharded
+"""
+def get_shard_executor(configs):
+    global shard_executor
+    shards = get_validation_shards(configs)
+    if shards <= 1:
+        return None
+    with shard_executor_lock:
+        if shard_executor is None:
+            # spawned, forking a process with Mongo clients and threads is not safe
+            shard_executor = ProcessPoolExecutor(max_workers=shards, mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=init_shard_worker, initargs=(configs,))
+        return shard_executor
+
+"""
+initialize a shard worker process with its own DB connection and model store
+the models are loaded read-only from the compiled model cache if configured
+"""
+def init_shard_worker(configs):
+    configure_http_cache(configs.get(HTTP_CACHE_DIR), configs.get(HTTP_CACHE_MAX_STALENESS, 0), configs.get(HTTP_CACHE_OFFLINE, False))
+    configure_cde_cache(configs.get(CDE_CACHE_TTL, DEFAULT_CDE_CACHE_TTL), configs.get(CDE_CACHE_NEGATIVE_TTL, DEFAULT_CDE_CACHE_NEGATIVE_TTL))
+    shard_worker["configs"] = configs
+    shard_worker["mongo_dao"] = MongoDao(configs[MONGO_DB], configs[DB])
+    shard_worker["model_store"] = ModelFactory(configs[MODEL_FILE_DIR], configs[TIER_CONFIG], compiled_model_dir=configs.get(MODEL_CACHE_DIR))
+
+"""
+validate a key range of a submission in a shard worker process, duplicate nodes are loaded by the worker
+:param revalidate_ids: _id of records of the key range to validate in incremental validation, all records if None
+:return: number of records, number of validated records, error or not, warning or not, CDE cache hits, CDE cache misses
+"""
+def validate_shard(submission_id, scope, start_key, end_key, fingerprint_environment=None, revalidate_ids=None,
+                   validation_id=None, range_index=0):
+    mongo_dao = shard_worker["mongo_dao"]
+    validator = MetaDataValidator(mongo_dao, shard_worker["model_store"], shard_worker["configs"])
+    status = validator.load_submission(submission_id, scope)
+    if status:
+        raise Exception(f'{submission_id}: failed to load the submission in the shard worker!')
+    validator.duplicate_nodes = mongo_dao.get_duplicate_nodes(submission_id)
+    validator.fingerprint_environment = fingerprint_environment
+    validator.revalidate_ids = revalidate_ids
+    if validation_id:
+        validator.checkpoint = ValidationCheckpoint(mongo_dao, validation_id)
+        validator.checkpoint.load(submission_id, scope)
+    cde_cache.check_generation(mongo_dao.get_cde_generation())
+    total_count, validated_count = validator.validate_records(start_key, end_key, range_index)
+    return total_count, validated_count, bool(validator.isError), bool(validator.isWarning), validator.cde_cache_hits, validator.cde_cache_misses
+
 class MetaDataValidator:
     
     def __init__(self, mongo_dao, model_store, config):
@@ -113,8 +328,70 @@ class MetaDataValidator:
         self.not_found_cde = False
         self.study_name = None
         self.program_names = None
+        self.parent_resolver = None
+        self.released_resolver = None
+        self.consent_resolver = None
+        # (nodeType, nodeID) -> records, of nodes appear more than once in the submission
+        self.duplicate_nodes = None
+        # digest of the validation environment, fingerprints of validated records are not saved if None
+        self.fingerprint_environment = None
+        # _id of records to validate in incremental validation, all records if None
+        self.revalidate_ids = None
+        # planner of the records to validate, None if not validated incrementally
+        self.incremental_planner = None
+        self.skipped_count = 0
+        # progress of the validation saved chunk by chunk, None if not checkpointed
+        self.checkpoint = None
+        self.cde_cache_hits = 0
+        self.cde_cache_misses = 0
+        # (id of property definition, strip) -> (property definition, permissible values matcher)
+        self.pv_matchers = {}
+        self.columnar_prefilter = ColumnarPrefilter(self)
+        self.date_validator = DateValidator()
+        # id of record -> {property name: (valid value, corrected value)}, of the chunk being validated
+        self.valid_values = {}
+
+    def validate(self, submission_id, scope, validation_id=None):
+        status = self.load_submission(submission_id, scope)
+        if status:
+            return status
+        #3 retrieve data batch by batch
+        self.duplicate_nodes = self.mongo_dao.get_duplicate_nodes(submission_id)
+        cde_cache.check_generation(self.mongo_dao.get_cde_generation())
+        if self.config.get(INCREMENTAL_VALIDATION) and self.submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE:
+            self.plan_incremental_validation()
+        if validation_id:
+            self.checkpoint = ValidationCheckpoint(self.mongo_dao, validation_id)
+            if self.checkpoint.load(submission_id, scope):
+                if self.checkpoint.is_stale(submission_id):
+                    self.log.info(f"{submission_id}: records changed since the checkpoint of validation {validation_id}, validation starts over.")
+                    self.checkpoint = ValidationCheckpoint(self.mongo_dao, validation_id)
+                else:
+                    self.log.info(f"{submission_id}: validation {validation_id} is resumed from its checkpoint.")
+        shards = get_validation_shards(self.config)
+        if self.checkpoint and self.checkpoint.split_keys:
+            # resumed with the key ranges of the checkpoint, validated by the shard workers of this service
+            shards = len(self.checkpoint.split_keys) + 1
+        total_count, validated_count = self.validate_shards(shards) if shards > 1 else self.validate_records()
+        if self.checkpoint:
+            self.checkpoint.clear()
+        if total_count == 0:
+            msg = f'No more new metadata to be validated.'
+            self.log.error(msg)
+            return FAILED
+        self.log.info(f"{submission_id}: {validated_count} out of {total_count} nodes are validated.")
+        if self.skipped_count > 0:
+            self.log.info(f"{submission_id}: {self.skipped_count} nodes are unchanged since their last validation and skipped.")
+        cde_lookups = self.cde_cache_hits + self.cde_cache_misses
+        if cde_lookups > 0:
+            self.log.info(f"{submission_id}: CDE cache {self.cde_cache_hits} hit(s), {self.cde_cache_misses} miss(es), hit rate {self.cde_cache_hits * 100 / cde_lookups:.1f}%.")
+        return STATUS_ERROR if self.isError else STATUS_WARNING if self.isWarning  else STATUS_PASSED 
 
-    def validate(self, submission_id, scope):
+    """
+    load submission, study and data model of the validation
+    :return: FAILED or STATUS_ERROR if the submission can't be validated, None otherwise
+    """
+    def load_submission(self, submission_id, scope):
         #1. # get data common from submission
         submission = self.mongo_dao.get_submission(submission_id)
         if not submission:
@@ -151,37 +428,249 @@ class MetaDataValidator:
             msg = f'{self.datacommon} model version "{model_version}" is not available.'
             self.log.error(msg)
             return STATUS_ERROR
-        #3 retrieve data batch by batch
-        start_index = 0
+        return None
+
+    """
+    find records changed since their last validation, and the records depending on them
+    records are validated as before if the generations of the validation environment are not available
+    """
+    def plan_incremental_validation(self):
+        if self.duplicate_nodes is None:
+            return
+        if not self.set_fingerprint_environment():
+            self.log.warning(f"{self.submission_id}: validation environment is not available, all records are validated.")
+            return
+        planner = IncrementalPlanner(self.mongo_dao, self.model, self.submission_id, self.fingerprint_environment, self.duplicate_nodes, BATCH_SIZE)
+        self.revalidate_ids = planner.plan()
+        self.skipped_count = planner.skipped_count if self.revalidate_ids is not None else 0
+        self.incremental_planner = planner if self.revalidate_ids is not None else None
+
+    """
+    split the _id of records to validate into the key ranges, so a shard worker gets the _id of its range only
+    :param split_keys: last keys of the key ranges, but the last range
+    :return: list of _id of records to validate per key range, None per key range if all records are validated
+    """
+    def split_revalidate_ids(self, split_keys):
+        if self.revalidate_ids is None or not self.incremental_planner:
+            return [None] * (len(split_keys) + 1)
+        revalidate_ranges = self.incremental_planner.split(self.revalidate_ids, split_keys)
+        if revalidate_ranges is None:
+            self.log.warning(f"{self.submission_id}: records changed since the incremental validation was planned, all records are validated.")
+            self.revalidate_ids = None
+            self.skipped_count = 0
+            return [None] * (len(split_keys) + 1)
+        return revalidate_ranges
+
+    """
+    set the digest of the validation environment, to save the fingerprints of validated records
+    :return: True if the environment is available
+    """
+    def set_fingerprint_environment(self):
+        generations = [self.mongo_dao.get_cde_generation(),
+                       self.mongo_dao.get_collections_generation([CDE_COLLECTION, SYNONYM_COLLECTION, PV_CONCEPT_CODE_COLLECTION]),
+                       self.mongo_dao.get_release_generation(self.datacommon, self.submission.get(STUDY_ID))]
+        self.fingerprint_environment = validation_environment(self.model, self.submission, self.study_name, self.program_names, generations)
+        return bool(self.fingerprint_environment)
+
+    """
+    validate a key range of a fanned out validation, resumed from the checkpoint of the range
+    all records of the range are validated, incremental validation needs the whole submission
+    :param range_index: index of the key range
+    :return: number of records, number of validated records
+    """
+    def validate_range(self, submission_id, scope, validation_id, range_index, start_key, end_key):
+        if self.load_submission(submission_id, scope):
+            self.isError = True
+            return 0, 0
+        self.duplicate_nodes = self.mongo_dao.get_duplicate_nodes(submission_id)
+        cde_cache.check_generation(self.mongo_dao.get_cde_generation())
+        if self.config.get(INCREMENTAL_VALIDATION) and self.submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE \
+                and self.duplicate_nodes is not None:
+            self.set_fingerprint_environment()
+        self.checkpoint = ValidationCheckpoint(self.mongo_dao, validation_id)
+        if not self.checkpoint.load(submission_id, scope):
+            # the checkpoint of the fanned out validation is started by the coordinator only
+            self.checkpoint = None
+        return self.validate_records(start_key, end_key, range_index)
+
+    """
+    get the validation fingerprint of a validated record
+    :return: hex digest, None if the record is not validated incrementally
+    """
+    def get_fingerprint(self, data_record, errors):
+        if not self.fingerprint_environment or self.duplicate_nodes is None or not self.parent_resolver:
+            return None
+        if errors and any(str(error.get("code", "")) == "M020" for error in errors):
+            # failed to validate
+            return None
+        key = hashable_key(data_record.get(NODE_TYPE), data_record.get(NODE_ID))
+        if key is None:
+            return None
+        parents_present = []
+        try:
+            for parent in data_record.get(PARENTS) or []:
+                parent = parent_key(parent)
+                if parent is None:
+                    parents_present.append(None)
+                    continue
+                nodes = self.parent_resolver.nodes.get(parent)
+                if nodes is None:
+                    # parent not prefetched
+                    return None
+                parents_present.append(len(nodes) > 0)
+            duplicate = key in self.duplicate_nodes
+        except TypeError:
+            return None
+        return record_fingerprint(self.fingerprint_environment, content_digest(data_record), parents_present, duplicate)
+
+    """
+    validate records of the submission in keyset pagination order
+    :param start_key: validate records after the key, from the first record if None
+    :param end_key: validate records up to the key, to the last record if None
+    :param range_index: index of the key range in the checkpoint
+    :return: number of records, number of validated records
+    """
+    def validate_records(self, start_key=None, end_key=None, range_index=0):
+        total_count = 0
         validated_count = 0
-        while True:
-            data_records = self.mongo_dao.get_dataRecords_chunk(submission_id, scope, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
-                msg = f'No more new metadata to be validated.'
-                self.log.error(msg)
-                return FAILED
-            
-            count = len(data_records)             
-            validated_count += self.validate_nodes(data_records)
-            if count < BATCH_SIZE: 
-                self.log.info(f"{submission_id}: {validated_count} out of {count + start_index} nodes are validated.")
-                return STATUS_ERROR if self.isError else STATUS_WARNING if self.isWarning  else STATUS_PASSED 
-            start_index += count  
+        if self.checkpoint and self.checkpoint.split_keys is None:
+            self.checkpoint.start(self.submission_id, self.scope, [])
+        progress = self.checkpoint.get_range(range_index) if self.checkpoint else None
+        if progress:
+            # records up to the last key of the checkpoint are validated and saved
+            start_key = progress[LAST_KEY]
+            total_count = progress[TOTAL]
+            validated_count = progress[VALIDATED]
+            self.isError = self.isError or progress[IS_ERROR]
+            self.isWarning = self.isWarning or progress[IS_WARNING]
+            self.log.info(f"{self.submission_id}: {validated_count} out of {total_count} nodes of key range {range_index} were validated before the checkpoint.")
+        progress = {TOTAL: total_count, VALIDATED: validated_count, IS_ERROR: bool(progress and progress[IS_ERROR]),
+                    IS_WARNING: bool(progress and progress[IS_WARNING])}
+
+        def validate_chunk(data_records):
+            last_key = record_key(data_records[-1])
+            batch = self.validate_chunk(data_records)
+            # statuses of skipped records are kept, validated records have their new status
+            is_error = batch[4] or any(record.get(STATUS) == STATUS_ERROR for record in data_records)
+            is_warning = any(record.get(STATUS) == STATUS_WARNING for record in data_records)
+            return last_key, is_error, is_warning, batch
+
+        def save_chunk(checkpointed_batch):
+            last_key, is_error, is_warning, batch = checkpointed_batch
+            result = self.save_chunk(batch)
+            if self.checkpoint:
+                if not result[2]:
+                    # the checkpoint stays at the last saved chunk, the message is retried from there
+                    raise Exception(f'{self.submission_id}: failed to save the chunk of records up to {last_key}!')
+                progress[TOTAL] += result[0]
+                progress[VALIDATED] += result[1]
+                progress[IS_ERROR] = progress[IS_ERROR] or is_error
+                progress[IS_WARNING] = progress[IS_WARNING] or is_warning
+                self.checkpoint.save_range(range_index, last_key, progress[TOTAL], progress[VALIDATED], progress[IS_ERROR], progress[IS_WARNING])
+            return result
+
+        self.parent_resolver = ParentNodeResolver(self.mongo_dao, self.submission_id)
+        self.released_resolver = ReleasedNodeResolver(self.mongo_dao, self.datacommon, [SUBMISSION_REL_STATUS_RELEASED, None])
+        self.consent_resolver = ConsentGroupResolver(self.mongo_dao, self.submission_id, self.datacommon)
+        # chunks are fetched ahead and saved behind validation
+        pipeline = ChunkPipeline(self.config.get(PIPELINE_QUEUE_DEPTH, DEFAULT_PIPELINE_QUEUE_DEPTH), 'Metadata Validation Pipeline')
+        chunks = self.mongo_dao.iterate_dataRecords_chunks(self.submission_id, self.scope, BATCH_SIZE, start_key=start_key, end_key=end_key)
+        saved = pipeline.run(chunks, validate_chunk, save_chunk)
+        for batch_total, batch_validated, batch_saved in saved:
+            total_count += batch_total
+            validated_count += batch_validated
+            if not batch_saved:
+                self.isError = True
+        self.log.info(f"{self.submission_id}: {pipeline.format_timings()}.")
+        return total_count, validated_count
+
+    """
+    validate records of the submission split into key ranges, in parallel by the shard worker processes
+    :param shards: number of key ranges
+    :return: number of records, number of validated records
+    """
+    def validate_shards(self, shards):
+        if self.checkpoint and self.checkpoint.split_keys is not None:
+            split_keys = self.checkpoint.split_keys
+        else:
+            split_keys = self.mongo_dao.get_dataRecords_split_keys(self.submission_id, self.scope, shards)
+            if self.checkpoint:
+                self.checkpoint.start(self.submission_id, self.scope, split_keys or [])
+        if not split_keys:
+            # too few records to split, or failed to split
+            return self.validate_records()
+        start_keys = [None] + split_keys
+        end_keys = split_keys + [None]
+        executor = get_shard_executor(self.config)
+        if not executor:
+            # key ranges of a checkpoint, resumed by a service without shard workers
+            self.log.info(f"{self.submission_id}: validating {len(start_keys)} key range(s) in the service process.")
+            total_count = 0
+            validated_count = 0
+            for range_index, (start_key, end_key) in enumerate(zip(start_keys, end_keys)):
+                range_total, range_validated = self.validate_records(start_key, end_key, range_index)
+                total_count += range_total
+                validated_count += range_validated
+            return total_count, validated_count
+        self.log.info(f"{self.submission_id}: validating {len(start_keys)} shard(s) by {get_validation_shards(self.config)} shard worker(s).")
+        validation_id = self.checkpoint.validation_id if self.checkpoint else None
+        revalidate_ranges = self.split_revalidate_ids(split_keys)
+        futures = [executor.submit(validate_shard, self.submission_id, self.scope, start_key, end_key,
+                                   self.fingerprint_environment, revalidate_ids, validation_id, range_index)
+                   for range_index, (start_key, end_key, revalidate_ids) in enumerate(zip(start_keys, end_keys, revalidate_ranges))]
+        total_count = 0
+        validated_count = 0
+        for future in futures:
+            shard_total, shard_validated, is_error, is_warning, cde_cache_hits, cde_cache_misses = future.result()
+            total_count += shard_total
+            validated_count += shard_validated
+            self.isError = self.isError or is_error
+            self.isWarning = self.isWarning or is_warning
+            self.cde_cache_hits += cde_cache_hits
+            self.cde_cache_misses += cde_cache_misses
+        return total_count, validated_count
 
     def validate_nodes(self, data_records):
+        total_count, validated_count, saved = self.save_chunk(self.validate_chunk(data_records))
+        if not saved:
+            self.isError = True
+        return validated_count
+
+    """
+    validate a chunk of records
+    :return: (number of records, validated records, qc results to save, qc result ids to delete, failed or not)
+    """
+    def validate_chunk(self, data_records):
         #2. loop through all records and call validateNode
+        total_count = len(data_records)
+        failed = False
         updated_records = []
         qc_results = []
-        validated_count = 0
+        deleted_qc_ids = []
         try:
+            if self.revalidate_ids is not None:
+                data_records = self.skip_unchanged(data_records)
+            if self.parent_resolver and self.submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE:
+                self.parent_resolver.prefetch(data_records)
+            if self.consent_resolver and self.submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE:
+                self.consent_resolver.prefetch(data_records, self.model.get_file_nodes())
+            if self.released_resolver and self.submission.get(SUBMISSION_INTENTION) in [SUBMISSION_INTENTION_NEW_UPDATE, SUBMISSION_INTENTION_DELETE]:
+                self.released_resolver.prefetch(data_records)
+            if self.submission.get(SUBMISSION_INTENTION) != SUBMISSION_INTENTION_DELETE:
+                self.valid_values = self.columnar_prefilter.prefilter(data_records)
+            # prefetch qc results of the chunk in one query
+            qc_ids = list(set(record[QC_RESULT_ID] for record in data_records if record.get(QC_RESULT_ID)))
+            exist_qc_results = self.mongo_dao.get_qcRecords(qc_ids) if len(qc_ids) > 0 else {}
+            if exist_qc_results is None:
+                exist_qc_results = {}
             for record in data_records:
                 qc_result = None
                 if record.get(QC_RESULT_ID):
-                    qc_result = self.mongo_dao.get_qcRecord(record[QC_RESULT_ID])
+                    qc_result = exist_qc_results.get(record[QC_RESULT_ID])
                 status, errors, warnings = self.validate_node(record)
                 if status == STATUS_PASSED:
                     if qc_result:
-                        self.mongo_dao.delete_qcRecord(qc_result[ID])
+                        deleted_qc_ids.append(qc_result[ID])
                         qc_result = None 
                     record[QC_RESULT_ID] = None
                 else:
@@ -225,29 +714,58 @@ class MetaDataValidator:
                     record[QC_RESULT_ID] = qc_result[ID]
                     
                 record[STATUS] = status
+                record[VALIDATION_FINGERPRINT] = self.get_fingerprint(record, errors)
                 record[UPDATED_AT] = record[VALIDATED_AT] = current_datetime()
                 updated_records.append(record)
-                validated_count += 1
         except Exception as e:
             self.log.exception(e)
             msg = f'Failed to validate dataRecords for the submission, {self.submission_id} at scope, {self.scope}!'
             self.log.exception(msg) 
             self.isError = True 
+            failed = True
+        finally:
+            self.valid_values = {}
+        return total_count, updated_records, qc_results, deleted_qc_ids, failed
+
+    """
+    skip records unchanged since their last validation, their results are kept
+    :return: records to validate
+    """
+    def skip_unchanged(self, data_records):
+        changed_records = []
+        for record in data_records:
+            if record[ID] in self.revalidate_ids:
+                changed_records.append(record)
+            elif record.get(STATUS) == STATUS_ERROR:
+                self.isError = True
+            elif record.get(STATUS) == STATUS_WARNING:
+                self.isWarning = True
+        return changed_records
 
+    """
+    save validation results of a chunk, runs in the writer thread of the pipeline
+    :return: (number of records, number of validated records, saved or not)
+    """
+    def save_chunk(self, batch):
+        total_count, updated_records, qc_results, deleted_qc_ids, _ = batch
         #3. update data records based on record's _id
+        if len(deleted_qc_ids) > 0:
+            self.mongo_dao.delete_qcRecords(deleted_qc_ids)
+        saved = True
         if len(qc_results) > 0:
-            result = self.mongo_dao.save_qc_results(qc_results)
+            result, _ = self.mongo_dao.save_qc_results(qc_results)
             if not result:
                 msg = f'Failed to save qcResults for the submission, {self.submission_id} at scope, {self.scope}!'
                 self.log.error(msg)
+                saved = False
                 
-        result = self.mongo_dao.update_data_records_status(updated_records)
+        result, _ = self.mongo_dao.update_data_records_status(updated_records)
         if not result:
             #4. set errors in submission
             msg = f'Failed to update dataRecords for the submission, {self.submission_id} at scope, {self.scope}!'
             self.log.error(msg)
-            self.isError = True
-        return validated_count
+            saved = False
+        return total_count, len(updated_records), saved
 
     def validate_node(self, data_record):
         # set default return values
@@ -272,7 +790,9 @@ class MetaDataValidator:
             warnings = result_required.get(WARNINGS, []) +  result_prop_value.get(WARNINGS, []) + result_rel.get(WARNINGS, [])
             #check if existed nodes in release collection
             if sub_intention and sub_intention in [SUBMISSION_INTENTION_NEW_UPDATE, SUBMISSION_INTENTION_DELETE]:
-                exist_release = self.mongo_dao.search_released_node_with_status(self.submission[DATA_COMMON_NAME], node_type, data_record[NODE_ID], [SUBMISSION_REL_STATUS_RELEASED, None])
+                exist_release = self.released_resolver.get_released_node(node_type, data_record[NODE_ID]) if self.released_resolver else None
+                if exist_release is None:
+                    exist_release = self.mongo_dao.search_released_node_with_status(self.submission[DATA_COMMON_NAME], node_type, data_record[NODE_ID], [SUBMISSION_REL_STATUS_RELEASED, None])
                 if exist_release:
                     #do not raise "missing required property(M003)" and "Relationship not specified(M013)" errors when updating data
                     errors = [e for e in errors if str(e.get("code", "")) != "M003" and str(e.get("code", "")) != "M013"]
@@ -332,6 +852,20 @@ class MetaDataValidator:
                     return True
         return False
     
+    """
+    get nodes of the submission with the node type and ID
+    served from the duplicate nodes of the submission if found before validation, otherwise searched in dataRecords
+    """
+    def get_duplicate_nodes(self, node_type, id_property_key, id_property_value):
+        if self.duplicate_nodes is not None:
+            if not node_type or not id_property_key or id_property_value is None:
+                return []
+            try:
+                return self.duplicate_nodes.get((node_type, id_property_value), [])
+            except TypeError:
+                pass
+        return self.mongo_dao.search_nodes_by_index([{TYPE: node_type, KEY: id_property_key, VALUE_PROP: id_property_value}], self.submission[ID])
+
     def validate_required_props(self, data_record, msg_prefix):
         result = {"result": STATUS_ERROR, ERRORS: [], WARNINGS: []}
         # check the correct format from the data_record
@@ -355,7 +889,7 @@ class MetaDataValidator:
             result[ERRORS].append(create_error("M022", [msg_prefix, id_property_key], id_property_key, ""))
         else:
             # check if duplicate records
-            results = self.mongo_dao.search_nodes_by_index([{TYPE: node_type, KEY: id_property_key, VALUE_PROP: id_property_value}], self.submission[ID])
+            results = self.get_duplicate_nodes(node_type, id_property_key, id_property_value)
             if len(results) > 1:
                 duplicates = ""
                 for item in results:
@@ -428,15 +962,22 @@ class MetaDataValidator:
     def validate_props(self, dataRecord, msg_prefix):
         # set default return values
         errors = []
-        props_def = self.model.get_node_props(dataRecord.get(NODE_TYPE))
-        if props_def is not None:
+        plan = get_validation_plan(self.model, dataRecord.get(NODE_TYPE))
+        if plan is not None:
             props = dataRecord.get(PROPERTIES)
+            # values proven valid by the columnar prefilter, if not changed since
+            valid_values = self.valid_values.get(id(dataRecord), {})
             for k, v in props.items():
-                prop_def = props_def.get(k)
-                if not prop_def or v is None: 
+                check = plan.get(k)
+                if not check or v is None: 
+                    continue
+                valid_value = valid_values.get(k)
+                if valid_value and valid_value[0] is v:
+                    if valid_value[1] is not v:
+                        props[k] = valid_value[1]
                     continue
                 
-                errs = self.validate_prop_value(k, v, prop_def, msg_prefix, dataRecord)
+                errs = check(self, v, msg_prefix, dataRecord)
                 if len(errs) > 0:
                     errors.extend(errs)
 
@@ -474,8 +1015,9 @@ class MetaDataValidator:
             return result
 
         node_keys = self.model.get_node_keys()
-        node_relationships = self.model.get_node_relationships(node_type)
-        parent_nodes = self.get_parent_nodes(data_record_parent_nodes)
+        parent_nodes = self.parent_resolver.get_parent_nodes(data_record_parent_nodes) if self.parent_resolver else None
+        if parent_nodes is None:
+            parent_nodes = self.get_parent_nodes(data_record_parent_nodes)
         data_common = data_record.get(DATA_COMMON_NAME)
         multi_parents = []
         for parent_node in data_record_parent_nodes:
@@ -508,7 +1050,7 @@ class MetaDataValidator:
                 result[ERRORS].append(create_error("M023", [msg_prefix, f'“{parent_id_property}" of “{parent_type}”'], node_type, node_id))
                 continue
 
-            rel_type = node_relationships[parent_type].get(TYPE)
+            rel_type = self.model.get_relationship_type(node_type, parent_type)
             # check if there is only one parent for both one_to_one and many_to_one relationships.
             if rel_type != "many_to_many": 
                 if parent_node not in multi_parents:
@@ -521,7 +1063,9 @@ class MetaDataValidator:
                         
             has_parent = (parent_type, parent_id_property, parent_id_value) in parent_nodes
             if not has_parent:
-                released_parent = self.mongo_dao.search_released_node(data_common, parent_type, parent_id_value)
+                released_parent = self.parent_resolver.is_released(data_common, parent_type, parent_id_value) if self.parent_resolver else None
+                if released_parent is None:
+                    released_parent = self.mongo_dao.search_released_node(data_common, parent_type, parent_id_value)
                 if not released_parent:
                     result[ERRORS].append(create_error("M014", [msg_prefix, parent_type, f'[“{parent_id_property}”: “{parent_id_value}"]'], node_type, node_id))
                 else:
@@ -549,10 +1093,12 @@ class MetaDataValidator:
                     data_record[CONSENT_CODE] = []
                     for consent_code_group_tuple in list(consent_group_parents):
                         #consent_code_group_tuple = list(consent_group_parents)[0]
-                        consent_code_group = self.mongo_dao.get_dataRecord_by_node(consent_code_group_tuple[2], consent_code_group_tuple[0], self.submission_id)
-                        # if can not find conset_code_group, try to find in release collection
-                        if not consent_code_group:
-                            consent_code_group = self.mongo_dao.search_release(self.datacommon, consent_code_group_tuple[0], consent_code_group_tuple[2])
+                        consent_code_group = self.consent_resolver.get_consent_group_node(consent_code_group_tuple) if self.consent_resolver else None
+                        if consent_code_group is None:
+                            consent_code_group = self.mongo_dao.get_dataRecord_by_node(consent_code_group_tuple[2], consent_code_group_tuple[0], self.submission_id)
+                            # if can not find conset_code_group, try to find in release collection
+                            if not consent_code_group:
+                                consent_code_group = self.mongo_dao.search_release(self.datacommon, consent_code_group_tuple[0], consent_code_group_tuple[2])
                         if consent_code_group:
                             consent_code = consent_code_group["props"].get(CONSENT_GROUP_NUMBER)
                             if consent_code:
@@ -572,6 +1118,10 @@ class MetaDataValidator:
         return result
 
     def get_file_consent_code(self, parent_type, parent_id_value, consent_group_parents):
+        consent_groups = self.consent_resolver.get_consent_groups(parent_type, parent_id_value) if self.consent_resolver else None
+        if consent_groups is not None:
+            consent_group_parents.update(consent_groups)
+            return
         # find grandparent in array of tuple (parent_type, parentIDPropName, parent_id_value)
         grandparent_nodes = self.mongo_dao.find_grandparent_by_parent(parent_type, parent_id_value, self.submission_id, self.datacommon)
         if grandparent_nodes:
@@ -600,113 +1150,7 @@ class MetaDataValidator:
             return child_id_list
 
     def validate_prop_value(self, prop_name, value, prop_def, msg_prefix, data_record):
-        # set default return values
-        errors = []
-        type = prop_def.get(TYPE)
-        if not type or not type in valid_prop_types:
-            errors.append(create_error("M009", [msg_prefix, prop_name, type], prop_name, value))
-        else:
-            val = None
-            if type == PROPERTY_PATTERN:
-                pattern = prop_def.get(PROPERTY_PATTERN)
-                if pattern: 
-                    try:
-                        pattern_obj = re.compile(pattern)
-                        if not pattern_obj.match(str(value)):
-                            errors.append(create_error("M031", [msg_prefix, value, prop_name], prop_name, value))
-                    except Exception as e:
-                        self.log.exception(f"Failed to compile the pattern, {pattern} for the property: {prop_name}.")
-                        errors.append(create_error("M032", [msg_prefix, pattern, prop_name], prop_name, pattern))
-                else:
-                    errors.append(create_error("M032", [msg_prefix, pattern, prop_name], prop_name, pattern))
-                return errors
-            
-            minimum = prop_def.get(MIN)
-            maximum = prop_def.get(MAX)
-            permissive_vals, msg, check_concept_code, cde_code = self.get_permissive_value(prop_def)
-            if msg and msg == CDE_NOT_FOUND:
-                errors.append(create_error("M027", [msg_prefix, prop_name], prop_name, value))
-            if check_concept_code == True:
-                self.set_concept_code(data_record, prop_name, value, cde_code)
-            if type == "string":
-                val = str(value)
-                result, error, corrected_value = check_permissive(val, permissive_vals, msg_prefix, prop_name, self.mongo_dao)
-                if not result:
-                    errors.append(error)
-                else:
-                    # Update with corrected case if different
-                    if corrected_value != value:
-                        data_record[PROPERTIES][prop_name] = corrected_value
-            elif type == "integer":
-                try:
-                    val = int(value)
-                except ValueError as e:
-                    errors.append(create_error("M004",[msg_prefix, prop_name, value], prop_name, value))
-                    return errors
-
-                result, error, corrected_value = check_permissive(val, permissive_vals, msg_prefix, prop_name, self.mongo_dao)
-                if not result:
-                    errors.append(error)
-
-                errs = check_boundary(val, minimum, maximum, msg_prefix, prop_name)
-                if len(errs) > 0:
-                    errors.extend(errs)
-
-            elif type == "number":
-                try:
-                    val = float(value)
-                except ValueError as e:
-                    errors.append(create_error("M005", [msg_prefix, prop_name, value], prop_name, value))
-                result, error, corrected_value = check_permissive(val, permissive_vals, msg_prefix, prop_name, self.mongo_dao)
-                if not result:
-                    errors.append(error)
-
-                errs = check_boundary(val, minimum, maximum, msg_prefix, prop_name)
-                if len(errs) > 0:
-                    errors.extend(errs)
-
-            elif type == "date" or type == "datetime":
-                val = None
-                for date_format in DATE_FORMATS:
-                    try:
-                        val = datetime.strptime(value, date_format)
-                        break #if the value can be parsed with the format
-                    except ValueError as e:
-                        continue
-                if val is None:
-                    errors.append(create_error("M007",[msg_prefix, prop_name, value], prop_name, value))
-
-            elif type == "boolean":
-                pv_list = ["yes", "true", "no", "false"]
-                if not isinstance(value, bool):
-                    if value.lower() not in pv_list: 
-                        errors.append(create_error("M008",[msg_prefix, prop_name, value], prop_name, value))
-                    else:
-                        matched_val = next((item for item in pv_list if item == value.lower()))
-                        data_record[PROPERTIES][prop_name] = (matched_val in ["yes", "true"]) #transform to boolean
-
-            elif (type == "array" or type == "value-list"):
-                if not permissive_vals or len(permissive_vals) == 0: 
-                    return errors #skip validation by crdcdh-1723
-                val = str(value)
-                list_delimiter = self.model.get_list_delimiter()
-                arr = val.split(list_delimiter) if list_delimiter in val else [value]
-                corrected_items = []
-                for item in arr:
-                    val = item.strip() if item and isinstance(item, str) else item
-                    result, error, corrected_value = check_permissive(val, permissive_vals, msg_prefix, prop_name, self.mongo_dao)
-                    if not result:
-                        errors.append(error)
-                        corrected_items.append(val)  # Keep original if invalid
-                    else:
-                        corrected_items.append(corrected_value)
-                # Update the property with all corrected items joined back together
-                if len(errors) == 0:  # Only update if all items are valid
-                    data_record[PROPERTIES][prop_name] = list_delimiter.join([str(item) for item in corrected_items])
-            else:
-                errors.append(create_error("M009", [msg_prefix, prop_name, value], prop_name, value))
-
-        return errors
+        return compile_property_check(prop_name, prop_def)(self, value, msg_prefix, data_record)
     
     def set_concept_code(self, data_record, prop_name, value, cde_code):
         """
@@ -732,54 +1176,74 @@ class MetaDataValidator:
         data_record[GENERATED_PROPS].update({property_concept_code_name: list_delimiter.join(concept_code_values)})
   
     
+    """
+    get CDE permissible values from the process-wide cache, or from DB if not cached
+    """
+    def get_cde(self, cde_code, cde_version):
+        cde = cde_cache.get(cde_code, cde_version)
+        if cde:
+            self.cde_cache_hits += 1
+            return cde
+        self.cde_cache_misses += 1
+        cde = self.mongo_dao.get_cde_permissible_values(cde_code, cde_version)
+        return cde_cache.put_cde(cde_code, cde_version, cde) if cde else cde_cache.put_negative(cde_code, cde_version, CDE_MISSING)
+
+    """
+    get permissible values matcher of a property defined in the model, built once per validation
+    """
+    def get_model_pv_matcher(self, prop_def, strip=True):
+        # prop_def is kept with the matcher, so its id is not reused during the validation
+        key = (id(prop_def), strip)
+        cached = self.pv_matchers.get(key)
+        if cached and cached[0] is prop_def:
+            return cached[1]
+        permissive_vals = prop_def.get("permissible_values")
+        if not permissive_vals:
+            return None
+        # strip white space if the value is string
+        if strip and isinstance(permissive_vals[0], str):
+            permissive_vals = [item.strip() for item in permissive_vals]
+        matcher = PermissibleValueMatcher(permissive_vals)
+        self.pv_matchers[key] = (prop_def, matcher)
+        return matcher
+
     """
     get permissible values of a property
+    :param prop_def: property definition
+    :param cde_term: optional (has CDE term, CDE code, CDE version) of the property parsed before
+    :return: permissible values matcher or None if not validated, message, check concept code or not, CDE code
     """
-    def get_permissive_value(self, prop_def):
-        permissive_vals = prop_def.get("permissible_values") 
+    def get_permissive_value(self, prop_def, cde_term=None):
+        permissive_vals = self.get_model_pv_matcher(prop_def)
         msg = None
         check_concept_code = False
-        cde_code = None
-        if prop_def.get(CDE_TERM) and len(prop_def.get(CDE_TERM)) > 0:
+        has_cde_term, cde_code, cde_version = cde_term if cde_term else get_cde_term(prop_def)
+        if has_cde_term:
             # retrieve permissible values from DB or cde site
-            cde_terms = [ct for ct in prop_def[CDE_TERM] if 'caDSR' in ct.get('Origin', '')]
-            if cde_terms and len(cde_terms) > 0:
-                cde_code = cde_terms[0].get(TERM_CODE) 
-                cde_version = cde_terms[0].get(TERM_VERSION)
             if not cde_code:
-                return permissive_vals, msg, check_concept_code, cde_code
+                return self.get_model_pv_matcher(prop_def, False), msg, check_concept_code, cde_code
             
-            cde = self.mongo_dao.get_cde_permissible_values(cde_code, cde_version)
-            if cde:
-                if cde.get(CDE_PERMISSIVE_VALUES) is not None: 
-                    if len(cde.get(CDE_PERMISSIVE_VALUES)) > 0:
-                        permissive_vals = cde[CDE_PERMISSIVE_VALUES]
-                        check_concept_code = True
-                    else:
-                        permissive_vals = None
-            else:
+            cde = self.get_cde(cde_code, cde_version)
+            if cde.state != CDE_FOUND:
                 if not self.searched_sts:
-                    cde = get_pv_by_code_version(self.config, self.log, cde_code, cde_version, self.mongo_dao)
                     self.searched_sts = True
-                    if cde:
-                        if cde.get(CDE_PERMISSIVE_VALUES) is not None:
-                            if len(cde[CDE_PERMISSIVE_VALUES]) > 0:
-                                permissive_vals = cde[CDE_PERMISSIVE_VALUES]
-                                check_concept_code = True
-                            else:
-                                permissive_vals =  None #escape validation
-                            
+                    # STS is not searched again for a CDE recently not found in STS
+                    sts_cde = get_pv_by_code_version(self.config, self.log, cde_code, cde_version, self.mongo_dao) if cde.state == CDE_MISSING else None
+                    if sts_cde:
+                        cde = cde_cache.put_cde(cde_code, cde_version, sts_cde)
                     else:
+                        if cde.state == CDE_MISSING:
+                            cde_cache.put_negative(cde_code, cde_version, CDE_NOT_AVAILABLE)
                         msg = CDE_NOT_FOUND
                         self.not_found_cde = True
-                else: 
-                    if self.not_found_cde:
-                        msg = CDE_NOT_FOUND
+                elif self.not_found_cde:
+                    msg = CDE_NOT_FOUND
+
+            if cde.state == CDE_FOUND and cde.pvs is not None:
+                if len(cde.pvs) > 0:
+                    return cde.get_matcher(), msg, True, cde_code
+                permissive_vals = None #escape validation
 
-                       
-        # strip white space if the value is string
-        if permissive_vals and len(permissive_vals) > 0 and isinstance(permissive_vals[0], str):
-            permissive_vals = [item.strip() for item in permissive_vals]
         return permissive_vals, msg, check_concept_code, cde_code
 
     
@@ -793,31 +1257,189 @@ def check_permissive(value, permissive_vals, msg_prefix, prop_name, dao):
         value = value.strip()
         corrected_value = value
     if permissive_vals and len(permissive_vals) > 0:
-        permissive_vals.append(DELETE_COMMAND)
-        if isinstance(permissive_vals[0], str):
-            # find value in pv list in case-insensitive if value is string
-            matched_val = next((item for item in permissive_vals if item.lower() == str(value).lower()), None)
-            if not matched_val: 
-                result = False
-            else:
-                # if found, check if value in pv list in case-sensitive
-                if value not in permissive_vals:
-                    # return the corrected value with correct case
-                    corrected_value = matched_val
+        matcher = permissive_vals if isinstance(permissive_vals, PermissibleValueMatcher) else PermissibleValueMatcher(permissive_vals)
+        result, corrected_value = matcher.match(value)
+        if not result:
+            error = permissive_value_error(value, matcher, msg_prefix, prop_name, dao)
+    return result, error, corrected_value
+
+"""
+create M010 error of a value not in permissible values, with the permissible value semantically equivalent if any
+"""
+def permissive_value_error(value, matcher, msg_prefix, prop_name, dao):
+    error = create_error("M010", [msg_prefix, value, prop_name], prop_name, value)
+    # check synonym
+    synonyms = dao.find_pvs_by_synonym(value)
+    if not synonyms or len(synonyms) == 0:
+        return error
+    suggested_pvs = [item[PV_TERM] for item in synonyms]
+    permissive_val = matcher.first_of(suggested_pvs)
+    if permissive_val is not None:
+        error["description"] += f' It is recommended to use "{permissive_val}", as it is semantically equivalent to "{value}"' 
+    return error
+
+"""
+get caDSR CDE term of a property
+:return: has CDE term or not, CDE code, CDE version
+"""
+def get_cde_term(prop_def):
+    cde_code = None
+    cde_version = None
+    if prop_def.get(CDE_TERM) and len(prop_def.get(CDE_TERM)) > 0:
+        cde_terms = [ct for ct in prop_def[CDE_TERM] if 'caDSR' in ct.get('Origin', '')]
+        if cde_terms and len(cde_terms) > 0:
+            cde_code = cde_terms[0].get(TERM_CODE) 
+            cde_version = cde_terms[0].get(TERM_VERSION)
+        return True, cde_code, cde_version
+    return False, cde_code, cde_version
+
+# DataModel -> {node type: validation plan}, released with the model
+validation_plans = weakref.WeakKeyDictionary()
+
+"""
+get validation plan of a node type, compiled once per model and node type
+:return: dict of property name and checker, None if the node type is not in the model
+"""
+def get_validation_plan(model, node_type):
+    plans = validation_plans.get(model)
+    if plans is None:
+        plans = validation_plans.setdefault(model, {})
+    plan = plans.get(node_type)
+    if plan is None:
+        props_def = model.get_node_props(node_type)
+        if props_def is None:
+            return None
+        plan = {prop_name: compile_property_check(prop_name, prop_def) for prop_name, prop_def in props_def.items() if prop_def}
+        plans[node_type] = plan
+    return plan
+
+"""
+compile the checks of a property, everything derived from the property definition is prepared once
+:return: checker function(validator, value, msg_prefix, data_record) returns list of errors
+"""
+def compile_property_check(prop_name, prop_def):
+    type = prop_def.get(TYPE)
+    if not type or not type in valid_prop_types:
+        def check_invalid_type(validator, value, msg_prefix, data_record):
+            return [create_error("M009", [msg_prefix, prop_name, type], prop_name, value)]
+        return check_invalid_type
+
+    if type == PROPERTY_PATTERN:
+        return compile_pattern_check(prop_name, prop_def.get(PROPERTY_PATTERN))
+
+    minimum = prop_def.get(MIN)
+    maximum = prop_def.get(MAX)
+    cde_term = get_cde_term(prop_def)
+    check_type = type_checks.get(type, check_unknown_type)
+    def check(validator, value, msg_prefix, data_record):
+        errors = []
+        permissive_vals, msg, check_concept_code, cde_code = validator.get_permissive_value(prop_def, cde_term)
+        if msg and msg == CDE_NOT_FOUND:
+            errors.append(create_error("M027", [msg_prefix, prop_name], prop_name, value))
+        if check_concept_code == True:
+            validator.set_concept_code(data_record, prop_name, value, cde_code)
+        check_type(validator, prop_name, value, permissive_vals, minimum, maximum, msg_prefix, data_record, errors)
+        return errors
+    return check
+
+def compile_pattern_check(prop_name, pattern):
+    pattern_obj = None
+    compile_failed = False
+    if pattern:
+        try:
+            pattern_obj = re.compile(pattern)
+        except Exception as e:
+            compile_failed = True
+    def check_pattern(validator, value, msg_prefix, data_record):
+        if pattern_obj:
+            if not pattern_obj.match(str(value)):
+                return [create_error("M031", [msg_prefix, value, prop_name], prop_name, value)]
+            return []
+        if compile_failed:
+            validator.log.error(f"Failed to compile the pattern, {pattern} for the property: {prop_name}.")
+        return [create_error("M032", [msg_prefix, pattern, prop_name], prop_name, pattern)]
+    return check_pattern
+
+def check_string(validator, prop_name, value, permissive_vals, minimum, maximum, msg_prefix, data_record, errors):
+    val = str(value)
+    result, error, corrected_value = check_permissive(val, permissive_vals, msg_prefix, prop_name, validator.mongo_dao)
+    if not result:
+        errors.append(error)
+    else:
+        # Update with corrected case if different
+        if corrected_value != value:
+            data_record[PROPERTIES][prop_name] = corrected_value
+
+def check_integer(validator, prop_name, value, permissive_vals, minimum, maximum, msg_prefix, data_record, errors):
+    try:
+        val = int(value)
+    except ValueError as e:
+        errors.append(create_error("M004",[msg_prefix, prop_name, value], prop_name, value))
+        return
+
+    result, error, corrected_value = check_permissive(val, permissive_vals, msg_prefix, prop_name, validator.mongo_dao)
+    if not result:
+        errors.append(error)
+
+    errs = check_boundary(val, minimum, maximum, msg_prefix, prop_name)
+    if len(errs) > 0:
+        errors.extend(errs)
+
+def check_number(validator, prop_name, value, permissive_vals, minimum, maximum, msg_prefix, data_record, errors):
+    val = None
+    try:
+        val = float(value)
+    except ValueError as e:
+        errors.append(create_error("M005", [msg_prefix, prop_name, value], prop_name, value))
+    result, error, corrected_value = check_permissive(val, permissive_vals, msg_prefix, prop_name, validator.mongo_dao)
+    if not result:
+        errors.append(error)
+
+    errs = check_boundary(val, minimum, maximum, msg_prefix, prop_name)
+    if len(errs) > 0:
+        errors.extend(errs)
+
+def check_date(validator, prop_name, value, permissive_vals, minimum, maximum, msg_prefix, data_record, errors):
+    if not validator.date_validator.is_valid(prop_name, value):
+        errors.append(create_error("M007",[msg_prefix, prop_name, value], prop_name, value))
+
+BOOLEAN_VALUES = ["yes", "true", "no", "false"]
+
+def check_boolean(validator, prop_name, value, permissive_vals, minimum, maximum, msg_prefix, data_record, errors):
+    if not isinstance(value, bool):
+        if value.lower() not in BOOLEAN_VALUES: 
+            errors.append(create_error("M008",[msg_prefix, prop_name, value], prop_name, value))
         else:
-            result = (value in permissive_vals)
+            data_record[PROPERTIES][prop_name] = (value.lower() in ["yes", "true"]) #transform to boolean
 
+def check_list(validator, prop_name, value, permissive_vals, minimum, maximum, msg_prefix, data_record, errors):
+    if not permissive_vals or len(permissive_vals) == 0: 
+        return #skip validation by crdcdh-1723
+    list_delimiter = validator.model.get_list_delimiter()
+    corrected_items = []
+    for val, result, corrected_value in permissive_vals.match_items(value, list_delimiter):
         if not result:
-            error = create_error("M010", [msg_prefix, value, prop_name], prop_name, value)
-            # check synonym
-            synonyms = dao.find_pvs_by_synonym(value)
-            if not synonyms or len(synonyms) == 0:
-                return result, error, corrected_value 
-            suggested_pvs = [item[PV_TERM] for item in synonyms]
-            permissive_val = [item for item in permissive_vals if item in suggested_pvs]
-            if permissive_val and len(permissive_val) > 0: 
-                error["description"] += f' It is recommended to use "{permissive_val[0]}", as it is semantically equivalent to "{value}"' 
-    return result, error, corrected_value
+            errors.append(permissive_value_error(val, permissive_vals, msg_prefix, prop_name, validator.mongo_dao))
+            corrected_items.append(val)  # Keep original if invalid
+        else:
+            corrected_items.append(corrected_value)
+    # Update the property with all corrected items joined back together
+    if len(errors) == 0:  # Only update if all items are valid
+        data_record[PROPERTIES][prop_name] = list_delimiter.join([str(item) for item in corrected_items])
+
+def check_unknown_type(validator, prop_name, value, permissive_vals, minimum, maximum, msg_prefix, data_record, errors):
+    errors.append(create_error("M009", [msg_prefix, prop_name, value], prop_name, value))
+
+type_checks = {
+    "string": check_string,
+    "integer": check_integer,
+    "number": check_number,
+    "date": check_date,
+    "datetime": check_date,
+    "boolean": check_boolean,
+    "array": check_list,
+    "value-list": check_list
+}
 
 def check_boundary(value, min, max, msg_prefix, prop_name):
     errors = []
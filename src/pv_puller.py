@@ -4,6 +4,7 @@ from common.constants import TIER_CONFIG, CDE_API_URL, CDE_CODE, CDE_VERSION, CD
         CDE_PERMISSIVE_VALUES, STS_DATA_RESOURCE_CONFIG, STS_DATA_RESOURCE_API, STS_DATA_RESOURCE_FILE, STS_DUMP_CONFIG, DATA_COMMONS_LIST, HIDDEN_MODELS, KEY
 from common.utils import get_exception_msg
 from common.api_client import APIInvoker
+from common.cde_cache import cde_cache
 
 MODEL_DEFS = "models"
 CADSR_DATA_ELEMENT = "DataElement"
@@ -316,7 +317,16 @@ def get_pv_by_code_version(configs, log, cde_code, cde_version, mongo_dao):
     # save cde pv to db
     result, _ = mongo_dao.upsert_cde([cde_record])
     if result:
+        invalidate_cached_cdes([cde_record])
         log.info(f"CED PV are pulled and save successfully!")
     else:
         log.error(f"Failed to pull and save CDE PV! {msg}")
-    return cde_record
\ No newline at end of file
+    return cde_record
+
+"""
+invalidate the CDEs cached by this process after their permissible values are saved, cached CDEs of the latest version too.
+the caches of other processes are cleared by cde_cache.check_generation when the CDE collection changes
+:param cde_records: saved CDE records
+"""
+def invalidate_cached_cdes(cde_records):
+    cde_cache.invalidate([(cde[CDE_CODE], version) for cde in cde_records for version in [cde[CDE_VERSION], None]])
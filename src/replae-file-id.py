@@ -39,7 +39,9 @@ class ReplaeFileId():
         print(f'Study ID: {self.study_id}')
 
     def replace_file_ids(self, do_update=False):
-        all_files = self.mongo_dao.get_dataRecords_chunk_by_nodeType(self.submission_id, FILE_NODE_NAME, 0, 10000)
+        # all files are read before any update, updated nodeIDs would change the keyset pagination order
+        all_files = [file for chunk in self.mongo_dao.iterate_dataRecords_chunks(self.submission_id, node_type=FILE_NODE_NAME)
+                     for file in chunk]
         touched_files = []
         for file in all_files:
             print(f'========== Processing file: {file["_id"]} ==============')
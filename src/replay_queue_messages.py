@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Replay recorded queue message bodies into a file backed local queue, to load test a service configured with
+    queue-backend: local
+    local-queue-path: <same sqlite file>
+Messages are read from a json file (list of message bodies) or a json lines file (one message body per line).
+Example, run from src folder:
+    python replay_queue_messages.py -q crdcdh-metadata-queue.fifo -p /tmp/queue.db -i recorded_messages.jsonl -r 10
+"""
+import argparse
+import json
+import time
+from common.constants import SUBMISSION_ID, BATCH_ID, FILE_ID
+from common.local_queue import LocalQueue
+from common.utils import get_uuid_str
+
+def load_messages(file_path):
+    with open(file_path) as f:
+        content = f.read().strip()
+    if content.startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded message bodies into a local queue')
+    parser.add_argument('-q', '--queue', required=True, help='queue name, same as the sqs name of the service')
+    parser.add_argument('-p', '--path', required=True, help='sqlite file of the local queue')
+    parser.add_argument('-i', '--input', required=True, help='json or json lines file of recorded message bodies')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='number of times to replay the messages')
+    parser.add_argument('-d', '--delay', type=float, default=0, help='seconds between messages')
+    parser.add_argument('--unique-groups', action='store_true',
+                        help='send every message in its own message group instead of grouping by submission, batch or file')
+    args = parser.parse_args()
+
+    messages = load_messages(args.input)
+    queue = LocalQueue(args.queue, args.path)
+    sent = 0
+    start = time.time()
+    for _ in range(args.repeat):
+        for msg in messages:
+            group_id = None if args.unique_groups else msg.get(SUBMISSION_ID) or msg.get(BATCH_ID) or msg.get(FILE_ID)
+            queue.sendMsgToQueue(msg, group_id or get_uuid_str())
+            sent += 1
+            if args.delay:
+                time.sleep(args.delay)
+    print(f"Sent {sent} message(s) to {queue.queue_url} in {time.time() - start:.2f}s, "
+          f"{queue.getApproximateNumberOfMessages()} message(s) visible.")
+    queue.close()
+
+if __name__ == '__main__':
+    main()
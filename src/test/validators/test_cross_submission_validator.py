@@ -105,17 +105,17 @@ class TestCrossSubmissionValidator:
     def test_validate_submission_no_metadata(self, validator, mock_mongo_dao, valid_submission):
         """Test validate when submission has no metadata records."""
         mock_mongo_dao.get_submission.return_value = valid_submission
-        mock_mongo_dao.get_dataRecords_chunk.return_value = []
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([])
         
         result = validator.validate('test-submission')
         
         assert result == FAILED
-        mock_mongo_dao.get_dataRecords_chunk.assert_called_once()
+        mock_mongo_dao.iterate_dataRecords_chunks.assert_called_once()
 
     def test_validate_success_no_conflicts(self, validator, mock_mongo_dao, valid_submission, sample_data_records):
         """Test successful validation with no conflicts."""
         mock_mongo_dao.get_submission.return_value = valid_submission
-        mock_mongo_dao.get_dataRecords_chunk.return_value = sample_data_records
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([sample_data_records])
         mock_mongo_dao.find_node_in_other_submissions_in_status.return_value = (False, [])
         mock_mongo_dao.update_data_records_addition_error.return_value = True
         
@@ -129,14 +129,24 @@ class TestCrossSubmissionValidator:
     def test_validate_success_with_conflicts(self, validator, mock_mongo_dao, valid_submission, sample_data_records):
         """Test validation with conflicts found."""
         mock_mongo_dao.get_submission.return_value = valid_submission
-        mock_mongo_dao.get_dataRecords_chunk.return_value = sample_data_records
-        mock_mongo_dao.find_node_in_other_submissions_in_status.return_value = (True, [{'id': 'conflicting-sub-123'}])
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([sample_data_records])
+        mock_mongo_dao.find_other_submissions_in_status.return_value = [{'_id': 'conflicting-sub-123'}]
+        mock_mongo_dao.find_nodes_in_submissions.return_value = [{NODE_TYPE: 'program', NODE_ID: 'prog-001', 'submissionID': 'conflicting-sub-123'}]
         mock_mongo_dao.update_data_records_addition_error.return_value = True
         
         result = validator.validate('test-submission')
         
         assert result == STATUS_ERROR
         assert validator.isError is True
+        # conflicting submissions are resolved once, nodes are searched per chunk instead of per record
+        mock_mongo_dao.find_other_submissions_in_status.assert_called_once_with('test-submission', 'test-study-456', 'test-data-commons',
+                                                                                 [SUBMISSION_STATUS_SUBMITTED, SUBMISSION_REL_STATUS_RELEASED])
+        mock_mongo_dao.find_nodes_in_submissions.assert_called_once_with('test-data-commons', ['conflicting-sub-123'],
+                                                                         {'program': {'prog-001'}, 'study': {'study-001'}})
+        mock_mongo_dao.find_node_in_other_submissions_in_status.assert_not_called()
+        updated_records = mock_mongo_dao.update_data_records_addition_error.call_args.args[0]
+        assert updated_records[0][ADDITION_ERRORS][0]['conflictingSubmissions'] == ['conflicting-sub-123']
+        assert updated_records[1][ADDITION_ERRORS] == []
 
     def test_validate_batch_processing(self, validator, mock_mongo_dao, valid_submission):
         """Test validation with multiple batches of data records."""
@@ -144,22 +154,22 @@ class TestCrossSubmissionValidator:
         large_batch = [{'nodeType': 'program', 'nodeID': f'prog-{i}'} for i in range(1001)]
         
         mock_mongo_dao.get_submission.return_value = valid_submission
-        mock_mongo_dao.get_dataRecords_chunk.side_effect = [
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([
             large_batch[:1000],  # First batch
             large_batch[1000:]   # Second batch (smaller)
-        ]
+        ])
         mock_mongo_dao.find_node_in_other_submissions_in_status.return_value = (False, [])
         mock_mongo_dao.update_data_records_addition_error.return_value = True
         
         result = validator.validate('test-submission')
         
         assert result == STATUS_PASSED
-        assert mock_mongo_dao.get_dataRecords_chunk.call_count == 2
+        assert mock_mongo_dao.update_data_records_addition_error.call_count == 2
 
     def test_validate_nodes_exception_handling(self, validator, mock_mongo_dao, valid_submission):
         """Test validate_nodes exception handling."""
         mock_mongo_dao.get_submission.return_value = valid_submission
-        mock_mongo_dao.get_dataRecords_chunk.return_value = [{'invalid': 'record'}]
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([[{'invalid': 'record'}]])
         mock_mongo_dao.update_data_records_addition_error.return_value = True
         
         # Mock validate_node to raise an exception
@@ -172,7 +182,7 @@ class TestCrossSubmissionValidator:
     def test_validate_nodes_update_failure(self, validator, mock_mongo_dao, valid_submission, sample_data_records):
         """Test validate_nodes when database update fails."""
         mock_mongo_dao.get_submission.return_value = valid_submission
-        mock_mongo_dao.get_dataRecords_chunk.return_value = sample_data_records
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([sample_data_records])
         mock_mongo_dao.find_node_in_other_submissions_in_status.return_value = (False, [])
         mock_mongo_dao.update_data_records_addition_error.return_value = False
         
@@ -259,7 +269,7 @@ class TestCrossSubmissionValidator:
         }
         
         mock_mongo_dao.get_submission.return_value = released_submission
-        mock_mongo_dao.get_dataRecords_chunk.return_value = sample_data_records
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([sample_data_records])
         mock_mongo_dao.find_node_in_other_submissions_in_status.return_value = (False, [])
         mock_mongo_dao.update_data_records_addition_error.return_value = True
         
@@ -273,7 +283,7 @@ class TestCrossSubmissionValidator:
         mock_datetime.return_value = '2024-01-01T12:00:00Z'
         
         mock_mongo_dao.get_submission.return_value = valid_submission
-        mock_mongo_dao.get_dataRecords_chunk.return_value = sample_data_records
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([sample_data_records])
         mock_mongo_dao.find_node_in_other_submissions_in_status.return_value = (False, [])
         mock_mongo_dao.update_data_records_addition_error.return_value = True
         
@@ -325,3 +335,30 @@ class TestCrossSubmissionValidator:
         result = validator.validate('test-submission')
         
         assert result == FAILED
+
+    def test_validate_no_other_submissions(self, validator, mock_mongo_dao, valid_submission, sample_data_records):
+        """Test validate does not search nodes when the study has no other submissions."""
+        mock_mongo_dao.get_submission.return_value = valid_submission
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([sample_data_records])
+        mock_mongo_dao.find_other_submissions_in_status.return_value = []
+        mock_mongo_dao.update_data_records_addition_error.return_value = True
+
+        result = validator.validate('test-submission')
+
+        assert result == STATUS_PASSED
+        mock_mongo_dao.find_nodes_in_submissions.assert_not_called()
+        mock_mongo_dao.find_node_in_other_submissions_in_status.assert_not_called()
+
+    def test_validate_chunk_search_failure(self, validator, mock_mongo_dao, valid_submission, sample_data_records):
+        """Test validate falls back to searching nodes one by one when the chunk search fails."""
+        mock_mongo_dao.get_submission.return_value = valid_submission
+        mock_mongo_dao.iterate_dataRecords_chunks.return_value = iter([sample_data_records])
+        mock_mongo_dao.find_other_submissions_in_status.return_value = [{'_id': 'conflicting-sub-123'}]
+        mock_mongo_dao.find_nodes_in_submissions.return_value = None
+        mock_mongo_dao.find_node_in_other_submissions_in_status.return_value = (True, [{'_id': 'conflicting-sub-123'}])
+        mock_mongo_dao.update_data_records_addition_error.return_value = True
+
+        result = validator.validate('test-submission')
+
+        assert result == STATUS_ERROR
+        assert mock_mongo_dao.find_node_in_other_submissions_in_status.call_count == 2
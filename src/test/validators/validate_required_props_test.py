@@ -368,3 +368,17 @@ def test_validate_required_props(validator, data_record, node_definition, expect
     assert result['result'] == expected_result
     assert result[ERRORS] == expected_errors
     assert result[WARNINGS] == expected_warnings
+
+
+def test_validate_required_props_duplicate_index(validator, mock_mongo_dao):
+    # duplicates found once before validation are served without searching each record
+    validator.model = DataModel({"nodes": {"program": {"id_property": "program_id", "properties": {"program_id": {"required": True}}}}})
+    validator.duplicate_nodes = {("program", "p1"): [{"_id": "1", "orginalFileName": "a.tsv", "lineNumber": 2},
+                                                     {"_id": "2", "orginalFileName": "b.tsv", "lineNumber": 3}]}
+    result = validator.validate_required_props({"_id": "1", "nodeType": "program", "props": {"program_id": "p1"}}, "prefix")
+    assert [e["code"] for e in result[ERRORS]] == ["M016"]
+    assert '"b.tsv" line 3' in result[ERRORS][0]["description"]
+    assert '"a.tsv"' not in result[ERRORS][0]["description"]
+    result = validator.validate_required_props({"_id": "3", "nodeType": "program", "props": {"program_id": "p2"}}, "prefix")
+    assert result[ERRORS] == []
+    mock_mongo_dao.search_nodes_by_index.assert_not_called()
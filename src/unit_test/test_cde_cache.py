@@ -0,0 +1,132 @@
+"""
+Unit tests for CDECache and CDE permissible value lookup of MetaDataValidator
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+from common.cde_cache import CDECache, CDE_FOUND, CDE_MISSING, CDE_NOT_AVAILABLE
+import metadata_validator
+from metadata_validator import MetaDataValidator, CDE_NOT_FOUND
+from pv_puller import invalidate_cached_cdes
+
+PROP_DEF = {"Term": [{"Origin": "caDSR", "Code": "123", "Version": "1.00"}], "permissible_values": ["model value"]}
+
+
+class TestCDECache(unittest.TestCase):
+    """Test cases for CDECache"""
+
+    def test_found_normalized(self):
+        """Permissible values are stripped once when cached"""
+        cache = CDECache()
+        cache.put_cde("1", "1.0", {"PermissibleValues": [" a ", "b "]})
+        entry = cache.get("1", "1.0")
+        self.assertEqual(entry.state, CDE_FOUND)
+        self.assertEqual(entry.pvs, ["a", "b"])
+        self.assertIsNone(cache.get("1", "2.0"))
+
+    def test_expiry(self):
+        """Entries expire after TTL, negative entries after negative TTL"""
+        cache = CDECache(ttl=100, negative_ttl=10)
+        with patch("common.cde_cache.time.monotonic", return_value=1000):
+            cache.put_cde("1", "1.0", {"PermissibleValues": ["a"]})
+            cache.put_negative("2", "1.0", CDE_MISSING)
+        with patch("common.cde_cache.time.monotonic", return_value=1050):
+            self.assertIsNotNone(cache.get("1", "1.0"))
+            self.assertIsNone(cache.get("2", "1.0"))
+        with patch("common.cde_cache.time.monotonic", return_value=1101):
+            self.assertIsNone(cache.get("1", "1.0"))
+
+    def test_disabled(self):
+        """Nothing is cached with TTL 0"""
+        cache = CDECache(ttl=0, negative_ttl=0)
+        self.assertEqual(cache.put_cde("1", "1.0", {"PermissibleValues": ["a"]}).pvs, ["a"])
+        self.assertIsNone(cache.get("1", "1.0"))
+
+    def test_invalidation(self):
+        """Entries are removed by key and cleared when the CDE collection generation changes"""
+        cache = CDECache()
+        cache.put_cde("1", "1.0", {"PermissibleValues": ["a"]})
+        cache.put_cde("2", "1.0", {"PermissibleValues": ["a"]})
+        cache.invalidate([("1", "1.0")])
+        self.assertIsNone(cache.get("1", "1.0"))
+        cache.check_generation("t1")
+        self.assertEqual(len(cache), 0)
+        cache.put_cde("2", "1.0", {"PermissibleValues": ["a"]})
+        cache.check_generation("t1")
+        self.assertEqual(len(cache), 1)
+        cache.check_generation("t2")
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidated_after_pull(self):
+        """Pulled CDEs are invalidated with their latest version entries once they are saved"""
+        cache = CDECache()
+        for version in ["1.0", None, "2.0"]:
+            cache.put_cde("1", version, {"PermissibleValues": ["a"]})
+        with patch("pv_puller.cde_cache", cache):
+            invalidate_cached_cdes([{"CDECode": "1", "CDEVersion": "1.0"}])
+        self.assertIsNone(cache.get("1", "1.0"))
+        self.assertIsNone(cache.get("1", None))
+        self.assertIsNotNone(cache.get("1", "2.0"))
+
+
+class TestCDELookup(unittest.TestCase):
+    """Test cases for MetaDataValidator.get_permissive_value with the CDE cache"""
+
+    def setUp(self):
+        self.cache = CDECache()
+        patcher = patch.object(metadata_validator, "cde_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dao = MagicMock()
+
+    def validator(self):
+        return MetaDataValidator(self.dao, None, {})
+
+    def lookup(self, validator):
+        # permissible values of the matcher in place of the matcher
+        matcher, msg, check_concept_code, cde_code = validator.get_permissive_value(PROP_DEF)
+        return (matcher.permissible_values if matcher is not None else None), msg, check_concept_code, cde_code
+
+    def test_db_queried_once(self):
+        """CDE is queried once and its matcher is shared by validations"""
+        self.dao.get_cde_permissible_values.return_value = {"PermissibleValues": ["a ", "b"]}
+        first = self.validator()
+        self.assertEqual(self.lookup(first), (["a", "b"], None, True, "123"))
+        second = self.validator()
+        self.assertIs(second.get_permissive_value(PROP_DEF)[0], first.get_permissive_value(PROP_DEF)[0])
+        self.dao.get_cde_permissible_values.assert_called_once_with("123", "1.00")
+        self.assertEqual((first.cde_cache_hits, first.cde_cache_misses), (1, 1))
+        self.assertEqual((second.cde_cache_hits, second.cde_cache_misses), (1, 0))
+
+    def test_empty_and_missing_field(self):
+        """Empty permissible values escape validation, no permissible values field falls back to model values"""
+        self.dao.get_cde_permissible_values.return_value = {"PermissibleValues": []}
+        self.assertEqual(self.lookup(self.validator()), (None, None, False, "123"))
+        self.cache.invalidate()
+        self.dao.get_cde_permissible_values.return_value = {"PermissibleValues": None}
+        self.assertEqual(self.lookup(self.validator()), (["model value"], None, False, "123"))
+
+    @patch("metadata_validator.get_pv_by_code_version", return_value=None)
+    def test_not_available_cached(self, mock_sts):
+        """CDE not found in DB nor STS is cached, later validations report it without searching STS"""
+        self.dao.get_cde_permissible_values.return_value = None
+        first = self.validator()
+        self.assertEqual(self.lookup(first), (["model value"], CDE_NOT_FOUND, False, "123"))
+        self.assertEqual(self.cache.get("123", "1.00").state, CDE_NOT_AVAILABLE)
+        second = self.validator()
+        self.assertEqual(self.lookup(second), (["model value"], CDE_NOT_FOUND, False, "123"))
+        self.assertEqual(self.lookup(second), (["model value"], CDE_NOT_FOUND, False, "123"))
+        mock_sts.assert_called_once()
+        self.dao.get_cde_permissible_values.assert_called_once()
+
+    @patch("metadata_validator.get_pv_by_code_version", return_value={"PermissibleValues": ["x"]})
+    def test_found_in_sts(self, mock_sts):
+        """CDE found in STS is cached"""
+        self.dao.get_cde_permissible_values.return_value = None
+        self.assertEqual(self.lookup(self.validator()), (["x"], None, True, "123"))
+        self.assertEqual(self.lookup(self.validator()), (["x"], None, True, "123"))
+        mock_sts.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
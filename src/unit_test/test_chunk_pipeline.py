@@ -0,0 +1,64 @@
+"""
+Unit tests for ChunkPipeline running fetch, process and write stages of chunks
+"""
+
+import threading
+import unittest
+from common.chunk_pipeline import ChunkPipeline
+
+
+class TestChunkPipeline(unittest.TestCase):
+    """Test cases for ChunkPipeline"""
+
+    def test_results_in_order(self):
+        """Batches are processed in the caller's thread and written in chunk order in the writer thread"""
+        for depth in [0, 1, 3]:
+            pipeline = ChunkPipeline(depth)
+            threads = set()
+            def process(chunk):
+                threads.add(threading.current_thread())
+                return chunk * 2
+            results = pipeline.run(iter(range(20)), process, lambda batch: batch + 1)
+            self.assertEqual(results, [i * 2 + 1 for i in range(20)])
+            self.assertEqual(threads, {threading.current_thread()})
+            self.assertEqual(set(pipeline.timings), {"fetch", "process", "write", "fetch_wait", "write_wait"})
+
+    def test_backpressure(self):
+        """The fetch thread stays at most a few chunks ahead of a slow writer"""
+        fetched = []
+        written = []
+        release = threading.Event()
+        def chunks():
+            for i in range(10):
+                fetched.append(i)
+                yield i
+        def write(batch):
+            release.wait(1)
+            written.append(batch)
+            # queue depth 1: one chunk in each queue, one being processed, one being written, one fetched
+            self.assertLessEqual(len(fetched) - len(written), 5)
+            return batch
+        pipeline = ChunkPipeline(1)
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        self.assertEqual(pipeline.run(chunks(), lambda chunk: chunk, write), list(range(10)))
+        timer.join()
+
+    def test_errors(self):
+        """Errors of any stage are raised in the caller's thread"""
+        def failing_chunks():
+            yield 1
+            raise ValueError("fetch")
+        def failing(value):
+            raise ValueError(value)
+        for depth in [0, 2]:
+            with self.assertRaisesRegex(ValueError, "fetch"):
+                ChunkPipeline(depth).run(failing_chunks(), lambda chunk: chunk, lambda batch: batch)
+            with self.assertRaisesRegex(ValueError, "process"):
+                ChunkPipeline(depth).run(iter(range(5)), lambda chunk: failing("process"), lambda batch: batch)
+            with self.assertRaisesRegex(ValueError, "write"):
+                ChunkPipeline(depth).run(iter(range(5)), lambda chunk: chunk, lambda batch: failing("write"))
+
+
+if __name__ == '__main__':
+    unittest.main()
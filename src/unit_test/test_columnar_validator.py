@@ -0,0 +1,87 @@
+"""
+Unit tests for ColumnarPrefilter and its use by MetaDataValidator.validate_props
+"""
+
+import copy
+import unittest
+from unittest.mock import MagicMock
+from common.model import DataModel
+from metadata_validator import MetaDataValidator
+
+MODEL = {"nodes": {"sample": {"id_property": "sample_id", "properties": {
+    "sample_id": {"type": "string"},
+    "sex": {"type": "string", "permissible_values": ["Male", "Female"]},
+    "age": {"type": "integer", "minimum": {"value": 1}, "maximum": {"value": 120, "exclusive": True}},
+    "weight": {"type": "number", "maximum": {"value": 5.5}},
+    "collected": {"type": "date"},
+    "is_tumor": {"type": "boolean"},
+    "site": {"type": "string", "Term": [{"Origin": "caDSR", "Code": "1", "Version": "1"}]},
+}}}, "list-delimiter": "|"}
+
+
+class TestColumnarPrefilter(unittest.TestCase):
+    """Test cases for ColumnarPrefilter"""
+
+    def setUp(self):
+        self.dao = MagicMock()
+        self.dao.find_pvs_by_synonym.return_value = []
+        self.dao.get_cde_permissible_values.return_value = {"PermissibleValues": ["Lung"]}
+        self.dao.get_concept_code_by_pv.return_value = None
+        self.validator = MetaDataValidator(self.dao, None, {})
+        self.validator.model = DataModel(MODEL)
+
+    def test_prefilter(self):
+        """Only values proven valid are prefiltered, records are not changed"""
+        records = [
+            {"nodeType": "sample", "props": {"sample_id": "s1", "sex": "Male", "age": "30", "weight": 1,
+                                             "collected": "2024-01-02", "is_tumor": "Yes", "site": "Lung"}},
+            {"nodeType": "sample", "props": {"sample_id": " s2", "sex": "male", "age": "120", "weight": "5.6",
+                                             "collected": "2024-02-30", "is_tumor": "maybe"}},
+        ]
+        original = copy.deepcopy(records)
+        valid_values = self.validator.columnar_prefilter.prefilter(records)
+        self.assertEqual(records, original)
+        self.assertEqual(valid_values[id(records[0])], {"sample_id": ("s1", "s1"), "sex": ("Male", "Male"), "age": ("30", "30"),
+                                                       "weight": (1, 1), "collected": ("2024-01-02", "2024-01-02"), "is_tumor": ("Yes", True)})
+        self.assertNotIn(id(records[1]), valid_values)
+
+    def test_same_results(self):
+        """validate_props returns the same results and corrections with and without the prefilter"""
+        records = [{"nodeType": "sample", "props": {"sample_id": sample_id, "sex": sex, "age": age, "is_tumor": is_tumor, "site": "lung"}}
+                   for sample_id, sex, age, is_tumor in [("s1", "Male", "3", "TRUE"), (" s2 ", "female", "0", "no"), ("s3", "x", "a", False)]]
+        prefiltered = copy.deepcopy(records)
+        results = [self.validator.validate_props(record, "prefix") for record in records]
+        self.validator.valid_values = self.validator.columnar_prefilter.prefilter(prefiltered)
+        self.assertEqual([self.validator.validate_props(record, "prefix") for record in prefiltered], results)
+        self.assertEqual(prefiltered, records)
+        self.assertIs(prefiltered[0]["props"]["is_tumor"], True)
+
+    def test_changed_value_checked(self):
+        """A value changed after the prefilter is checked per value"""
+        record = {"nodeType": "sample", "props": {"sample_id": "s1", "age": "3"}}
+        self.validator.valid_values = self.validator.columnar_prefilter.prefilter([record])
+        record["props"]["age"] = "300"
+        result = self.validator.validate_props(record, "prefix")
+        self.assertEqual([error["code"] for error in result["errors"]], ["M012"])
+
+    def test_large_values_at_boundaries(self):
+        """Integers beyond the exact range of float64 get the same boundary errors with and without the prefilter"""
+        self.validator.model = DataModel({"nodes": {"sample": {"id_property": "sample_id", "properties": {
+            "sample_id": {"type": "string"},
+            "count": {"type": "integer", "maximum": {"value": float(2**53)}},
+            "size": {"type": "number", "minimum": {"value": 2**53 + 1}},
+        }}}, "list-delimiter": "|"})
+        records = [{"nodeType": "sample", "props": {"sample_id": f"s{i}", "count": count, "size": size}}
+                   for i, (count, size) in enumerate([(2**53 + 1, 2**53), (str(2**53 + 1), float(2**53)), (2**53, 2**54), (-2**60, 2**53 + 2)])]
+        prefiltered = copy.deepcopy(records)
+        results = [self.validator.validate_props(record, "prefix") for record in records]
+        self.validator.valid_values = self.validator.columnar_prefilter.prefilter(prefiltered)
+        self.assertEqual([self.validator.validate_props(record, "prefix") for record in prefiltered], results)
+        self.assertEqual([[error["code"] for error in result["errors"]] for result in results], [["M012", "M011"], ["M012", "M011"], [], []])
+        # only integers exact in float64 are prefiltered, and none of a property with a threshold not exact in float64
+        self.assertEqual([{prop: value for prop, value in self.validator.valid_values[id(record)].items() if prop != "sample_id"}
+                          for record in prefiltered], [{}, {}, {"count": (2**53, 2**53)}, {}])
+
+
+if __name__ == '__main__':
+    unittest.main()
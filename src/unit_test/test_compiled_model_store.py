@@ -0,0 +1,94 @@
+"""
+Unit tests for the local store of parsed data models
+"""
+
+import os
+import pickle
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from common.compiled_model_store import CompiledModelStore
+from common.model_store import ModelFactory
+
+MODELS_DEF = {"CDS": {"current-version": "1.0", "model-files": ["a.yml"]}}
+MODEL = {"nodes": {"study": {"id_property": "study_id"}}}
+FILES = {"models/a.yml": b"Nodes:\n  study: {}\n"}
+
+
+class TestCompiledModelStore(unittest.TestCase):
+    """Test cases for CompiledModelStore, and ModelFactory parsing model files when no stored model can be loaded"""
+
+    @patch('common.model_store.download_file_to_dict', return_value=MODELS_DEF)
+    def setUp(self, mock_download):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = CompiledModelStore(self.temp_dir.name)
+        self.key = self.store.content_hash("CDS", "1.0", "|", FILES)
+        self.factory = ModelFactory("models", "dev", compiled_model_dir=self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def parse(self, files=FILES):
+        parser = MagicMock(model={"nodes": {"parsed": {}}})
+        with patch("common.model_store.download_file_content", side_effect=lambda name: files[name]), \
+                patch("common.model_store.YamlModelParser", return_value=parser) as mock_parser:
+            model = self.factory.parse_model_files(list(FILES), "CDS", "|", "1.0")
+        return model, mock_parser
+
+    def artifact_path(self):
+        return os.path.join(self.temp_dir.name, f"CDS_1.0_{self.key}.pkl")
+
+    def test_round_trip(self):
+        """A saved model is loaded by the content hash of its source files, without parsing"""
+        self.assertTrue(self.store.save("CDS", "1.0", self.key, MODEL))
+        self.assertEqual(self.store.load("CDS", "1.0", self.key), MODEL)
+        self.assertEqual([name for name in os.listdir(self.temp_dir.name) if name.endswith(".tmp")], [])
+        self.store.save("CDS", "1.0", self.key, {"nodes": {"parsed": {}}})
+        model, mock_parser = self.parse()
+        self.assertEqual(model, {"nodes": {"parsed": {}}})
+        mock_parser.assert_not_called()
+
+    def test_source_changed(self):
+        """A model saved for other source files is not loaded, the files are parsed and the result saved"""
+        self.store.save("CDS", "1.0", self.key, MODEL)
+        changed_files = {"models/a.yml": b"Nodes:\n  sample: {}\n"}
+        changed = self.store.content_hash("CDS", "1.0", "|", changed_files)
+        self.assertNotEqual(changed, self.key)
+        self.assertIsNone(self.store.load("CDS", "1.0", changed))
+        self.assertNotEqual(self.store.content_hash("CDS", "1.0", ",", FILES), self.key)
+
+        model, mock_parser = self.parse(changed_files)
+        mock_parser.assert_called_once()
+        self.assertEqual(model, {"nodes": {"parsed": {}}})
+        self.assertEqual(self.store.load("CDS", "1.0", changed), {"nodes": {"parsed": {}}})
+
+    def test_format_version_changed(self):
+        """Models saved by another store format version are not loaded"""
+        self.store.save("CDS", "1.0", self.key, MODEL)
+        with patch("common.compiled_model_store.STORE_FORMAT_VERSION", 2):
+            self.assertNotEqual(self.store.content_hash("CDS", "1.0", "|", FILES), self.key)
+            model, mock_parser = self.parse()
+        mock_parser.assert_called_once()
+        self.assertEqual(model, {"nodes": {"parsed": {}}})
+
+    def test_corrupt_artifact(self):
+        """Truncated, corrupt or unexpected artifacts are not loaded, the files are parsed instead"""
+        with open(self.artifact_path(), "wb") as f:
+            f.write(pickle.dumps(MODEL, protocol=pickle.HIGHEST_PROTOCOL)[:-10])
+        self.assertIsNone(self.store.load("CDS", "1.0", self.key))
+        model, mock_parser = self.parse()
+        mock_parser.assert_called_once()
+        self.assertEqual(model, {"nodes": {"parsed": {}}})
+        # the parsed model replaces the corrupt artifact
+        self.assertEqual(self.store.load("CDS", "1.0", self.key), {"nodes": {"parsed": {}}})
+
+        for content in [b"not a pickle", pickle.dumps(["not", "a", "dict"])]:
+            with open(self.artifact_path(), "wb") as f:
+                f.write(content)
+            self.assertIsNone(self.store.load("CDS", "1.0", self.key))
+            model, mock_parser = self.parse()
+            mock_parser.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Unit tests for ConsentGroupResolver resolving consent groups of file node ancestors
+"""
+
+import unittest
+from common.node_resolver import ConsentGroupResolver
+
+
+def node(node_type, node_id, parents=(), props=None):
+    return {"nodeType": node_type, "nodeID": node_id, "props": props or {},
+            "parents": [{"parentType": t, "parentIDPropName": f"{t}_id", "parentIDValue": v} for t, v in parents]}
+
+
+class FakeDao:
+    """dataRecords and release collection searched by nodeType and nodeIDs"""
+
+    def __init__(self, submission_nodes, released_nodes):
+        self.submission_nodes = submission_nodes
+        self.released_nodes = released_nodes
+        self.calls = 0
+
+    def search(self, nodes, node_ids_by_type):
+        self.calls += 1
+        return [n for n in nodes if n["nodeID"] in node_ids_by_type.get(n["nodeType"], set())]
+
+    def search_nodes_by_type_and_ids(self, node_ids_by_type, submission_id, fields=["props"]):
+        return self.search(self.submission_nodes, node_ids_by_type)
+
+    def search_released_nodes_by_ids(self, data_commons, node_ids_by_type, fields=[]):
+        return self.search(self.released_nodes, node_ids_by_type)
+
+
+class TestConsentGroupResolver(unittest.TestCase):
+    """Test cases for ConsentGroupResolver"""
+
+    def setUp(self):
+        self.dao = FakeDao([
+            node("sample", "s1", [("participant", "p1")]),
+            node("sample", "s2", [("participant", "p2")]),
+            node("participant", "p1", [("consent_group", "c1"), ("study", "st1")]),
+            node("participant", "p2"),
+            node("consent_group", "c1", [("study", "st1")], {"consent_group_number": "1"}),
+            node("sample", "loop1", [("sample", "loop2")]),
+            node("sample", "loop2", [("sample", "loop1")]),
+        ], [
+            node("participant", "p2", [("consent_group", "c2")]),
+            node("consent_group", "c2", props={"consent_group_number": "2"}),
+        ])
+        self.resolver = ConsentGroupResolver(self.dao, "sub-1", "CDS")
+        self.files = [node("file", f"f{i}", [("sample", "s1" if i % 2 else "s2")]) for i in range(100)]
+
+    def test_consent_groups(self):
+        """Consent groups are found in the submission or the release collection"""
+        self.assertEqual(self.resolver.get_consent_groups("sample", "s1"), {("consent_group", "consent_group_id", "c1")})
+        self.assertEqual(self.resolver.get_consent_groups("sample", "s2"), {("consent_group", "consent_group_id", "c2")})
+        self.assertEqual(self.resolver.get_consent_group_node(("consent_group", "consent_group_id", "c2"))["props"], {"consent_group_number": "2"})
+        self.assertIs(self.resolver.get_consent_group_node(("consent_group", "consent_group_id", "c9")), False)
+        self.assertIsNone(self.resolver.get_consent_groups("sample", ["unhashable"]))
+
+    def test_cycle(self):
+        """A cycle in the ancestry ends without consent groups"""
+        self.assertEqual(self.resolver.get_consent_groups("sample", "loop1"), set())
+
+    def test_prefetch_memoized(self):
+        """Ancestors of a chunk are searched level by level, once for the whole validation"""
+        self.resolver.prefetch(self.files, ["file"])
+        calls = self.dao.calls
+        # sample level, participant level with p2 from the release collection, consent groups with c2 from the release collection
+        self.assertEqual(calls, 5)
+        self.resolver.prefetch(self.files, ["file"])
+        for file in self.files:
+            groups = self.resolver.get_consent_groups("sample", file["parents"][0]["parentIDValue"])
+            for group in groups:
+                self.assertTrue(self.resolver.get_consent_group_node(group))
+        self.assertEqual(self.dao.calls, calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+Unit tests for the read-only DataModel and its precomputed lookups
+"""
+
+import unittest
+from common.model import DataModel
+from common.model_reader import YamlModelParser
+from common.model_store import DEF_FILE_NODES
+from common.constants import NODES_LABEL, RELATIONSHIPS, TYPE, DEF_MAIN_NODES, PROPERTY_NAMES, OMIT_DCF_PREFIX, COMPOSITION_KEY
+
+MODEL_FILE = "models/test-model.yml"
+# model file in the model description format of the data commons
+MODEL_YAML = b"""
+Nodes:
+  program:
+    Props: [program_name, program_acronym]
+  study:
+    Props: [study_id, study_name]
+  participant:
+    Props: [participant_id, gender, age]
+  sample:
+    Props: [sample_id, sample_type]
+  diagnosis:
+    Props: [diagnosis_id, primary_diagnosis]
+    CompKey: [participant.participant_id, diagnosis_id]
+  file:
+    Props: [file_id, file_name, file_size, md5sum]
+  _placeholder:
+    Props: [study_id]
+Relationships:
+  of_program:
+    Mul: many_to_one
+    Ends:
+      - Src: study
+        Dst: program
+  of_study:
+    Mul: many_to_one
+    Ends:
+      - Src: participant
+        Dst: study
+  of_participant:
+    Mul: many_to_one
+    Ends:
+      - Src: sample
+        Dst: participant
+      - Src: diagnosis
+        Dst: participant
+        Mul: one_to_one
+  of_sample:
+    Mul: many_to_many
+    Ends:
+      - Src: file
+        Dst: sample
+PropDefinitions:
+  program_name: {Type: string, Req: true, Key: true}
+  program_acronym: {Type: string}
+  study_id: {Type: string, Req: true, Key: true}
+  study_name: {Type: string, Req: "Yes"}
+  participant_id: {Type: string, Req: true, Key: true}
+  gender: {Enum: [Male, Female, Unknown], Req: true}
+  age: {Type: integer, minimum: 0}
+  sample_id: {Type: string, Req: true, Key: true}
+  sample_type: {Type: {value_type: list, Enum: [Tumor, Normal]}}
+  diagnosis_id: {Type: string, Req: true, Key: true}
+  primary_diagnosis: {Type: string, Req: false}
+  file_id: {Type: string, Req: true, Key: true}
+  file_name: {Type: string, Req: true}
+  file_size: {Type: integer, Req: true}
+  md5sum: {Type: string, Req: true}
+"""
+
+
+def build_model():
+    # parsed as ModelFactory.create_model does, with the semantics of the models definition
+    model = YamlModelParser([MODEL_FILE], "CDS", "|", "1.0", {MODEL_FILE: MODEL_YAML}).model
+    model.update({DEF_FILE_NODES: {"file": {"name-field": "file_name", "size-field": "file_size", "md5-field": "md5sum"}},
+                  DEF_MAIN_NODES: {"study": "Study", "participant": "Participant"},
+                  PROPERTY_NAMES: {"participant_id": "participantID"}, OMIT_DCF_PREFIX: True})
+    return model
+
+
+class LegacyDataModel:
+    """Accessors deriving their values from the model dict on every call, as DataModel did before the lookups were precomputed"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def get_nodes(self):
+        return self.model.get(NODES_LABEL, {})
+
+    def get_node_id(self, node):
+        if self.model[NODES_LABEL].get(node):
+            return self.model[NODES_LABEL][node].get("id_property", None)
+        return None
+
+    def get_node_keys(self):
+        return self.model[NODES_LABEL].keys()
+
+    def get_node_props(self, node):
+        if self.model[NODES_LABEL].get(node):
+            return self.model[NODES_LABEL][node].get("properties", None)
+
+    def get_node_relationships(self, node):
+        if self.model[NODES_LABEL].get(node):
+            return self.model[NODES_LABEL][node].get(RELATIONSHIPS, None)
+
+    def get_relationship_type(self, node, parent_type):
+        relationships = self.get_node_relationships(node) or {}
+        return relationships.get(parent_type, {}).get(TYPE, None)
+
+    def get_node_req_props(self, node):
+        props = self.get_node_props(node)
+        if not props:
+            return None
+        return {k: v for (k, v) in props.items() if v.get("required") == True}
+
+    def get_file_nodes(self):
+        return self.model.get("file-nodes", {})
+
+    def get_main_nodes(self):
+        return self.model.get(DEF_MAIN_NODES, {})
+
+    def get_entity_type(self, node_type):
+        return self.model.get(DEF_MAIN_NODES, {}).get(node_type, None)
+
+    def get_configured_prop_name(self, prop_name):
+        return self.model.get(PROPERTY_NAMES, {}).get(prop_name, None)
+
+    def get_file_name(self):
+        file_nodes_vals = list(self.model.get("file-nodes", {}).values())
+        return file_nodes_vals[0]["name-field"] if len(file_nodes_vals) > 0 else None
+
+    def get_composition_key(self, node):
+        return self.model[NODES_LABEL][node].get(COMPOSITION_KEY, None)
+
+
+class TestDataModel(unittest.TestCase):
+    """Test cases for DataModel"""
+
+    def setUp(self):
+        self.model_dict = build_model()
+        self.model = DataModel(self.model_dict)
+        self.legacy = LegacyDataModel(self.model_dict)
+
+    def test_parsed_model(self):
+        """The parsed model has the nodes, relationships and required properties of the model file"""
+        self.assertEqual(sorted(self.model.get_node_keys()), ["diagnosis", "file", "participant", "program", "sample", "study"])
+        self.assertEqual(self.model.get_relationship_type("diagnosis", "participant"), "one_to_one")
+        self.assertEqual(self.model.get_relationship_type("file", "sample"), "many_to_many")
+        self.assertEqual(sorted(self.model.get_node_req_props("study")), ["study_id", "study_name"])
+        self.assertEqual(self.model.get_composition_key("diagnosis"), ["participant.participant_id", "diagnosis_id"])
+
+    def test_accessors_match_derived(self):
+        """Precomputed lookups return the same values as deriving them from the model dict"""
+        nodes = list(self.legacy.get_node_keys())
+        self.assertEqual(self.model.get_nodes(), self.legacy.get_nodes())
+        self.assertEqual(list(self.model.get_node_keys()), nodes)
+        for node in nodes + ["missing", "_placeholder"]:
+            self.assertEqual(self.model.get_node_id(node), self.legacy.get_node_id(node), node)
+            self.assertEqual(self.model.get_node_props(node), self.legacy.get_node_props(node), node)
+            self.assertEqual(self.model.get_node_req_props(node), self.legacy.get_node_req_props(node), node)
+            self.assertEqual(self.model.get_node_relationships(node), self.legacy.get_node_relationships(node), node)
+            self.assertEqual(self.model.get_entity_type(node), self.legacy.get_entity_type(node), node)
+            for parent_type in nodes + ["missing"]:
+                self.assertEqual(self.model.get_relationship_type(node, parent_type), self.legacy.get_relationship_type(node, parent_type),
+                                 (node, parent_type))
+        for node in nodes:
+            self.assertEqual(self.model.get_composition_key(node), self.legacy.get_composition_key(node), node)
+        self.assertIsNone(self.model.get_composition_key("missing"))
+        for prop_name in ["participant_id", "study_id"]:
+            self.assertEqual(self.model.get_configured_prop_name(prop_name), self.legacy.get_configured_prop_name(prop_name))
+        self.assertEqual(self.model.get_file_nodes(), self.legacy.get_file_nodes())
+        self.assertEqual(self.model.get_main_nodes(), self.legacy.get_main_nodes())
+        self.assertEqual(self.model.get_file_name(), self.legacy.get_file_name())
+        self.assertEqual(self.model.get_list_delimiter(), "|")
+        self.assertTrue(self.model.get_omit_dcf_prefix())
+
+    def test_empty_model(self):
+        """A model without nodes or file nodes has empty lookups"""
+        for model in [DataModel({}), DataModel(None)]:
+            self.assertEqual(model.get_nodes(), {})
+            self.assertIsNone(model.get_node_id("study"))
+            self.assertIsNone(model.get_file_name())
+            self.assertIsNone(model.get_relationship_type("study", "program"))
+
+    def test_read_only(self):
+        """Attributes of the model can't be set, replaced or added"""
+        for name in ["model", "_node_ids", "new_attribute"]:
+            with self.assertRaises(AttributeError):
+                setattr(self.model, name, {})
+        self.assertIs(self.model.model, self.model_dict)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Unit tests for DateValidator
+"""
+
+import unittest
+from unittest.mock import patch
+from common.date_validator import DateValidator, format_pattern
+
+FORMATS = ["%m/%d/%Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d"]
+
+
+class TestDateValidator(unittest.TestCase):
+    """Test cases for DateValidator"""
+
+    def test_is_valid(self):
+        """Values parsed by any of the formats are valid"""
+        date_validator = DateValidator(FORMATS)
+        for value in ["1/2/2024", "2024-01-02", "2024-01-02T03:04:05", "2024/1/2"]:
+            self.assertTrue(date_validator.is_valid("date", value), value)
+        for value in ["2024-02-30", "2024-01-02 ", "02-01-2024", "", "2024-01-02T03:04"]:
+            self.assertFalse(date_validator.is_valid("date", value), value)
+        with self.assertRaises(TypeError):
+            date_validator.is_valid("date", 20240102)
+
+    def test_sticky_format(self):
+        """The format matched last by a property is tried first, other formats are pre-screened"""
+        date_validator = DateValidator(FORMATS, cache_size=0)
+        with patch.object(date_validator, "parse", wraps=date_validator.parse) as mock_parse:
+            self.assertTrue(date_validator.is_valid("date", "2024/01/02"))
+            self.assertEqual(mock_parse.call_count, 1)
+            self.assertTrue(date_validator.is_valid("date", "2024/01/03"))
+            self.assertEqual(mock_parse.call_count, 2)
+            self.assertTrue(date_validator.is_valid("date", "2024-01-03"))
+            self.assertEqual(mock_parse.call_count, 4)
+        self.assertEqual(date_validator.sticky_formats, {"date": 1})
+
+    def test_cache(self):
+        """Repeated values are not parsed again, the oldest value is evicted"""
+        date_validator = DateValidator(FORMATS, cache_size=2)
+        date_validator.is_valid("date", "2024-01-01")
+        date_validator.is_valid("date", "bad")
+        with patch.object(date_validator, "find_format") as mock_find:
+            self.assertTrue(date_validator.is_valid("other", "2024-01-01"))
+            self.assertFalse(date_validator.is_valid("other", "bad"))
+            mock_find.assert_not_called()
+        date_validator.is_valid("date", "2024-01-02")
+        self.assertEqual(list(date_validator.cache), ["bad", "2024-01-02"])
+
+    def test_format_pattern(self):
+        """Format patterns accept what strptime accepts, formats with other directives are not pre-screened"""
+        pattern = format_pattern("%m/%d/%Y  %H")
+        self.assertTrue(pattern.fullmatch("1/ 2/2024 3"))
+        self.assertFalse(pattern.fullmatch("2024-01-02"))
+        self.assertIsNone(format_pattern("%d %b %Y"))
+
+
+if __name__ == '__main__':
+    unittest.main()
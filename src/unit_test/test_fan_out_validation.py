@@ -0,0 +1,86 @@
+"""
+Unit tests for fanning out metadata validation of large submissions into shard messages
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+from metadata_validator import MetaDataValidator, fan_out_validation, validate_fan_out_shard, get_metadata_message_key
+
+DATA = {"type": "Validate Metadata", "submissionID": "sub-1", "scope": "All", "validationID": "val-2"}
+
+
+class TestFanOutValidation(unittest.TestCase):
+    """Test cases for fan_out_validation and validate_fan_out_shard"""
+
+    def setUp(self):
+        self.dao = MagicMock()
+        self.queue = MagicMock()
+        self.validator = MetaDataValidator(self.dao, None, {"fan-out-shard-size": 10})
+        self.validator.load_submission = MagicMock(return_value=None)
+        self.validator.submission = {"_id": "sub-1"}
+        self.dao.get_validation_shards.return_value = {}
+        self.dao.count_docs.return_value = 25
+        self.dao.get_dataRecords_split_keys.return_value = [("a", "1", "1"), ("b", "2", "2")]
+        self.dao.start_validation_shards.return_value = True
+
+    def test_fan_out(self):
+        """A large submission is split into shard messages of key ranges, tracked in the validation document"""
+        self.assertTrue(fan_out_validation(self.validator, self.queue, DATA, ["val-1", "val-2"]))
+        self.dao.get_dataRecords_split_keys.assert_called_once_with("sub-1", "All", 3)
+        tracker = self.dao.start_validation_shards.call_args.args[1]
+        self.assertEqual((tracker["shards"], tracker["done"], tracker["validationIDs"]), (3, [], ["val-1", "val-2"]))
+        self.dao.set_validation_checkpoint.assert_called_once()
+        messages = [c.args for c in self.queue.sendMsgToQueue.call_args_list]
+        self.assertEqual([(msg["shardIndex"], msg["startKey"], msg["endKey"], group_id) for msg, group_id in messages],
+                         [(0, None, ["a", "1", "1"], "val-2-0"), (1, ["a", "1", "1"], ["b", "2", "2"], "val-2-1"), (2, ["b", "2", "2"], None, "val-2-2")])
+        self.assertEqual(messages[0][0]["type"], "Validate Metadata Shard")
+
+    def test_not_fanned_out(self):
+        """Small submissions, or without the configuration, are validated in the process"""
+        self.dao.count_docs.return_value = 10
+        self.assertFalse(fan_out_validation(self.validator, self.queue, DATA, ["val-2"]))
+        validator = MetaDataValidator(self.dao, None, {})
+        self.assertFalse(fan_out_validation(validator, self.queue, DATA, ["val-2"]))
+        self.queue.sendMsgToQueue.assert_not_called()
+
+    def test_redelivered(self):
+        """A redelivered validation message sends the shards not done again"""
+        self.dao.get_validation_shards.return_value = {"submissionID": "sub-1", "scope": "All", "splitKeys": [["a", "1", "1"]],
+                                                       "shards": 2, "done": [0]}
+        self.assertTrue(fan_out_validation(self.validator, self.queue, DATA, ["val-2"]))
+        self.dao.start_validation_shards.assert_not_called()
+        self.assertEqual([c.args[0]["shardIndex"] for c in self.queue.sendMsgToQueue.call_args_list], [1])
+
+    def test_last_shard_sets_status(self):
+        """Only the last completed shard sets the status of the validations and the submission"""
+        shard = dict(DATA, type="Validate Metadata Shard", shardIndex=1, startKey=["a", "1", "1"], endKey=None)
+        tracker = {"submissionID": "sub-1", "shards": 2, "done": [0, 1], "total": 20, "validated": 20, "isError": False,
+                   "isWarning": True, "validationIDs": ["val-1", "val-2"]}
+        self.dao.complete_validation_shard.side_effect = [dict(tracker, done=[1]), tracker]
+        with patch.object(self.validator, "validate_range", return_value=(10, 10)) as mock_range:
+            validate_fan_out_shard(self.validator, shard)
+            self.dao.set_submission_validation_status.assert_not_called()
+            validate_fan_out_shard(self.validator, shard)
+        mock_range.assert_called_with("sub-1", "All", "val-2", 1, ("a", "1", "1"), None)
+        self.assertEqual([c.args[:2] for c in self.dao.update_validation_status.call_args_list], [("val-1", "Warning"), ("val-2", "Warning")])
+        self.dao.set_submission_validation_status.assert_called_once_with(self.validator.submission, None, "Warning", None, None)
+        self.dao.clear_validation_checkpoint.assert_called_once_with("val-2")
+
+    def test_shard_done(self):
+        """A redelivered shard message of a completed shard is not validated again"""
+        self.dao.get_validation_shards.return_value = {"done": [1]}
+        with patch.object(self.validator, "validate_range") as mock_range:
+            validate_fan_out_shard(self.validator, dict(DATA, shardIndex=1))
+        mock_range.assert_not_called()
+        self.dao.complete_validation_shard.assert_not_called()
+
+    def test_message_key(self):
+        """Shards of a validation are processed in parallel, other requests of a submission one at a time"""
+        dispatcher = MagicMock()
+        dispatcher.get_message_key.return_value = "sub-1"
+        self.assertEqual(get_metadata_message_key(dispatcher, MagicMock(data=dict(DATA, type="Validate Metadata Shard", shardIndex=2))), "sub-1/2")
+        self.assertEqual(get_metadata_message_key(dispatcher, MagicMock(data=DATA)), "sub-1")
+
+
+if __name__ == '__main__':
+    unittest.main()
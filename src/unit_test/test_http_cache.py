@@ -0,0 +1,84 @@
+"""
+Unit tests for HttpCache conditional GET and offline handling
+"""
+
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from common.http_cache import HttpCache
+
+URL = "https://example.com/model.yml"
+
+
+def response(status_code, content=b"", headers=None):
+    r = MagicMock()
+    r.status_code = status_code
+    r.content = content
+    r.headers = headers or {}
+    return r
+
+
+class TestHttpCache(unittest.TestCase):
+    """Test cases for HttpCache"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = HttpCache(self.cache_dir)
+        self.cache.session = MagicMock()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_revalidate_not_modified(self):
+        """Cached content is served when the server returns 304"""
+        self.cache.session.get.side_effect = [response(200, b"v1", {"ETag": "abc"}), response(304)]
+        self.assertEqual(self.cache.get(URL), b"v1")
+        self.assertEqual(self.cache.get(URL), b"v1")
+        headers = self.cache.session.get.call_args[1]["headers"]
+        self.assertEqual(headers["If-None-Match"], "abc")
+
+    def test_revalidate_modified(self):
+        """New content replaces cached content"""
+        self.cache.session.get.side_effect = [response(200, b"v1", {"ETag": "abc"}), response(200, b"v2", {"ETag": "def"})]
+        self.cache.get(URL)
+        self.assertEqual(self.cache.get(URL), b"v2")
+
+    def test_max_staleness(self):
+        """Fresh cached content is served without request"""
+        self.cache.configure(self.cache_dir, max_staleness=3600)
+        self.cache.session.get.return_value = response(200, b"v1")
+        self.cache.get(URL)
+        self.cache.get(URL)
+        self.cache.session.get.assert_called_once()
+
+    def test_offline(self):
+        """Offline mode serves cached content only"""
+        self.cache.session.get.return_value = response(200, b"v1")
+        self.cache.get(URL)
+        self.cache.configure(self.cache_dir, offline=True)
+        self.assertEqual(self.cache.get(URL), b"v1")
+        self.cache.session.get.assert_called_once()
+        with self.assertRaises(Exception):
+            self.cache.get("https://example.com/other.yml")
+
+    def test_only_ok_cached(self):
+        """Responses other than 200 are not cached, a cached copy is served instead of them"""
+        self.cache.session.get.side_effect = [response(400, b"bad request"), response(302, b"moved"), response(200, b"v1"),
+                                              response(400, b"bad request")]
+        self.assertEqual(self.cache.get(URL), b"bad request")
+        self.assertEqual(self.cache.get(URL), b"moved")
+        self.assertEqual(self.cache._read(URL), ({}, None))
+        self.assertEqual(self.cache.get(URL), b"v1")
+        self.assertEqual(self.cache.get(URL), b"v1")
+        self.assertEqual(self.cache._read(URL)[1], b"v1")
+
+    def test_not_found(self):
+        """Missing remote file raises exception"""
+        self.cache.session.get.return_value = response(404, b"not found")
+        with self.assertRaises(Exception):
+            self.cache.get(URL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Unit tests for incremental metadata validation by validation fingerprints
+"""
+
+import unittest
+from unittest.mock import MagicMock
+from common.model import DataModel
+from common.node_resolver import ParentNodeResolver
+from common.fingerprint import IncrementalPlanner, validation_environment
+from metadata_validator import MetaDataValidator
+
+MODEL = {"nodes": {
+    "study": {"id_property": "study_id", "properties": {"study_id": {"type": "string"}}},
+    "participant": {"id_property": "participant_id", "properties": {"participant_id": {"type": "string"}},
+                    "relationships": {"study": {"type": "many_to_one"}}},
+    "sample": {"id_property": "sample_id", "properties": {"sample_id": {"type": "string"}},
+               "relationships": {"participant": {"type": "many_to_one"}}},
+    "diagnosis": {"id_property": "diagnosis_id", "properties": {"diagnosis_id": {"type": "string"}},
+                  "relationships": {"participant": {"type": "one_to_one"}}},
+}}
+
+
+def node(node_type, node_id, parent_type=None, parent_id=None, status="Passed"):
+    record = {"_id": f"{node_type}-{node_id}", "nodeType": node_type, "nodeID": node_id, "status": status,
+              "props": {f"{node_type}_id": node_id}, "parents": []}
+    if parent_type:
+        record["parents"].append({"parentType": parent_type, "parentIDPropName": f"{parent_type}_id", "parentIDValue": parent_id})
+    return record
+
+
+class TestIncrementalValidation(unittest.TestCase):
+    """Test cases for IncrementalPlanner and MetaDataValidator fingerprints"""
+
+    def setUp(self):
+        self.dao = MagicMock()
+        self.model = DataModel(MODEL)
+        self.environment = validation_environment(self.model, {"_id": "sub-1"}, "study", ["program"], [1, [[1, None]], [0, None, None]])
+        self.records = [node("study", "st1"), node("participant", "p1", "study", "st1"), node("participant", "p2", "study", "st1"),
+                        node("sample", "s1", "participant", "p1"), node("sample", "s2", "participant", "p2"),
+                        node("sample", "s3", "participant", "p3")]
+        self.validator = MetaDataValidator(self.dao, None, {})
+        self.validator.model = self.model
+        self.validator.submission_id = "sub-1"
+        self.validator.duplicate_nodes = {}
+        self.validator.fingerprint_environment = self.environment
+        self.validator.parent_resolver = ParentNodeResolver(self.dao, "sub-1")
+        keys = set((record["nodeType"], record["nodeID"]) for record in self.records)
+        for record in self.records:
+            for parent in record["parents"]:
+                key = (parent["parentType"], parent["parentIDValue"])
+                self.validator.parent_resolver.nodes[key] = [record] if key in keys else []
+            record["validationFingerprint"] = self.validator.get_fingerprint(record, [])
+
+    def plan(self, duplicate_nodes=None):
+        self.dao.iterate_dataRecords_chunks.return_value = iter([self.records])
+        planner = IncrementalPlanner(self.dao, self.model, "sub-1", self.environment, duplicate_nodes or {})
+        return planner, planner.plan()
+
+    def test_unchanged(self):
+        """Fingerprints saved by the validation match the records, nothing is validated again"""
+        planner, revalidate_ids = self.plan()
+        self.assertEqual(revalidate_ids, set())
+        self.assertEqual(planner.skipped_count, 6)
+        self.assertEqual(self.dao.iterate_dataRecords_chunks.call_args.kwargs["fields"],
+                         ["props", "parents", "status", "validationFingerprint"])
+
+    def test_changed_parent(self):
+        """A changed node is validated with its descendants"""
+        self.records[1]["props"]["age"] = "30"
+        planner, revalidate_ids = self.plan()
+        self.assertEqual(revalidate_ids, {"participant-p1", "sample-s1"})
+        self.assertEqual(planner.skipped_count, 4)
+
+    def test_new_duplicate_and_removed_parent(self):
+        """New and duplicate nodes are validated, and children of a node removed from the submission"""
+        self.records[4]["status"] = "New"
+        del self.records[1]
+        _, revalidate_ids = self.plan({("sample", "s3"): []})
+        self.assertEqual(revalidate_ids, {"sample-s1", "sample-s2", "sample-s3"})
+
+    def test_one_to_one(self):
+        """Nodes of one_to_one relationships are always validated"""
+        self.records.append(node("diagnosis", "d1", "participant", "p1"))
+        _, revalidate_ids = self.plan()
+        self.assertEqual(revalidate_ids, {"diagnosis-d1"})
+
+    def test_environment_changed(self):
+        """Everything is validated if the environment changed, or without fingerprints"""
+        self.environment = validation_environment(self.model, {"_id": "sub-1"}, "study", ["program"], [2, [[1, None]], [0, None, None]])
+        self.assertIsNone(self.plan()[1])
+        self.assertIsNone(validation_environment(self.model, {"_id": "sub-1"}, "study", ["program"], [1, None, [0, None, None]]))
+
+    def test_split(self):
+        """Records to validate are split into key ranges by the order of the records of the plan"""
+        self.records[1]["props"]["participant_id"] = "changed"
+        planner, revalidate_ids = self.plan()
+        self.assertEqual(planner.split(revalidate_ids, [("participant", "p2", "participant-p2")]), [{"participant-p1"}, {"sample-s1"}])
+        self.assertIsNone(planner.split(revalidate_ids, [("participant", "p9", "participant-p9")]))
+
+    def test_skip_unchanged(self):
+        """Skipped records keep their results"""
+        self.records[3]["status"] = "Error"
+        self.validator.revalidate_ids = {"study-st1"}
+        self.assertEqual(self.validator.skip_unchanged(self.records), [self.records[0]])
+        self.assertTrue(self.validator.isError)
+        self.assertFalse(self.validator.isWarning)
+
+    def test_no_fingerprint(self):
+        """No fingerprint without environment, on failure or if a parent is not prefetched"""
+        self.assertIsNone(self.validator.get_fingerprint(self.records[1], [{"code": "M020"}]))
+        self.assertIsNone(self.validator.get_fingerprint(node("sample", "s4", "participant", "p4"), []))
+        self.validator.fingerprint_environment = None
+        self.assertIsNone(self.validator.get_fingerprint(self.records[0], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
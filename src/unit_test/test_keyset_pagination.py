@@ -0,0 +1,104 @@
+"""
+Unit tests for keyset pagination of dataRecords in MongoDao
+"""
+
+import unittest
+from unittest.mock import MagicMock
+from common.mongo_dao import MongoDao
+
+OPERATORS = {"$gt": lambda a, b: a > b, "$lt": lambda a, b: a < b, "$lte": lambda a, b: a <= b}
+
+
+def matches(doc, query):
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            if not all(OPERATORS[op](doc.get(key), value) for op, value in cond.items()):
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        self.docs = sorted(self.docs, key=lambda d: tuple(d.get(k) for k, _ in keys))
+        return self
+
+    def limit(self, size):
+        return iter(self.docs[:size])
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query):
+        self.queries.append(query)
+        return FakeCursor([d for d in self.docs if matches(d, query)])
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """Test cases for MongoDao.iterate_dataRecords_chunks"""
+
+    def setUp(self):
+        self.docs = []
+        for i in range(25):
+            # duplicated nodeIDs across node types and within a node type, ordered by _id
+            self.docs.append({"_id": f"id-{i:03d}", "submissionID": "sub-1", "nodeType": ["sample", "participant"][i % 2],
+                              "nodeID": f"n-{i % 7}", "status": "New" if i % 3 else "Passed"})
+        self.docs.append({"_id": "other", "submissionID": "sub-2", "nodeType": "sample", "nodeID": "n-0", "status": "New"})
+        self.collection = FakeCollection(self.docs)
+        self.dao = MongoDao.__new__(MongoDao)
+        self.dao.log = MagicMock()
+        self.dao.db_name = "db"
+        self.dao.client = {"db": {"dataRecords": self.collection}}
+
+    def expected(self, query):
+        docs = [d for d in self.docs if matches(d, query)]
+        return sorted(docs, key=lambda d: (d["nodeType"], d["nodeID"], d["_id"]))
+
+    def test_all_records_once_in_order(self):
+        """Every record is returned exactly once, in key order, in chunks of the given size"""
+        chunks = list(self.dao.iterate_dataRecords_chunks("sub-1", None, 4))
+        self.assertTrue(all(len(chunk) == 4 for chunk in chunks[:-1]))
+        records = [r for chunk in chunks for r in chunk]
+        self.assertEqual(records, self.expected({"submissionID": "sub-1"}))
+        # no skip, each chunk query starts after the last key of the previous chunk
+        self.assertEqual(len(self.collection.queries), len(chunks))
+        self.assertNotIn("$and", self.collection.queries[0])
+        self.assertIn("$and", self.collection.queries[1])
+
+    def test_scope_and_node_type(self):
+        """Scope New and node type filters are applied"""
+        records = [r for chunk in self.dao.iterate_dataRecords_chunks("sub-1", "New", 3, "sample") for r in chunk]
+        self.assertEqual(records, self.expected({"submissionID": "sub-1", "status": "New", "nodeType": "sample"}))
+
+    def test_key_range(self):
+        """Start key is exclusive, end key is inclusive"""
+        all_records = self.expected({"submissionID": "sub-1"})
+        key = lambda r: (r["nodeType"], r["nodeID"], r["_id"])
+        records = [r for chunk in self.dao.iterate_dataRecords_chunks("sub-1", None, 2, start_key=key(all_records[5]), end_key=key(all_records[15])) for r in chunk]
+        self.assertEqual(records, all_records[6:16])
+
+    def test_exact_multiple_of_chunk_size(self):
+        """No empty chunk is yielded when the record count is a multiple of the chunk size"""
+        chunks = list(self.dao.iterate_dataRecords_chunks("sub-1", None, 5))
+        self.assertEqual([len(chunk) for chunk in chunks], [5, 5, 5, 5, 5])
+
+    def test_no_records(self):
+        """No chunk is yielded for a submission without records"""
+        self.assertEqual(list(self.dao.iterate_dataRecords_chunks("sub-3", None, 5)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
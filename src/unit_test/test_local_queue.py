@@ -0,0 +1,71 @@
+"""
+Unit tests for LocalQueue visibility timeout, delete, batch receive and message groups
+"""
+
+import time
+import unittest
+from common.local_queue import LocalQueue
+
+
+class TestLocalQueue(unittest.TestCase):
+    """Test cases for LocalQueue"""
+
+    def setUp(self):
+        self.queue = LocalQueue("test.fifo", long_pull_time=0)
+
+    def tearDown(self):
+        self.queue.close()
+
+    def test_batch_receive_and_delete(self):
+        """Messages are received in batches and removed when deleted"""
+        for i in range(3):
+            self.queue.sendMsgToQueue({"n": i}, f"group-{i}")
+        msgs = self.queue.receiveMsgs(30, 10)
+        self.assertEqual([msg.body for msg in msgs], ['{"n": 0}', '{"n": 1}', '{"n": 2}'])
+        for msg in msgs:
+            msg.delete()
+        self.assertEqual(self.queue.receiveMsgs(0, 10), [])
+        self.assertEqual(self.queue.getApproximateNumberOfMessages(), 0)
+
+    def test_visibility_timeout(self):
+        """Messages not deleted become visible again after the visibility timeout"""
+        self.queue.sendMsgToQueue({"n": 1}, "group-1")
+        self.assertEqual(len(self.queue.receiveMsgs(0.2, 1)), 1)
+        self.assertEqual(self.queue.receiveMsgs(0.2, 1), [])
+        time.sleep(0.3)
+        self.assertEqual(len(self.queue.receiveMsgs(0.2, 1)), 1)
+
+    def test_message_group_in_order(self):
+        """Messages of the same group are not delivered while one is in flight"""
+        self.queue.sendMsgToQueue({"n": 1}, "sub-1")
+        self.queue.sendMsgToQueue({"n": 2}, "sub-1")
+        first = self.queue.receiveMsgs(30, 1)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(self.queue.receiveMsgs(30, 10), [])
+        first[0].delete()
+        second = self.queue.receiveMsgs(30, 10)
+        self.assertEqual(second[0].body, '{"n": 2}')
+
+    def test_message_group_batch(self):
+        """A batch receive returns the messages of a group in order, as a fifo sqs queue does"""
+        for n, group_id in [(1, "sub-1"), (2, "sub-2"), (3, "sub-1")]:
+            self.queue.sendMsgToQueue({"n": n}, group_id)
+        self.assertEqual([msg.body for msg in self.queue.receiveMsgs(30, 10)], ['{"n": 1}', '{"n": 2}', '{"n": 3}'])
+        self.queue.sendMsgToQueue({"n": 4}, "sub-1")
+        self.assertEqual(self.queue.receiveMsgs(30, 10), [])
+
+    def test_change_visibility_batch(self):
+        """Visibility of in-flight messages can be extended in batch"""
+        self.queue.sendMsgToQueue({"n": 1}, "group-1")
+        msg = self.queue.receiveMsgs(0.2, 1)[0]
+        response = msg.meta.client.change_message_visibility_batch(QueueUrl=msg.queue_url,
+            Entries=[{"Id": "0", "ReceiptHandle": msg.receipt_handle, "VisibilityTimeout": 30},
+                     {"Id": "1", "ReceiptHandle": "invalid", "VisibilityTimeout": 30}])
+        self.assertEqual(len(response["Successful"]), 1)
+        self.assertEqual(len(response["Failed"]), 1)
+        time.sleep(0.3)
+        self.assertEqual(self.queue.receiveMsgs(30, 1), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
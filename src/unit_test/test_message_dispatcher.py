@@ -0,0 +1,70 @@
+"""
+Unit tests for MessageDispatcher concurrency and per-submission serialization
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from common.message_dispatcher import MessageDispatcher
+
+
+class TestMessageDispatcher(unittest.TestCase):
+    """Test cases for MessageDispatcher"""
+
+    def test_inline_without_workers(self):
+        """Messages are processed in the caller thread with one worker"""
+        dispatcher = MessageDispatcher(1)
+        handler = MagicMock()
+        dispatcher.submit("sub-1", handler, "msg")
+        handler.assert_called_once_with("msg")
+        self.assertEqual(dispatcher.processed, 1)
+        self.assertEqual(dispatcher.in_flight, 0)
+
+    def test_same_key_serialized(self):
+        """Messages of the same submission never run concurrently and keep arrival order"""
+        dispatcher = MessageDispatcher(4)
+        lock = threading.Lock()
+        running = {"sub-1": 0}
+        max_running = []
+        order = []
+
+        def handler(key, i):
+            with lock:
+                running[key] += 1
+                max_running.append(running[key])
+            time.sleep(0.01)
+            with lock:
+                running[key] -= 1
+                order.append(i)
+
+        for i in range(4):
+            dispatcher.submit("sub-1", handler, "sub-1", i)
+        dispatcher.shutdown()
+        self.assertEqual(max(max_running), 1)
+        self.assertEqual(order, [0, 1, 2, 3])
+        self.assertEqual(dispatcher.processed, 4)
+        self.assertEqual(dispatcher.in_flight, 0)
+
+    def test_different_keys_concurrent(self):
+        """Messages of different submissions run concurrently"""
+        dispatcher = MessageDispatcher(2)
+        barrier = threading.Barrier(2, timeout=5)
+        results = []
+        handler = lambda: results.append(barrier.wait())
+        dispatcher.submit("sub-1", handler)
+        dispatcher.submit("sub-2", handler)
+        dispatcher.shutdown()
+        self.assertEqual(sorted(results), [0, 1])
+
+    def test_handler_exception(self):
+        """Handler exceptions do not leak in-flight counts"""
+        dispatcher = MessageDispatcher(2)
+        dispatcher.submit("sub-1", MagicMock(side_effect=Exception("failed")))
+        dispatcher.shutdown()
+        self.assertEqual(dispatcher.in_flight, 0)
+        self.assertEqual(dispatcher.wait_for_capacity(10), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Unit tests for the process-wide data model cache in ModelFactory
+"""
+
+import unittest
+from unittest.mock import patch
+from common.model_store import ModelCache, ModelFactory
+from common.model import DataModel
+
+MODELS_DEF = {"CDS": {"current-version": "1.0", "model-files": ["a.yml"]}}
+
+
+class TestModelCache(unittest.TestCase):
+    """Test cases for ModelCache"""
+
+    def test_lru_eviction(self):
+        """Least recently used model is evicted when the cache is full"""
+        cache = ModelCache(max_size=2)
+        cache.put("a", DataModel({"nodes": {}}))
+        cache.put("b", DataModel({"nodes": {}}))
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", DataModel({"nodes": {}}))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        stats = cache.stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 1)
+
+
+class TestModelFactoryCache(unittest.TestCase):
+    """Test cases for cached model lookup in ModelFactory"""
+
+    @patch('common.model_store.download_file_to_dict', return_value=MODELS_DEF)
+    def setUp(self, mock_download):
+        self.cache = ModelCache()
+        self.factory = ModelFactory("models", "dev", cache=self.cache)
+
+    def test_model_built_once(self):
+        """Repeated requests for the same data commons and version are served from the cache"""
+        with patch.object(self.factory, 'create_model', return_value={"nodes": {"study": {}}}) as mock_create:
+            first = self.factory.get_model_by_data_common_version("CDS", None)
+            second = self.factory.get_model_by_data_common_version("CDS", "1.0")
+        self.assertIs(first, second)
+        mock_create.assert_called_once_with("CDS", "1.0")
+
+    def test_failed_model_not_cached(self):
+        """Failed model builds are not cached"""
+        with patch.object(self.factory, 'create_model', return_value=None) as mock_create:
+            self.assertIsNone(self.factory.get_model_by_data_common_version("CDS", "1.0"))
+            self.assertIsNone(self.factory.get_model_by_data_common_version("CDS", "1.0"))
+        self.assertEqual(mock_create.call_count, 2)
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
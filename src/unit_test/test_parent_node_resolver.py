@@ -0,0 +1,72 @@
+"""
+Unit tests for ParentNodeResolver prefetching parents of a dataRecords chunk
+"""
+
+import unittest
+from unittest.mock import MagicMock
+from common.node_resolver import ParentNodeResolver
+
+
+def parent(parent_type, value, prop=None):
+    return {"parentType": parent_type, "parentIDPropName": prop or f"{parent_type}_id", "parentIDValue": value}
+
+
+class TestParentNodeResolver(unittest.TestCase):
+    """Test cases for ParentNodeResolver"""
+
+    def setUp(self):
+        self.dao = MagicMock()
+        self.dao.search_nodes_by_type_and_ids.return_value = [
+            {"nodeType": "study", "nodeID": "s1", "props": {"study_id": "s1", "name": "study 1"}},
+            {"nodeType": "participant", "nodeID": "p1", "props": {"participant_id": "p1"}},
+        ]
+        self.dao.search_released_nodes_by_ids.return_value = [{"nodeType": "participant", "nodeID": "p9"}]
+        self.resolver = ParentNodeResolver(self.dao, "sub-1")
+        self.records = [
+            {"dataCommons": "CDS", "parents": [parent("study", "s1")]},
+            {"dataCommons": "CDS", "parents": [parent("participant", "p1"), parent("participant", "p9")]},
+            {"dataCommons": "CDS", "parents": [parent("participant", "p8"), parent("study", "")]},
+        ]
+
+    def test_bulk_queries(self):
+        """Parents of the chunk are resolved with one query per collection"""
+        self.resolver.prefetch(self.records)
+        self.dao.search_nodes_by_type_and_ids.assert_called_once_with({"study": {"s1"}, "participant": {"p1", "p9", "p8"}}, "sub-1")
+        self.dao.search_released_nodes_by_ids.assert_called_once_with("CDS", {"participant": {"p9", "p8"}})
+
+    def test_parent_nodes(self):
+        """Parent node properties are served from the prefetched nodes"""
+        self.resolver.prefetch(self.records)
+        self.assertEqual(self.resolver.get_parent_nodes(self.records[0]["parents"]),
+                         [("study", "study_id", "s1"), ("study", "name", "study 1")])
+        self.assertEqual(self.resolver.get_parent_nodes(self.records[1]["parents"]), [("participant", "participant_id", "p1")])
+        self.assertEqual(self.resolver.get_parent_nodes(self.records[2]["parents"]), [])
+        # parent not in the chunk is left to the caller
+        self.assertIsNone(self.resolver.get_parent_nodes([parent("study", "s2")]))
+
+    def test_released(self):
+        """Released parents are served from the prefetched release nodes"""
+        self.resolver.prefetch(self.records)
+        self.assertTrue(self.resolver.is_released("CDS", "participant", "p9"))
+        self.assertFalse(self.resolver.is_released("CDS", "participant", "p8"))
+        self.assertIsNone(self.resolver.is_released("CDS", "study", "s1"))
+        self.assertIsNone(self.resolver.is_released("ICDC", "participant", "p9"))
+
+    def test_failed_query(self):
+        """Nothing is served if the bulk query failed"""
+        self.dao.search_nodes_by_type_and_ids.return_value = None
+        self.resolver.prefetch(self.records)
+        self.assertIsNone(self.resolver.get_parent_nodes(self.records[0]["parents"]))
+        self.assertIsNone(self.resolver.is_released("CDS", "participant", "p9"))
+        self.dao.search_released_nodes_by_ids.assert_not_called()
+
+    def test_unhashable_value(self):
+        """Parents with unhashable ID values are left to the caller"""
+        records = [{"dataCommons": "CDS", "parents": [parent("study", ["s1"])]}]
+        self.resolver.prefetch(records)
+        self.dao.search_nodes_by_type_and_ids.assert_not_called()
+        self.assertIsNone(self.resolver.get_parent_nodes(records[0]["parents"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Unit tests for PermissibleValueMatcher
+"""
+
+import unittest
+from unittest.mock import MagicMock
+from common.pv_matcher import PermissibleValueMatcher
+from metadata_validator import check_permissive
+
+
+class TestPermissibleValueMatcher(unittest.TestCase):
+    """Test cases for PermissibleValueMatcher"""
+
+    def test_string_values(self):
+        """String values are matched case-insensitively and corrected to the permissible value"""
+        matcher = PermissibleValueMatcher(["Male", "Female", "MALE"])
+        self.assertEqual(matcher.match("Male"), (True, "Male"))
+        self.assertEqual(matcher.match("MALE"), (True, "MALE"))
+        # first permissible value in list order
+        self.assertEqual(matcher.match("male"), (True, "Male"))
+        self.assertEqual(matcher.match("unknown"), (False, "unknown"))
+        self.assertEqual(matcher.match("<DELETE>"), (True, "<delete>"))
+        self.assertEqual(len(matcher), 3)
+
+    def test_numeric_values(self):
+        """Numeric values are matched exactly"""
+        matcher = PermissibleValueMatcher([1, 2.5])
+        self.assertEqual(matcher.match(1), (True, 1))
+        self.assertEqual(matcher.match(1.0), (True, 1.0))
+        self.assertEqual(matcher.match(3), (False, 3))
+        self.assertEqual(matcher.match("<delete>"), (True, "<delete>"))
+        # integer value checked against string permissible values
+        self.assertEqual(PermissibleValueMatcher(["1", "2"]).match(1), (True, "1"))
+
+    def test_list_items(self):
+        """Each item of a list value is stripped and matched"""
+        matcher = PermissibleValueMatcher(["Blood", "Tissue"])
+        self.assertEqual(matcher.match_items("blood | Tissue|x", "|"),
+                         [("blood", True, "Blood"), ("Tissue", True, "Tissue"), ("x", False, "x")])
+        self.assertEqual(matcher.match_items(" tissue ", "|"), [("tissue", True, "Tissue")])
+
+    def test_check_permissive_does_not_change_list(self):
+        """check_permissive matches against the delete command without appending it to the permissible values"""
+        permissive_vals = ["Yes", "No"]
+        dao = MagicMock()
+        dao.find_pvs_by_synonym.return_value = [{"equivalent_term": "No"}]
+        self.assertEqual(check_permissive(" yes ", permissive_vals, "prefix", "prop", dao), (True, None, "Yes"))
+        self.assertEqual(check_permissive("<delete>", permissive_vals, "prefix", "prop", dao), (True, None, "<delete>"))
+        result, error, _ = check_permissive("nope", permissive_vals, "prefix", "prop", dao)
+        self.assertFalse(result)
+        self.assertEqual(error["code"], "M010")
+        self.assertIn('It is recommended to use "No"', error["description"])
+        self.assertEqual(permissive_vals, ["Yes", "No"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Unit tests for batched QC result reads and deletes of MetaDataValidator.validate_nodes
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+from metadata_validator import MetaDataValidator
+from common.constants import STATUS_PASSED, STATUS_ERROR, SUBMISSION_INTENTION, SUBMISSION_INTENTION_DELETE
+
+
+def record(node_id, qc_id=None):
+    return {"_id": f"id-{node_id}", "submissionID": "sub", "nodeType": "sample", "nodeID": node_id, "batchIDs": ["b"],
+            "latestBatchID": "b", "qcResultID": qc_id}
+
+
+class TestQCResultPrefetch(unittest.TestCase):
+    """Test cases for QC results of a chunk"""
+
+    def setUp(self):
+        self.dao = MagicMock()
+        self.dao.get_qcRecords.return_value = {"qc-1": {"_id": "qc-1"}, "qc-2": {"_id": "qc-2"}}
+        self.dao.save_qc_results.return_value = (True, None)
+        self.dao.update_data_records_status.return_value = (True, None)
+        self.validator = MetaDataValidator(self.dao, None, {})
+        self.validator.submission = {SUBMISSION_INTENTION: SUBMISSION_INTENTION_DELETE}
+
+    def test_constant_round_trips(self):
+        """QC results are read in one query, deleted in one call and saved in one bulk write"""
+        records = [record("s1", "qc-1"), record("s2", "qc-2"), record("s3"), record("s4", "qc-missing")]
+        results = {"s1": STATUS_PASSED, "s2": STATUS_ERROR, "s3": STATUS_ERROR, "s4": STATUS_PASSED}
+        with patch.object(self.validator, "validate_node", side_effect=lambda r: (results[r["nodeID"]], [{"code": "M001"}] if results[r["nodeID"]] == STATUS_ERROR else [], [])):
+            self.assertEqual(self.validator.validate_nodes(records), 4)
+        self.assertCountEqual(self.dao.get_qcRecords.call_args.args[0], ["qc-1", "qc-2", "qc-missing"])
+        self.dao.get_qcRecords.assert_called_once()
+        self.dao.get_qcRecord.assert_not_called()
+        self.dao.delete_qcRecord.assert_not_called()
+        self.dao.delete_qcRecords.assert_called_once_with(["qc-1"])
+        self.dao.save_qc_results.assert_called_once()
+        saved = self.dao.save_qc_results.call_args.args[0]
+        self.assertEqual(saved[0]["_id"], "qc-2")
+        self.assertEqual(records[2]["qcResultID"], saved[1]["_id"])
+        self.assertEqual([r["qcResultID"] for r in (records[0], records[3])], [None, None])
+
+    def test_no_qc_results(self):
+        """No QC query nor delete for a chunk without QC results"""
+        with patch.object(self.validator, "validate_node", return_value=(STATUS_PASSED, [], [])):
+            self.validator.validate_nodes([record("s1")])
+        self.dao.get_qcRecords.assert_not_called()
+        self.dao.delete_qcRecords.assert_not_called()
+        self.dao.save_qc_results.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
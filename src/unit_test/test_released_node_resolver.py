@@ -0,0 +1,49 @@
+"""
+Unit tests for ReleasedNodeResolver prefetching released nodes of a dataRecords chunk
+"""
+
+import unittest
+from unittest.mock import MagicMock
+from common.node_resolver import ReleasedNodeResolver
+
+STATUS = ["Released", None]
+
+
+class TestReleasedNodeResolver(unittest.TestCase):
+    """Test cases for ReleasedNodeResolver"""
+
+    def setUp(self):
+        self.dao = MagicMock()
+        self.dao.search_released_nodes_with_status.return_value = [
+            {"nodeType": "study", "nodeID": "s1", "props": {"name": "first"}},
+            {"nodeType": "study", "nodeID": "s1", "props": {"name": "second"}},
+            {"nodeType": "participant", "nodeID": "p1", "props": {}},
+        ]
+        self.resolver = ReleasedNodeResolver(self.dao, "CDS", STATUS)
+        self.records = [
+            {"nodeType": "study", "nodeID": "s1"},
+            {"nodeType": "participant", "nodeID": "p1"},
+            {"nodeType": "participant", "nodeID": "p2"},
+            {"nodeType": "participant", "nodeID": ["unhashable"]},
+        ]
+
+    def test_bulk_query(self):
+        """Released nodes of the chunk are searched in one call, the first node found is kept"""
+        self.resolver.prefetch(self.records)
+        self.dao.search_released_nodes_with_status.assert_called_once_with("CDS", {"study": {"s1"}, "participant": {"p1", "p2"}}, STATUS)
+        self.assertEqual(self.resolver.get_released_node("study", "s1")["props"], {"name": "first"})
+        self.assertEqual(self.resolver.get_released_node("participant", "p1")["nodeID"], "p1")
+        self.assertIs(self.resolver.get_released_node("participant", "p2"), False)
+        self.assertIsNone(self.resolver.get_released_node("participant", "p3"))
+        self.assertIsNone(self.resolver.get_released_node("participant", ["unhashable"]))
+
+    def test_failed_query(self):
+        """Nothing is prefetched if the bulk query failed"""
+        self.resolver.prefetch(self.records)
+        self.dao.search_released_nodes_with_status.return_value = None
+        self.resolver.prefetch(self.records)
+        self.assertIsNone(self.resolver.get_released_node("study", "s1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
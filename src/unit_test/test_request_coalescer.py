@@ -0,0 +1,88 @@
+"""
+Unit tests for RequestCoalescer collapsing duplicate validation requests
+"""
+
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from common.local_queue import LocalQueue
+from common.request_coalescer import RequestCoalescer
+from metadata_validator import metadataValidate
+
+VALIDATE = "Validate Metadata"
+
+
+def message(validation_id, submission_id="sub-1", scope="New", sqs_type=VALIDATE):
+    msg = MagicMock()
+    msg.body = json.dumps({"type": sqs_type, "submissionID": submission_id, "scope": scope, "validationID": validation_id})
+    return msg
+
+
+class TestRequestCoalescer(unittest.TestCase):
+    """Test cases for RequestCoalescer"""
+
+    def setUp(self):
+        self.coalescer = RequestCoalescer([VALIDATE])
+
+    def test_pending_requests_collapsed(self):
+        """Requests of the same submission and scope join the pending group, latest request is primary"""
+        first, second, third = message("v1"), message("v2"), message("v3")
+        group = self.coalescer.add(first, MagicMock())
+        self.assertIsNone(self.coalescer.add(second, MagicMock()))
+        self.assertIsNone(self.coalescer.add(third, MagicMock()))
+        self.assertIs(group.msg, third)
+        self.assertEqual(group.validation_ids, ["v1", "v2", "v3"])
+        group.start()
+        group.delete()
+        group.stop()
+        for msg in [first, second, third]:
+            msg.delete.assert_called_once()
+
+    def test_started_group_not_joined(self):
+        """Requests arrived after the run started are processed by a new run"""
+        group = self.coalescer.add(message("v1"), MagicMock())
+        group.start()
+        new_group = self.coalescer.add(message("v2"), MagicMock())
+        self.assertIsNotNone(new_group)
+        self.assertEqual(new_group.validation_ids, ["v2"])
+
+    def test_different_scope_or_type_not_collapsed(self):
+        """Requests of different scope or non-coalescible types are processed separately"""
+        self.assertIsNotNone(self.coalescer.add(message("v1", scope="New"), MagicMock()))
+        self.assertIsNotNone(self.coalescer.add(message("v2", scope="All"), MagicMock()))
+        self.assertIsNotNone(self.coalescer.add(message("v3", sqs_type="Other"), MagicMock()))
+        self.assertIsNotNone(self.coalescer.add(message("v4", sqs_type="Other"), MagicMock()))
+
+
+class TestMetadataServiceCoalescing(unittest.TestCase):
+    """Test cases for coalescing requests queued behind each other in the metadata validation service"""
+
+    def test_queued_requests_validated_once(self):
+        """Two queued requests of a submission are validated by one run with the default single worker"""
+        queue = LocalQueue("metadata.fifo", long_pull_time=0)
+        for validation_id in ["v1", "v2"]:
+            queue.sendMsgToQueue({"type": VALIDATE, "submissionID": "sub-1", "scope": "New", "validationID": validation_id}, "sub-1")
+        receive = queue.receiveMsgs
+
+        def receive_once(visibility_timeout, max_msgs=1):
+            if receive_once.called:
+                raise KeyboardInterrupt()
+            receive_once.called = True
+            return receive(visibility_timeout, max_msgs)
+        receive_once.called = False
+        queue.receiveMsgs = receive_once
+
+        dao = MagicMock()
+        validator = MagicMock(config={}, submission={"_id": "sub-1"})
+        validator.validate.return_value = "Passed"
+        with patch("metadata_validator.ModelFactory"), patch("metadata_validator.set_scale_in_protection"), \
+                patch("metadata_validator.MetaDataValidator", return_value=validator):
+            metadataValidate({"models-loc": "models", "tier": "dev", "sqs": "metadata.fifo"}, queue, dao)
+        validator.validate.assert_called_once_with("sub-1", "New", "v2")
+        self.assertEqual([c.args[:2] for c in dao.update_validation_status.call_args_list], [("v1", "Passed"), ("v2", "Passed")])
+        self.assertEqual(queue.getApproximateNumberOfMessages(), 0)
+        self.assertEqual(queue._receive(0, 10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
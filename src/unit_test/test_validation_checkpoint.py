@@ -0,0 +1,128 @@
+"""
+Unit tests for resuming metadata validation from chunk checkpoints
+"""
+
+import copy
+import unittest
+from unittest.mock import MagicMock
+from common.validation_checkpoint import ValidationCheckpoint
+from metadata_validator import MetaDataValidator
+
+
+class FakeCheckpointDao:
+    """Validation documents in memory, checkpoint fields set in dot notation"""
+
+    def __init__(self):
+        self.checkpoints = {}
+        self.new_records = 0
+
+    def get_validation_checkpoint(self, validation_id):
+        return copy.deepcopy(self.checkpoints.get(validation_id, {}))
+
+    def set_validation_checkpoint(self, validation_id, fields):
+        for key, value in fields.items():
+            node = self.checkpoints.setdefault(validation_id, {})
+            path = key.split(".")
+            for name in path[:-1]:
+                node = node.setdefault(name, {})
+            node[path[-1]] = copy.deepcopy(value)
+        return True
+
+    def clear_validation_checkpoint(self, validation_id):
+        self.checkpoints.pop(validation_id, None)
+        return True
+
+    def count_new_dataRecords_not_after(self, submission_id, key):
+        return self.new_records
+
+
+def chunk(*node_ids):
+    return [{"_id": node_id, "nodeType": "sample", "nodeID": node_id, "status": "New"} for node_id in node_ids]
+
+
+class TestValidationCheckpoint(unittest.TestCase):
+    """Test cases for ValidationCheckpoint and MetaDataValidator.validate_records"""
+
+    def setUp(self):
+        self.checkpoint_dao = FakeCheckpointDao()
+        self.dao = MagicMock()
+        self.dao.update_data_records_status.return_value = (True, None)
+
+    def create_validator(self):
+        validator = MetaDataValidator(self.dao, None, {"pipeline-queue-depth": 0})
+        validator.submission_id = "sub-1"
+        validator.scope = "All"
+        validator.submission = {"_id": "sub-1"}
+        validator.datacommon = "CDS"
+        validator.checkpoint = ValidationCheckpoint(self.checkpoint_dao, "validation-1")
+        validator.checkpoint.load("sub-1", "All")
+
+        def validate_chunk(data_records):
+            for record in data_records:
+                record["status"] = "Error" if record["nodeID"] == "b" else "Passed"
+            return len(data_records), data_records, [], [], False
+        validator.validate_chunk = validate_chunk
+        return validator
+
+    def test_resume(self):
+        """A failed validation resumes after the last saved chunk, with its counts and flags"""
+        def failing_chunks(*args, **kwargs):
+            yield chunk("a", "b")
+            raise Exception("task stopped")
+        self.dao.iterate_dataRecords_chunks.side_effect = failing_chunks
+        with self.assertRaisesRegex(Exception, "task stopped"):
+            self.create_validator().validate_records()
+        progress = self.checkpoint_dao.checkpoints["validation-1"]["ranges"]["0"]
+        self.assertEqual(progress, {"lastKey": ["sample", "b", "b"], "total": 2, "validated": 2, "isError": True, "isWarning": False})
+
+        self.dao.iterate_dataRecords_chunks.side_effect = lambda *args, **kwargs: iter([chunk("c")])
+        validator = self.create_validator()
+        self.assertEqual(validator.validate_records(), (3, 3))
+        self.assertTrue(validator.isError)
+        self.assertEqual(self.dao.iterate_dataRecords_chunks.call_args.kwargs["start_key"], ("sample", "b", "b"))
+
+    def test_failed_save(self):
+        """The checkpoint doesn't advance past a chunk failed to save, the validation stops to be retried"""
+        self.dao.iterate_dataRecords_chunks.side_effect = lambda *args, **kwargs: iter([chunk("a"), chunk("b"), chunk("c")])
+        self.dao.update_data_records_status.side_effect = [(True, None), (False, "Failed to update metadata.")]
+        with self.assertRaisesRegex(Exception, "failed to save the chunk"):
+            self.create_validator().validate_records()
+        progress = self.checkpoint_dao.checkpoints["validation-1"]["ranges"]["0"]
+        self.assertEqual(progress["lastKey"], ["sample", "a", "a"])
+        self.assertEqual(progress["total"], 1)
+        self.assertEqual(self.dao.update_data_records_status.call_count, 2)
+
+        self.dao.update_data_records_status.side_effect = None
+        self.dao.save_qc_results.return_value = (False, "Failed to upsert QC records.")
+        validator = self.create_validator()
+        validator.validate_chunk = lambda data_records: (len(data_records), data_records, [{"_id": "qc-1"}], [], False)
+        with self.assertRaisesRegex(Exception, "failed to save the chunk"):
+            validator.validate_records()
+        self.assertEqual(self.checkpoint_dao.checkpoints["validation-1"]["ranges"]["0"]["lastKey"], ["sample", "a", "a"])
+
+    def test_other_submission_or_stale(self):
+        """A checkpoint of another scope is not resumed, nor one with records changed since"""
+        self.checkpoint_dao.set_validation_checkpoint("validation-1", {"submissionID": "sub-1", "scope": "All", "splitKeys": [],
+                                                                       "ranges.0": {"lastKey": ["sample", "b", "b"], "total": 2}})
+        checkpoint = ValidationCheckpoint(self.checkpoint_dao, "validation-1")
+        self.assertFalse(checkpoint.load("sub-1", "New"))
+        self.assertTrue(checkpoint.load("sub-1", "All"))
+        self.assertEqual(checkpoint.get_range(0)["lastKey"], ("sample", "b", "b"))
+        self.assertFalse(checkpoint.is_stale("sub-1"))
+        self.checkpoint_dao.new_records = 1
+        self.assertTrue(checkpoint.is_stale("sub-1"))
+
+    def test_start_and_clear(self):
+        """Starting over replaces the checkpoint, and it is removed when the validation is done"""
+        checkpoint = ValidationCheckpoint(self.checkpoint_dao, "validation-1")
+        checkpoint.start("sub-1", "All", [("sample", "b", "b")])
+        checkpoint.save_range(1, ("sample", "c", "c"), 1, 1, False, True)
+        self.assertTrue(ValidationCheckpoint(self.checkpoint_dao, "validation-1").load("sub-1", "All"))
+        checkpoint.start("sub-1", "All", [])
+        self.assertEqual(self.checkpoint_dao.checkpoints["validation-1"], {"submissionID": "sub-1", "scope": "All", "splitKeys": []})
+        checkpoint.clear()
+        self.assertFalse(ValidationCheckpoint(self.checkpoint_dao, "validation-1").load("sub-1", "All"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Unit tests for the compiled validation plan of metadata properties
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+from common.model import DataModel
+from metadata_validator import MetaDataValidator, get_validation_plan
+
+MODEL = {"nodes": {"sample": {"id_property": "sample_id", "properties": {
+    "sample_id": {"type": "string"},
+    "code": {"type": "pattern", "pattern": "^[A-Z]+$"},
+    "age": {"type": "integer", "minimum": {"value": 0}},
+    "is_tumor": {"type": "boolean"},
+    "empty": {},
+}}}}
+
+
+class TestValidationPlan(unittest.TestCase):
+    """Test cases for get_validation_plan"""
+
+    def setUp(self):
+        self.model = DataModel(MODEL)
+
+    def test_plan_compiled_once(self):
+        """The plan is compiled once per model and node type, patterns are compiled with the plan"""
+        with patch("metadata_validator.re.compile", wraps=__import__("re").compile) as mock_compile:
+            plan = get_validation_plan(self.model, "sample")
+            self.assertIs(get_validation_plan(self.model, "sample"), plan)
+            self.assertEqual(mock_compile.call_count, 1)
+        self.assertEqual(set(plan.keys()), {"sample_id", "code", "age", "is_tumor"})
+        self.assertIsNone(get_validation_plan(self.model, "unknown"))
+        self.assertIsNot(get_validation_plan(DataModel(MODEL), "sample"), plan)
+
+    def test_validate_props(self):
+        """validate_props runs the checkers of the plan"""
+        validator = MetaDataValidator(MagicMock(), None, {})
+        validator.model = self.model
+        record = {"nodeType": "sample", "props": {"sample_id": "s1", "code": "ABC", "age": "3", "is_tumor": "Yes", "other": "x"}}
+        result = validator.validate_props(record, "prefix")
+        self.assertEqual(result["errors"], [])
+        self.assertIs(record["props"]["is_tumor"], True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for validating key ranges of a submission in shard worker processes
+"""
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from common.mongo_dao import MongoDao
+import metadata_validator
+from common.fingerprint import IncrementalPlanner
+from metadata_validator import MetaDataValidator, get_shard_executor, validate_shard
+
+
+class TestValidationShards(unittest.TestCase):
+    """Test cases for MetaDataValidator.validate_shards"""
+
+    def setUp(self):
+        self.dao = MagicMock()
+        self.validator = MetaDataValidator(self.dao, None, {"validation-shards": 3})
+        self.validator.submission_id = "sub-1"
+        self.validator.scope = "All"
+        self.validator.duplicate_nodes = {}
+
+    def test_merge_results(self):
+        """Key ranges are validated by the shard workers and their results are merged"""
+        self.dao.get_dataRecords_split_keys.return_value = [("a", "1", 1), ("b", "2", 2)]
+        results = {None: (10, 10, False, True, 1, 2), ("a", "1", 1): (10, 9, True, False, 3, 0), ("b", "2", 2): (5, 5, False, False, 0, 1)}
+        with ThreadPoolExecutor(3) as executor, \
+                patch("metadata_validator.get_shard_executor", return_value=executor), \
+                patch("metadata_validator.validate_shard", side_effect=lambda sub, scope, start, end, *args: results[start]) as mock_shard:
+            self.assertEqual(self.validator.validate_shards(3), (25, 24))
+        self.assertEqual([c.args[2:4] for c in mock_shard.call_args_list],
+                         [(None, ("a", "1", 1)), (("a", "1", 1), ("b", "2", 2)), (("b", "2", 2), None)])
+        self.assertTrue(self.validator.isError)
+        self.assertTrue(self.validator.isWarning)
+        self.assertEqual((self.validator.cde_cache_hits, self.validator.cde_cache_misses), (4, 3))
+
+    def test_revalidate_ids_split(self):
+        """Shard workers get the _id of records to validate of their key range only, and no duplicate nodes"""
+        self.dao.get_dataRecords_split_keys.return_value = [("a", "2", 2), ("b", "4", 4)]
+        self.validator.revalidate_ids = {1, 3, 4, 6}
+        self.validator.incremental_planner = IncrementalPlanner(self.dao, None, "sub-1", "env", {})
+        self.validator.incremental_planner.record_ids = [1, 2, 3, 4, 5, 6]
+        with ThreadPoolExecutor(3) as executor, \
+                patch("metadata_validator.get_shard_executor", return_value=executor), \
+                patch("metadata_validator.validate_shard", return_value=(2, 1, False, False, 0, 0)) as mock_shard:
+            self.assertEqual(self.validator.validate_shards(3), (6, 3))
+        self.assertEqual([c.args[5] for c in mock_shard.call_args_list], [{1}, {3, 4}, {6}])
+        self.assertEqual(len(mock_shard.call_args_list[0].args), 8)
+
+        # all records are validated if a split key is not a record of the plan
+        self.dao.get_dataRecords_split_keys.return_value = [("a", "2", 2), ("b", "7", 7)]
+        with ThreadPoolExecutor(3) as executor, \
+                patch("metadata_validator.get_shard_executor", return_value=executor), \
+                patch("metadata_validator.validate_shard", return_value=(2, 2, False, False, 0, 0)) as mock_shard:
+            self.validator.validate_shards(3)
+        self.assertEqual([c.args[5] for c in mock_shard.call_args_list], [None, None, None])
+        self.assertIsNone(self.validator.revalidate_ids)
+
+    def test_shard_loads_duplicate_nodes(self):
+        """Duplicate nodes are loaded by the shard worker"""
+        self.dao.get_duplicate_nodes.return_value = {("a", "1"): []}
+        self.dao.get_cde_generation.return_value = None
+        with patch.dict(metadata_validator.shard_worker, {"mongo_dao": self.dao, "model_store": None, "configs": {}}), \
+                patch.object(MetaDataValidator, "load_submission", return_value=None), \
+                patch.object(MetaDataValidator, "validate_records", autospec=True,
+                             side_effect=lambda validator, *args: (len(validator.duplicate_nodes), len(validator.revalidate_ids))) as mock_records:
+            self.assertEqual(validate_shard("sub-1", "All", None, ("a", "1", 1), "env", {1, 2}), (1, 2, False, False, 0, 0))
+        self.dao.get_duplicate_nodes.assert_called_once_with("sub-1")
+        self.assertEqual(mock_records.call_args.args[1:], (None, ("a", "1", 1), 0))
+
+    def test_not_split(self):
+        """Records are validated in the service process if they can't be split"""
+        self.dao.get_dataRecords_split_keys.return_value = []
+        with patch.object(self.validator, "validate_records", return_value=(3, 3)) as mock_records, \
+                patch("metadata_validator.get_shard_executor") as mock_executor:
+            self.assertEqual(self.validator.validate_shards(3), (3, 3))
+        mock_records.assert_called_once_with()
+        mock_executor.assert_not_called()
+
+    def test_executor_sized_by_config(self):
+        """The process pool is created once with validation-shards workers, none if validations are not sharded"""
+        self.assertIsNone(get_shard_executor({}))
+        self.assertIsNone(get_shard_executor({"validation-shards": 1}))
+        with patch.object(metadata_validator, "shard_executor", None), \
+                patch("metadata_validator.ProcessPoolExecutor") as mock_pool:
+            executor = get_shard_executor({"validation-shards": 3})
+            self.assertIs(get_shard_executor({"validation-shards": 3}), executor)
+        mock_pool.assert_called_once()
+        self.assertEqual(mock_pool.call_args.kwargs["max_workers"], 3)
+
+    def test_resumed_without_shard_workers(self):
+        """Key ranges of a checkpoint are validated in the service process if the service has no shard workers"""
+        self.validator.checkpoint = MagicMock(split_keys=[("a", "1", 1)])
+        with patch.object(self.validator, "validate_records", side_effect=[(10, 10), (5, 4)]) as mock_records, \
+                patch("metadata_validator.get_shard_executor", return_value=None):
+            self.assertEqual(self.validator.validate_shards(2), (15, 14))
+        self.assertEqual([c.args for c in mock_records.call_args_list], [(None, ("a", "1", 1), 0), (("a", "1", 1), None, 1)])
+
+    def test_split_keys(self):
+        """Split keys are the last keys of ranges of about the same size"""
+        dao = MongoDao.__new__(MongoDao)
+        dao.client = MagicMock()
+        dao.db_name = "db"
+        dao.log = MagicMock()
+        collection = dao.client["db"]["dataRecords"]
+        collection.count_documents.return_value = 10
+        records = [{"nodeType": "a" if i < 5 else "b", "nodeID": str(i), "_id": i} for i in range(10)]
+        limit = collection.find.return_value.sort.return_value.limit
+        limit.side_effect = lambda size: iter(records[:size])
+        self.assertEqual(dao.get_dataRecords_split_keys("sub-1", "New", 4), [("a", "1", 1), ("a", "4", 4), ("b", "6", 6)])
+        # keys are read in one pass up to the last split
+        limit.assert_called_once_with(7)
+        collection.find.return_value.sort.return_value.skip.assert_not_called()
+        self.assertEqual(collection.count_documents.call_args.args[0], {"submissionID": "sub-1", "status": "New"})
+        self.assertEqual(collection.find.call_args.args[1], {"nodeType": 1, "nodeID": 1})
+
+        collection.count_documents.return_value = 2
+        self.assertEqual(dao.get_dataRecords_split_keys("sub-1", "All", 4), [("a", "0", 0)])
+        collection.count_documents.return_value = 0
+        self.assertEqual(dao.get_dataRecords_split_keys("sub-1", "All", 4), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Unit tests for VisibilityManager batched visibility extension
+"""
+
+import unittest
+from unittest.mock import MagicMock
+from common.sqs_queue import VisibilityManager
+
+
+def message(client, message_id):
+    msg = MagicMock()
+    msg.queue_url = "https://sqs/queue.fifo"
+    msg.receipt_handle = f"handle-{message_id}"
+    msg.message_id = message_id
+    msg.meta.client = client
+    return msg
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestVisibilityManager(unittest.TestCase):
+    """Test cases for VisibilityManager, with a fake clock, the extensions are run by the test instead of the thread"""
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.change_message_visibility_batch.return_value = {"Successful": [], "Failed": []}
+        self.clock = FakeClock()
+        self.manager = VisibilityManager(60, clock=self.clock)
+
+    def extend(self):
+        with self.manager.condition:
+            due, _ = self.manager._get_due(self.clock.now)
+        return self.manager._extend(due, self.clock.now)
+
+    def test_batch_extension(self):
+        """Registered messages are extended together in one batch request with growing timeout"""
+        with self.manager.register(message(self.client, "1")), self.manager.register(message(self.client, "2")):
+            self.clock.now += 20
+            self.assertEqual(self.extend(), 0)
+            self.client.change_message_visibility_batch.assert_not_called()
+            self.clock.now += 10
+            self.assertEqual(self.extend(), 0)
+            self.assertEqual([entry["timeout"] for entry in self.manager.messages.values()], [120, 120])
+        kwargs = self.client.change_message_visibility_batch.call_args.kwargs
+        self.assertEqual(kwargs["QueueUrl"], "https://sqs/queue.fifo")
+        self.assertEqual([entry["VisibilityTimeout"] for entry in kwargs["Entries"]], [120, 120])
+        self.assertEqual(len(self.manager.messages), 0)
+
+    def test_partial_failure(self):
+        """Messages failed to extend keep their timeout and are retried, messages with invalid receipt handles are dropped"""
+        handles = [self.manager.register(message(self.client, str(i))) for i in range(3)]
+        self.client.change_message_visibility_batch.return_value = {
+            "Successful": [{"Id": "0"}],
+            "Failed": [{"Id": "1", "Code": "InternalError", "Message": "try again", "SenderFault": False},
+                       {"Id": "2", "Code": "ReceiptHandleIsInvalid", "Message": "expired", "SenderFault": True}]}
+        self.clock.now += 30
+        self.assertEqual(self.extend(), 1)
+        entries = {entry["msg"].message_id: entry for entry in self.manager.messages.values()}
+        self.assertEqual(sorted(entries), ["0", "1"])
+        self.assertEqual((entries["0"]["timeout"], entries["0"]["extended_at"]), (120, self.clock.now))
+        self.assertEqual((entries["1"]["timeout"], entries["1"]["extended_at"]), (60, self.clock.now - 30))
+
+        # only the failed message is due on the next pass
+        self.client.change_message_visibility_batch.return_value = {"Successful": [{"Id": "0"}], "Failed": []}
+        self.clock.now += 1
+        self.assertEqual(self.extend(), 0)
+        kwargs = self.client.change_message_visibility_batch.call_args.kwargs
+        self.assertEqual([entry["ReceiptHandle"] for entry in kwargs["Entries"]], ["handle-1"])
+        self.assertEqual(entries["1"]["timeout"], 120)
+        for handle in handles:
+            handle.stop()
+
+    def test_stopped_message_not_extended(self):
+        """Messages are not extended after they are deregistered"""
+        handle = self.manager.register(message(self.client, "1"))
+        handle.stop()
+        self.clock.now += 30
+        self.assertEqual(self.extend(), 0)
+        self.client.change_message_visibility_batch.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,9 +6,12 @@ import os
 from bento.common.utils import get_logger, LOG_PREFIX
 # from bento.common.sqs import Queue
 from common.sqs_queue import Queue
+from common.local_queue import LocalQueue, IN_MEMORY
 from common.constants import SQS_NAME, SERVICE_TYPE, SERVICE_TYPE_ESSENTIAL, \
-    SERVICE_TYPE_FILE, SERVICE_TYPE_METADATA, SERVICE_TYPE_EXPORT, SERVICE_TYPE_PV_PULLER
+    SERVICE_TYPE_FILE, SERVICE_TYPE_METADATA, SERVICE_TYPE_EXPORT, SERVICE_TYPE_PV_PULLER, HTTP_CACHE_DIR, \
+    HTTP_CACHE_MAX_STALENESS, HTTP_CACHE_OFFLINE, QUEUE_BACKEND, QUEUE_BACKEND_LOCAL, LOCAL_QUEUE_PATH
 from common.utils import get_exception_msg
+from common.http_cache import configure_http_cache
 from config import Config
 from essential_validator import essentialValidate
 from file_validator import fileValidate
@@ -19,6 +22,7 @@ from pv_puller import pull_pv_lists
 DATA_RECORDS_SEARCH_INDEX = "submissionID_nodeType_nodeID"
 DATA_RECORDS_CRDC_SEARCH_INDEX = "dataCommons_nodeType_nodeID"
 DATA_RECORDS_STUDY_ENTITY_INDEX = 'studyID_entityType_nodeID'
+DATA_RECORDS_KEYSET_INDEX = "submissionID_nodeType_nodeID_id"
 RELEASE_SEARCH_INDEX = "dataCommons_nodeType_nodeID"
 CRDCID_SEARCH_INDEX = "CRDC_ID"
 CDE_SEARCH_INDEX = 'CDECode_1_CDEVersion_1'
@@ -43,12 +47,19 @@ def controller():
 
     #step 2 initialize sqs queue, mongo db access object and model store
     try:
+        # set local cache for remote model files
+        configure_http_cache(configs.get(HTTP_CACHE_DIR), configs.get(HTTP_CACHE_MAX_STALENESS, 0), configs.get(HTTP_CACHE_OFFLINE, False))
         job_queue = None
         if  configs[SERVICE_TYPE] not in [SERVICE_TYPE_PV_PULLER]:
-            job_queue = Queue(configs[SQS_NAME], configs.get('aws_profile'))
+            if configs.get(QUEUE_BACKEND) == QUEUE_BACKEND_LOCAL:
+                # local queue for testing services without AWS
+                job_queue = LocalQueue(configs[SQS_NAME], configs.get(LOCAL_QUEUE_PATH) or IN_MEMORY)
+                log.info(f'Using local queue {job_queue.queue_url}')
+            else:
+                job_queue = Queue(configs[SQS_NAME], configs.get('aws_profile'))
         mongo_dao = config.mongodb_dao
         # set dataRecord search index
-        if not mongo_dao.set_search_index_dataRecords(DATA_RECORDS_SEARCH_INDEX, DATA_RECORDS_CRDC_SEARCH_INDEX, DATA_RECORDS_STUDY_ENTITY_INDEX):
+        if not mongo_dao.set_search_index_dataRecords(DATA_RECORDS_SEARCH_INDEX, DATA_RECORDS_CRDC_SEARCH_INDEX, DATA_RECORDS_STUDY_ENTITY_INDEX, DATA_RECORDS_KEYSET_INDEX):
             log.error("Failed to set dataRecords search index!")
             return 1
         # set release search index
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 import json
+from collections import defaultdict
 from bento.common.utils import get_logger
 from common.constants import  ADDITION_ERRORS, STATUS_ERROR, FAILED, STATUS_PASSED, STATUS, UPDATED_AT, DATA_COMMON_NAME, \
-    NODE_TYPE, NODE_ID, VALIDATED_AT, ORIN_FILE_NAME, STUDY_ID, ID, SUBMISSION_STATUS_SUBMITTED, SUBMISSION_REL_STATUS_RELEASED
+    NODE_TYPE, NODE_ID, VALIDATED_AT, ORIN_FILE_NAME, STUDY_ID, ID, SUBMISSION_STATUS_SUBMITTED, SUBMISSION_REL_STATUS_RELEASED, SUBMISSION_ID
 from common.utils import current_datetime, create_error
+from common.node_resolver import hashable_key
 
 BATCH_SIZE = 1000
 
@@ -14,6 +16,10 @@ class CrossSubmissionValidator:
         self.model = None
         self.submission = None
         self.isError = None
+        # other submissions of the study in Submitted or Released status, None if not available
+        self.other_submissions = None
+        # (nodeType, nodeID) of the chunk being validated -> conflicting submissions, None if not available
+        self.conflicts = None
 
     def validate(self, submission_id):
         """
@@ -58,29 +64,29 @@ class CrossSubmissionValidator:
             return FAILED
         self.submission = submission
         self.data_commons = data_commons
+        # conflicting submissions are resolved once, and nodes in them are searched chunk by chunk
+        self.other_submissions = self.mongo_dao.find_other_submissions_in_status(submission_id, submission.get(STUDY_ID), data_commons,
+                                                                                 [SUBMISSION_STATUS_SUBMITTED, SUBMISSION_REL_STATUS_RELEASED])
         
         #2 retrieve data batch by batch
-        start_index = 0
+        total_count = 0
         validated_count = 0
-        while True:
-            data_records = self.mongo_dao.get_dataRecords_chunk(submission_id, None, start_index, BATCH_SIZE)
-            if start_index == 0 and (not data_records or len(data_records) == 0):
-                msg = f'No metadata to be validated.'
-                self.log.error(msg)
-                return FAILED
-            
-            count = len(data_records) 
+        for data_records in self.mongo_dao.iterate_dataRecords_chunks(submission_id, None, BATCH_SIZE):
+            total_count += len(data_records)
             validated_count += self.validate_nodes(data_records, submission_id)
-            if count < BATCH_SIZE: 
-                self.log.info(f"{submission_id}: {validated_count} out of {count + start_index} nodes are validated.")
-                return STATUS_ERROR if self.isError else STATUS_PASSED 
-            start_index += count  
+        if total_count == 0:
+            msg = f'No metadata to be validated.'
+            self.log.error(msg)
+            return FAILED
+        self.log.info(f"{submission_id}: {validated_count} out of {total_count} nodes are validated.")
+        return STATUS_ERROR if self.isError else STATUS_PASSED 
     
     def validate_nodes(self, data_records, submission_id):
         #2. loop through all records and call validateNode
         updated_records = []
         validated_count = 0
         try:
+            self.conflicts = self.find_conflicts(data_records)
             for record in data_records:
                 status, errors = self.validate_node(record, submission_id)
                 if errors and len(errors) > 0:
@@ -95,6 +101,8 @@ class CrossSubmissionValidator:
             msg = f'Failed to validate dataRecords for the submission, {submission_id}.'
             self.log.exception(msg) 
             self.isError = True 
+        finally:
+            self.conflicts = None
         #3. update data records based on record's _id
         result = self.mongo_dao.update_data_records_addition_error(updated_records)
         if not result:
@@ -104,7 +112,33 @@ class CrossSubmissionValidator:
             self.isError = True
 
         return validated_count
-    
+
+    """
+    find nodes of a chunk also in the other submissions of the study, with one query per node type
+    :return: dict of (nodeType, nodeID) -> conflicting submissions, None if not available
+    """
+    def find_conflicts(self, data_records):
+        if self.other_submissions is None:
+            return None
+        node_ids_by_type = defaultdict(set)
+        for record in data_records:
+            key = hashable_key(record.get(NODE_TYPE), record.get(NODE_ID))
+            if key:
+                node_ids_by_type[key[0]].add(key[1])
+        conflicts = {(node_type, node_id): [] for node_type, node_ids in node_ids_by_type.items() for node_id in node_ids}
+        if len(self.other_submissions) == 0 or len(conflicts) == 0:
+            return conflicts
+        nodes = self.mongo_dao.find_nodes_in_submissions(self.data_commons, [sub[ID] for sub in self.other_submissions], node_ids_by_type)
+        if nodes is None:
+            return None
+        submission_ids = defaultdict(set)
+        for node in nodes:
+            submission_ids[(node.get(NODE_TYPE), node.get(NODE_ID))].add(node.get(SUBMISSION_ID))
+        for key, ids in submission_ids.items():
+            if key in conflicts:
+                conflicts[key] = [sub for sub in self.other_submissions if sub[ID] in ids]
+        return conflicts
+
     def validate_node(self, data_record, submission_id):
         # set default return values
         errors = []
@@ -113,8 +147,13 @@ class CrossSubmissionValidator:
         node_id = data_record.get(NODE_ID)
         try:
             # validate cross submission
-            result, duplicate_submissions = self.mongo_dao.find_node_in_other_submissions_in_status(submission_id, self.submission[STUDY_ID], 
-                        self.data_commons, node_type, node_id, [SUBMISSION_STATUS_SUBMITTED, SUBMISSION_REL_STATUS_RELEASED])
+            key = hashable_key(node_type, node_id)
+            duplicate_submissions = self.conflicts.get(key) if self.conflicts is not None and key else None
+            result = duplicate_submissions is not None
+            if not result:
+                # not searched with the chunk
+                result, duplicate_submissions = self.mongo_dao.find_node_in_other_submissions_in_status(submission_id, self.submission[STUDY_ID], 
+                            self.data_commons, node_type, node_id, [SUBMISSION_STATUS_SUBMITTED, SUBMISSION_REL_STATUS_RELEASED])
             if result and duplicate_submissions and len(duplicate_submissions):
                 # error = {"conflictingSubmissions": [sub[ID] for sub in duplicate_submissions]}# add submission id to errors
                 error = create_error("S001", [msg_prefix], "conflictingSubmissions", [sub[ID] for sub in duplicate_submissions])